@@ -5,14 +5,17 @@ MonkeyOCR FastAPI Application
 
 import os
 import io
+import shutil
 import tempfile
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from pathlib import Path
+from urllib.parse import quote
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import BackgroundTasks, FastAPI, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from tempfile import gettempdir
@@ -20,7 +23,9 @@ import zipfile
 from loguru import logger
 import time
 
+from magic_pdf.config.output_profile import OutputArtifact, profile_artifacts
 from magic_pdf.model.custom_model import MonkeyOCR
+from magic_pdf.model.model_server import RemoteMonkeyOCR
 import uvicorn
 
 # Response models
@@ -36,6 +41,140 @@ class ParseResponse(BaseModel):
     output_dir: Optional[str] = None
     files: Optional[List[str]] = None
     download_url: Optional[str] = None
+    # debug profile: rendered after the response, 404 until they are written
+    debug_urls: Optional[List[str]] = None
+
+# Upload and artifact limits
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MONKEYOCR_MAX_UPLOAD_MB", "200")) * 1024 * 1024
+ARTIFACT_TTL_SECONDS = int(os.getenv("MONKEYOCR_ARTIFACT_TTL", "3600"))
+ARTIFACT_QUOTA_BYTES = int(os.getenv("MONKEYOCR_ARTIFACT_QUOTA_MB", "2048")) * 1024 * 1024
+JANITOR_INTERVAL_SECONDS = int(os.getenv("MONKEYOCR_JANITOR_INTERVAL", "300"))
+# Artifacts written per parse when the request does not choose: minimal, standard or debug
+DEFAULT_OUTPUT_PROFILE = os.getenv("MONKEYOCR_OUTPUT_PROFILE", "standard")
+
+class ArtifactJanitor:
+    """
+    Keep download artifacts and per-request work directories under a TTL and a disk quota.
+    Expired entries are removed first, then the oldest ones until the quota is met.
+    Paths held by in-flight requests are never removed. Holds are marker files next to the
+    held path, so they are seen by every worker process sharing the directories.
+    """
+    HOLD_SUFFIX = ".inflight"
+
+    def __init__(self, roots: List[str], ttl_seconds: int, quota_bytes: int):
+        self.roots = roots
+        self.ttl_seconds = ttl_seconds
+        self.quota_bytes = quota_bytes
+
+    def hold(self, path: str):
+        with open(os.path.abspath(path) + self.HOLD_SUFFIX, "w") as f:
+            f.write(str(os.getpid()))
+
+    def release(self, path: str):
+        try:
+            os.unlink(os.path.abspath(path) + self.HOLD_SUFFIX)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _holder_alive(marker: str) -> bool:
+        """A hold is live while the process that wrote it runs"""
+        try:
+            with open(marker) as f:
+                pid = int(f.read().strip())
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        except (OSError, ValueError):
+            # unreadable or half written marker, keep the hold
+            return True
+        return True
+
+    @staticmethod
+    def _entry_size(path: str) -> int:
+        if not os.path.isdir(path):
+            return os.path.getsize(path)
+        total = 0
+        for root, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(root, filename))
+                except OSError:
+                    pass
+        return total
+
+    @staticmethod
+    def _remove(path: str):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def sweep(self):
+        """Remove expired entries, then the oldest ones while over quota. Held entries count
+        against the quota but are never removed."""
+        now = time.time()
+        entries = []
+        held_total = 0
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            names = os.listdir(root)
+            held = set()
+            for name in names:
+                if not name.endswith(self.HOLD_SUFFIX):
+                    continue
+                marker = os.path.join(root, name)
+                if self._holder_alive(marker):
+                    held.add(name[:-len(self.HOLD_SUFFIX)])
+                else:
+                    # the worker holding it died, the entry expires like any other
+                    self._remove(marker)
+            for name in names:
+                if name.endswith(self.HOLD_SUFFIX):
+                    continue
+                path = os.path.abspath(os.path.join(root, name))
+                try:
+                    if name in held:
+                        held_total += self._entry_size(path)
+                        continue
+                    entries.append((os.path.getmtime(path), self._entry_size(path), path))
+                except OSError:
+                    continue
+
+        removed = 0
+        kept = []
+        for mtime, size, path in entries:
+            if now - mtime > self.ttl_seconds:
+                self._remove(path)
+                removed += 1
+            else:
+                kept.append((mtime, size, path))
+
+        total = held_total + sum(size for _, size, _ in kept)
+        for mtime, size, path in sorted(kept):
+            if total <= self.quota_bytes:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"Artifact janitor removed {removed} entries, {total / 1024 / 1024:.1f} MB kept")
+
+    async def run(self, interval: int):
+        while True:
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, self.sweep)
+            except Exception as e:
+                logger.warning(f"Artifact janitor sweep failed: {e}")
+            await asyncio.sleep(interval)
 
 # Global model instance and lock
 monkey_ocr_model = None
@@ -44,17 +183,40 @@ model_lock = asyncio.Lock()
 executor = ThreadPoolExecutor(max_workers=4)
 
 def initialize_model():
-    """Initialize MonkeyOCR model"""
+    """Initialize MonkeyOCR model, or connect to a shared model server if configured"""
     global monkey_ocr_model
     global supports_async
     if monkey_ocr_model is None:
-        config_path = os.getenv("MONKEYOCR_CONFIG", "model_configs.yaml")
-        monkey_ocr_model = MonkeyOCR(config_path)
-        supports_async = is_async_model(monkey_ocr_model)
+        server_address = os.getenv("MONKEYOCR_MODEL_SERVER")
+        if server_address:
+            logger.info(f"Using model server at {server_address}")
+            monkey_ocr_model = RemoteMonkeyOCR(server_address)
+            supports_async = is_async_model(monkey_ocr_model)
+        else:
+            config_path = os.getenv("MONKEYOCR_CONFIG", "model_configs.yaml")
+            # layout and reader load in the background, /health reports when they are ready;
+            # lmdeploy/vllm chat models load here, on the main thread, before the server starts
+            monkey_ocr_model = MonkeyOCR(config_path, block=False)
     return monkey_ocr_model
 
+async def warm_up_model():
+    """Wait for the models, run the warm-up pass and detect async support"""
+    global supports_async
+    loop = asyncio.get_event_loop()
+    try:
+        await loop.run_in_executor(None, monkey_ocr_model.warmup)
+        supports_async = await loop.run_in_executor(None, is_async_model, monkey_ocr_model)
+        model_type = "async-capable" if supports_async else "sync-only"
+        logger.info(f"✅ MonkeyOCR model ready ({model_type})")
+    except Exception as e:
+        logger.error(f"❌ Failed to load MonkeyOCR model: {e}")
+
 def is_async_model(model: MonkeyOCR) -> bool:
     """Check if the model supports async concurrent calls"""
+    if getattr(model, 'is_remote', False):
+        # The model server serializes access to each model itself
+        logger.info("Remote model server detected, no local model lock needed")
+        return True
     if hasattr(model, 'chat_model'):
         chat_model = model.chat_model
         # More specific check for async models
@@ -162,17 +324,20 @@ async def smart_batch_model_call(images_and_questions_list, batch_func):
 async def lifespan(app: FastAPI):
     """Lifespan event handler"""
     # Startup
+    janitor_task = asyncio.create_task(artifact_janitor.run(JANITOR_INTERVAL_SECONDS))
     try:
         initialize_model()
-        model_type = "async-capable" if supports_async else "sync-only"
-        logger.info(f"✅ MonkeyOCR model initialized successfully ({model_type})")
+        logger.info("✅ MonkeyOCR model initialization started")
     except Exception as e:
         logger.info(f"❌ Failed to initialize MonkeyOCR model: {e}")
         raise
+    warmup_task = asyncio.create_task(warm_up_model())
     
     yield
     
     # Shutdown
+    warmup_task.cancel()
+    janitor_task.cancel()
     global executor
     executor.shutdown(wait=True)
     logger.info("🔄 Application shutdown complete")
@@ -186,8 +351,13 @@ app = FastAPI(
 
 temp_dir = os.getenv("TMPDIR", gettempdir())
 logger.info(f"Using temporary directory: {temp_dir}")
-os.makedirs(temp_dir, exist_ok=True)
-app.mount("/static", StaticFiles(directory=temp_dir), name="static")
+# Download artifacts served under /static, and uploads plus per-request outputs
+artifact_dir = os.path.join(temp_dir, "monkeyocr_artifacts")
+work_dir = os.path.join(temp_dir, "monkeyocr_work")
+os.makedirs(artifact_dir, exist_ok=True)
+os.makedirs(work_dir, exist_ok=True)
+app.mount("/static", StaticFiles(directory=artifact_dir), name="static")
+artifact_janitor = ArtifactJanitor([artifact_dir, work_dir], ARTIFACT_TTL_SECONDS, ARTIFACT_QUOTA_BYTES)
 
 @app.get("/")
 async def root():
@@ -196,8 +366,19 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "model_loaded": monkey_ocr_model is not None}
+    """Health check endpoint, 503 until the models are loaded"""
+    if monkey_ocr_model is None:
+        return JSONResponse(status_code=503, content={"status": "starting", "model_loaded": False})
+    readiness = await asyncio.get_event_loop().run_in_executor(None, monkey_ocr_model.readiness)
+    ready = all(state in ("ready", "not loaded") for name, state in readiness.items() if name != "warm")
+    if any(str(state).startswith(("failed", "unreachable")) for state in readiness.values()):
+        status = "unhealthy"
+    else:
+        status = "healthy" if ready else "loading"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": status, "model_loaded": ready, "components": readiness},
+    )
 
 @app.post("/ocr/text", response_model=TaskResponse)
 async def extract_text(file: UploadFile = File(...)):
@@ -215,18 +396,129 @@ async def extract_table(file: UploadFile = File(...)):
     return await perform_ocr_task(file, "table")
 
 @app.post("/parse", response_model=ParseResponse)
-async def parse_document(file: UploadFile = File(...)):
+async def parse_document(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                         profile: Optional[str] = None):
     """Parse complete document (PDF or image)"""
-    return await parse_document_internal(file, split_pages=False)
+    return await parse_document_internal(file, background_tasks, split_pages=False, profile=profile)
 
 @app.post("/parse/split", response_model=ParseResponse)
-async def parse_document_split(file: UploadFile = File(...)):
+async def parse_document_split(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                               profile: Optional[str] = None):
     """Parse complete document and split result by pages (PDF or image)"""
-    return await parse_document_internal(file, split_pages=True)
+    return await parse_document_internal(file, background_tasks, split_pages=True, profile=profile)
+
+@app.post("/parse/stream")
+async def parse_document_stream(file: UploadFile = File(...), split_pages: bool = False,
+                                profile: Optional[str] = None):
+    """Parse complete document and stream the results back as a ZIP archive"""
+    request_dir, result_dir, original_name, debug_jobs = await parse_upload(file, split_pages, profile)
+    suffix = "_split" if split_pages else "_parsed"
+    zip_filename = f"{original_name}{suffix}.zip"
+
+    def cleanup():
+        shutil.rmtree(request_dir, ignore_errors=True)
+        artifact_janitor.release(request_dir)
+
+    background_tasks = BackgroundTasks()
+    background_tasks.add_task(cleanup)
+    headers = {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(zip_filename)}"}
+    debug_urls = schedule_debug_renders(background_tasks, debug_jobs, original_name)
+    if debug_urls:
+        headers["X-Debug-Urls"] = ",".join(quote(url) for url in debug_urls)
+
+    return StreamingResponse(
+        iter_zip_stream(zip_entries(result_dir, original_name, split_pages)),
+        media_type="application/zip",
+        headers=headers,
+        background=background_tasks,
+    )
+
+async def save_upload(file: UploadFile, dest_path: str):
+    """Stream an upload to disk in chunks, rejecting it once it exceeds MAX_UPLOAD_BYTES"""
+    size = 0
+    try:
+        with open(dest_path, "wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"
+                    )
+                f.write(chunk)
+    except BaseException:
+        try:
+            os.unlink(dest_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return dest_path
 
-async def async_parse_file(input_file_path: str, output_dir: str, split_pages: bool = False):
+async def parse_upload(file: UploadFile, split_pages: bool,
+                       profile: Optional[str] = None) -> Tuple[str, str, str, list]:
     """
-    Optimized async version of parse_file that breaks down processing into async chunks
+    Validate and store the upload, then parse it inside a fresh work directory.
+    profile selects the artifacts written (minimal/standard/debug), DEFAULT_OUTPUT_PROFILE when not given.
+    Returns the request directory (held from the janitor until released), the result directory,
+    the original file name without extension and the debug PDFs still to render
+    (see schedule_debug_renders).
+    """
+    if not monkey_ocr_model:
+        raise HTTPException(status_code=500, detail="Model not initialized")
+
+    # Validate file type - support both PDF and image files
+    allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png'}
+    file_ext_with_dot = os.path.splitext(file.filename)[1].lower() if file.filename else ''
+
+    if file_ext_with_dot not in allowed_extensions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file_ext_with_dot}. Allowed: {', '.join(allowed_extensions)}"
+        )
+
+    profile = profile or DEFAULT_OUTPUT_PROFILE
+    try:
+        profile_artifacts(profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Get original filename without extension
+    original_name = '.'.join(file.filename.split('.')[:-1])
+
+    import uuid
+    unique_suffix = str(uuid.uuid4())[:8]
+    request_dir = tempfile.mkdtemp(prefix=f"monkeyocr_parse_{unique_suffix}_", dir=work_dir)
+    artifact_janitor.hold(request_dir)
+    debug_jobs = []
+    try:
+        upload_path = os.path.join(request_dir, f"upload_{unique_suffix}{file_ext_with_dot}")
+        await save_upload(file, upload_path)
+        try:
+            result_dir = await async_parse_file(
+                upload_path, os.path.join(request_dir, "output"), split_pages, profile, debug_jobs
+            )
+        finally:
+            os.unlink(upload_path)
+    except HTTPException:
+        shutil.rmtree(request_dir, ignore_errors=True)
+        artifact_janitor.release(request_dir)
+        raise
+    except Exception as e:
+        shutil.rmtree(request_dir, ignore_errors=True)
+        artifact_janitor.release(request_dir)
+        logger.error(f"Parsing failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Parsing failed: {str(e)}")
+    return request_dir, result_dir, original_name, debug_jobs
+
+async def async_parse_file(input_file_path: str, output_dir: str, split_pages: bool = False,
+                           profile: str = DEFAULT_OUTPUT_PROFILE, debug_jobs: Optional[list] = None):
+    """
+    Optimized async version of parse_file that breaks down processing into async chunks.
+    The debug PDFs of the profile are not drawn, they are added to debug_jobs for
+    schedule_debug_renders.
     """
     import asyncio
     from concurrent.futures import ThreadPoolExecutor
@@ -303,13 +595,15 @@ async def async_parse_file(input_file_path: str, output_dir: str, split_pages: b
     # Process results asynchronously
     await process_inference_results_async(
         infer_result, output_dir, safe_name, 
-        local_image_dir, local_md_dir, image_dir, split_pages
+        local_image_dir, local_md_dir, image_dir, split_pages, profile,
+        debug_jobs if debug_jobs is not None else []
     )
     
     return local_md_dir
 
 async def process_inference_results_async(infer_result, output_dir, name_without_suff, 
-                                        local_image_dir, local_md_dir, image_dir, split_pages):
+                                        local_image_dir, local_md_dir, image_dir, split_pages, profile,
+                                        debug_jobs):
     """
     Process inference results asynchronously
     """
@@ -328,7 +622,7 @@ async def process_inference_results_async(infer_result, output_dir, name_without
         tasks = []
         for page_idx, page_infer_result in enumerate(infer_result):
             task = process_single_page_async(
-                page_infer_result, page_idx, output_dir, name_without_suff
+                page_infer_result, page_idx, output_dir, name_without_suff, profile, debug_jobs
             )
             tasks.append(task)
         
@@ -340,10 +634,50 @@ async def process_inference_results_async(infer_result, output_dir, name_without
         # Process single result
         logger.info("Processing as single result...")
         await process_single_result_async(
-            infer_result, name_without_suff, local_image_dir, local_md_dir, image_dir
+            infer_result, name_without_suff, local_image_dir, local_md_dir, image_dir, profile, debug_jobs
         )
 
-async def process_single_page_async(page_infer_result, page_idx, output_dir, name_without_suff):
+async def dump_results_async(pipe_result, infer_result, md_writer, name, image_dir, profile,
+                             debug_jobs, label=""):
+    """
+    Write the artifacts of the output profile. The debug PDF is kept off the request: it is
+    added to debug_jobs as (label, pipe_result, infer_result) and rendered after the response.
+    """
+    await asyncio.get_event_loop().run_in_executor(
+        None, lambda: pipe_result.dump_profile(md_writer, name, image_dir, profile, overlays=False)
+    )
+    if OutputArtifact.DEBUG_PDF in profile_artifacts(profile):
+        debug_jobs.append((label, pipe_result, infer_result))
+
+def render_debug_pdf(pipe_result, infer_result, path: str):
+    """Draw a debug PDF into the artifact directory, run as a background task"""
+    from magic_pdf.data.data_reader_writer import FileBasedDataWriter
+
+    try:
+        pipe_result.draw_debug(FileBasedDataWriter(os.path.dirname(path)), os.path.basename(path), infer_result)
+    except Exception as e:
+        logger.error(f"Debug PDF {os.path.basename(path)} failed: {e}")
+    finally:
+        artifact_janitor.release(path)
+
+def schedule_debug_renders(background_tasks: BackgroundTasks, debug_jobs: list, original_name: str) -> List[str]:
+    """
+    Render the debug PDFs of a request after its response is sent, into the artifact directory.
+    Returns their download URLs, which answer 404 until the rendering is done.
+    """
+    import uuid
+
+    unique_suffix = str(uuid.uuid4())[:8]
+    urls = []
+    for label, pipe_result, infer_result in debug_jobs:
+        filename = f"{original_name}{label}_{unique_suffix}_debug.pdf"
+        path = os.path.join(artifact_dir, filename)
+        artifact_janitor.hold(path)
+        background_tasks.add_task(render_debug_pdf, pipe_result, infer_result, path)
+        urls.append(f"/static/{filename}")
+    return urls
+
+async def process_single_page_async(page_infer_result, page_idx, output_dir, name_without_suff, profile, debug_jobs):
     """
     Process a single page result asynchronously
     """
@@ -379,19 +713,19 @@ async def process_single_page_async(page_infer_result, page_idx, output_dir, nam
         
         # Pipeline processing for this page
         page_pipe_result = page_infer_result.pipe_ocr_mode(page_image_writer, MonkeyOCR_model=monkey_ocr_model)
-        
-        # Save page-specific results
-        page_infer_result.draw_model(os.path.join(page_local_md_dir, f"{name_without_suff}_page_{page_idx}_model.pdf"))
-        page_pipe_result.draw_layout(os.path.join(page_local_md_dir, f"{name_without_suff}_page_{page_idx}_layout.pdf"))
-        page_pipe_result.draw_span(os.path.join(page_local_md_dir, f"{name_without_suff}_page_{page_idx}_spans.pdf"))
-        page_pipe_result.dump_md(page_md_writer, f"{name_without_suff}_page_{page_idx}.md", page_image_dir)
-        page_pipe_result.dump_content_list(page_md_writer, f"{name_without_suff}_page_{page_idx}_content_list.json", page_image_dir)
-        page_pipe_result.dump_middle_json(page_md_writer, f'{name_without_suff}_page_{page_idx}_middle.json')
+        return page_pipe_result, page_md_writer
     
     # Run page processing in thread pool
-    await asyncio.get_event_loop().run_in_executor(None, process_page_sync)
+    page_pipe_result, page_md_writer = await asyncio.get_event_loop().run_in_executor(None, process_page_sync)
+    
+    # Save page-specific results
+    await dump_results_async(
+        page_pipe_result, page_infer_result, page_md_writer,
+        f"{name_without_suff}_page_{page_idx}", page_image_dir, profile, debug_jobs, f"_page_{page_idx}"
+    )
 
-async def process_single_result_async(infer_result, name_without_suff, local_image_dir, local_md_dir, image_dir):
+async def process_single_result_async(infer_result, name_without_suff, local_image_dir, local_md_dir, image_dir,
+                                      profile, debug_jobs):
     """
     Process single result asynchronously
     """
@@ -403,17 +737,13 @@ async def process_single_result_async(infer_result, name_without_suff, local_ima
         
         # Pipeline processing for single result
         pipe_result = infer_result.pipe_ocr_mode(image_writer, MonkeyOCR_model=monkey_ocr_model)
-        
-        # Save single result
-        infer_result.draw_model(os.path.join(local_md_dir, f"{name_without_suff}_model.pdf"))
-        pipe_result.draw_layout(os.path.join(local_md_dir, f"{name_without_suff}_layout.pdf"))
-        pipe_result.draw_span(os.path.join(local_md_dir, f"{name_without_suff}_spans.pdf"))
-        pipe_result.dump_md(md_writer, f"{name_without_suff}.md", image_dir)
-        pipe_result.dump_content_list(md_writer, f"{name_without_suff}_content_list.json", image_dir)
-        pipe_result.dump_middle_json(md_writer, f'{name_without_suff}_middle.json')
+        return pipe_result, md_writer
     
     # Run processing in thread pool
-    await asyncio.get_event_loop().run_in_executor(None, process_single_sync)
+    pipe_result, md_writer = await asyncio.get_event_loop().run_in_executor(None, process_single_sync)
+    
+    # Save single result
+    await dump_results_async(pipe_result, infer_result, md_writer, name_without_suff, image_dir, profile, debug_jobs)
 
 async def async_single_task_recognition(input_file_path: str, output_dir: str, task: str):
     """
@@ -444,49 +774,52 @@ async def async_single_task_recognition(input_file_path: str, output_dir: str, t
     await asyncio.get_event_loop().run_in_executor(None, create_dir_safe, local_md_dir)
     
     # Get task instruction
-    from parse import TASK_INSTRUCTIONS
+    from parse import TASK_INSTRUCTIONS, iter_task_images
+    from magic_pdf.data.utils import iter_batches
     instruction = TASK_INSTRUCTIONS.get(task, TASK_INSTRUCTIONS['text'])
     
-    # Load images asynchronously
-    def load_images_sync():
-        file_extension = input_file_path.split(".")[-1].lower()
-        images = []
-        
-        if file_extension == 'pdf':
-            from pdf2image import convert_from_path
-            images = convert_from_path(input_file_path, dpi=150)
-        elif file_extension in ['jpg', 'jpeg', 'png']:
-            from PIL import Image
-            images = [Image.open(input_file_path)]
-        else:
-            raise ValueError(f"Unsupported file extension: {file_extension}")
-        
-        return images, file_extension
+    file_extension = input_file_path.split(".")[-1].lower()
+    if file_extension not in ['pdf', 'jpg', 'jpeg', 'png']:
+        raise ValueError(f"Unsupported file extension: {file_extension}")
     
-    images, file_extension = await asyncio.get_event_loop().run_in_executor(None, load_images_sync)
+    # Render pages in the thread pool one chunk at a time, so only one chunk of
+    # page images is held in memory
+    chunk_size = monkey_ocr_model.chat_config.get('page_chunk_size', 16)
+    chunks = iter_batches(iter_task_images(input_file_path), chunk_size)
+    loop = asyncio.get_event_loop()
     
-    # Perform recognition
-    logger.info(f"Performing {task} recognition on {len(images)} image(s)...")
+    logger.info(f"Performing {task} recognition on {input_file_path}...")
     start_time = time.time()
     
-    # Prepare instructions for all images
-    instructions = [instruction] * len(images)
-    
-    # Use chat model for recognition
-    if supports_async and hasattr(monkey_ocr_model.chat_model, 'async_batch_inference'):
-        # Use async batch inference if available
+    responses = []
+    while True:
+        images = await loop.run_in_executor(None, next, chunks, None)
+        if images is None:
+            break
+        
+        # Prepare instructions for all images
+        instructions = [instruction] * len(images)
+        
         try:
-            responses = await monkey_ocr_model.chat_model.async_batch_inference(images, instructions)
-        except Exception as e:
-            logger.warning(f"Async batch inference failed: {e}, falling back to sync")
-            responses = await asyncio.get_event_loop().run_in_executor(
-                None, monkey_ocr_model.chat_model.batch_inference, images, instructions
-            )
-    else:
-        # Use sync batch inference in thread pool
-        responses = await asyncio.get_event_loop().run_in_executor(
-            None, monkey_ocr_model.chat_model.batch_inference, images, instructions
-        )
+            # Use chat model for recognition
+            if supports_async and hasattr(monkey_ocr_model.chat_model, 'async_batch_inference'):
+                # Use async batch inference if available
+                try:
+                    chunk_responses = await monkey_ocr_model.chat_model.async_batch_inference(images, instructions)
+                except Exception as e:
+                    logger.warning(f"Async batch inference failed: {e}, falling back to sync")
+                    chunk_responses = await loop.run_in_executor(
+                        None, monkey_ocr_model.chat_model.batch_inference, images, instructions
+                    )
+            else:
+                # Use sync batch inference in thread pool
+                chunk_responses = await loop.run_in_executor(
+                    None, monkey_ocr_model.chat_model.batch_inference, images, instructions
+                )
+        finally:
+            for img in images:
+                img.close()
+        responses.extend(chunk_responses)
     
     recognition_time = time.time() - start_time
     logger.info(f"Recognition time: {recognition_time:.2f}s")
@@ -498,10 +831,7 @@ async def async_single_task_recognition(input_file_path: str, output_dir: str, t
         md_writer = FileBasedDataWriter(local_md_dir)
         
         # Combine results
-        combined_result = responses[0]
-        for i, response in enumerate(responses):
-            if i > 0:
-                combined_result = combined_result + "\n\n" + response
+        combined_result = "\n\n".join(responses)
         
         # Save result with original name (without unique suffix)
         result_filename = f"{name_without_suff}_{task}_result.md"
@@ -514,149 +844,160 @@ async def async_single_task_recognition(input_file_path: str, output_dir: str, t
     logger.info(f"Single task recognition completed!")
     logger.info(f"Result saved to: {os.path.join(local_md_dir, result_filename)}")
     
-    # Clean up images
-    def cleanup_images():
-        try:
-            for img in images:
-                if hasattr(img, 'close'):
-                    img.close()
-        except Exception as cleanup_error:
-            logger.warning(f"Warning: Error during cleanup: {cleanup_error}")
-    
-    await asyncio.get_event_loop().run_in_executor(None, cleanup_images)
-    
     return local_md_dir
 
-async def parse_document_internal(file: UploadFile, split_pages: bool = False):
+async def parse_document_internal(file: UploadFile, background_tasks: BackgroundTasks, split_pages: bool = False,
+                                  profile: Optional[str] = None):
     """Internal function to parse document with optional page splitting"""
+    request_dir, result_dir, original_name, debug_jobs = await parse_upload(file, split_pages, profile)
     try:
-        if not monkey_ocr_model:
-            raise HTTPException(status_code=500, detail="Model not initialized")
-        
-        # Validate file type - support both PDF and image files
-        allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png'}
-        file_ext_with_dot = os.path.splitext(file.filename)[1].lower() if file.filename else ''
-        
-        if file_ext_with_dot not in allowed_extensions:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Unsupported file type: {file_ext_with_dot}. Allowed: {', '.join(allowed_extensions)}"
-            )
-        
-        # Get original filename without extension
-        original_name = '.'.join(file.filename.split('.')[:-1])
-        
-        # Save uploaded file temporarily with unique name to avoid conflicts
+        # List generated files
+        files = []
+        if os.path.exists(result_dir):
+            for root, dirs, filenames in os.walk(result_dir):
+                for filename in filenames:
+                    rel_path = os.path.relpath(os.path.join(root, filename), result_dir)
+                    files.append(rel_path)
+
+        # Create download URL with original filename and timestamp
+        suffix = "_split" if split_pages else "_parsed"
+        timestamp = int(time.time() * 1000)  # Use milliseconds for better uniqueness
         import uuid
         unique_suffix = str(uuid.uuid4())[:8]
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext_with_dot, prefix=f"upload_{unique_suffix}_") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
+        zip_filename = f"{original_name}{suffix}_{timestamp}_{unique_suffix}.zip"
+        zip_path = os.path.join(artifact_dir, zip_filename)
+
+        # Create ZIP file asynchronously, then make room for it right away instead of at the next sweep
+        artifact_janitor.hold(zip_path)
         try:
-            # Create output directory with unique name
-            output_dir = tempfile.mkdtemp(prefix=f"monkeyocr_parse_{unique_suffix}_")
-            
-            # Use optimized async parse function
-            result_dir = await async_parse_file(temp_file_path, output_dir, split_pages)
-            
-            # List generated files
-            files = []
-            if os.path.exists(result_dir):
-                for root, dirs, filenames in os.walk(result_dir):
-                    for filename in filenames:
-                        rel_path = os.path.relpath(os.path.join(root, filename), result_dir)
-                        files.append(rel_path)
-            
-            # Create download URL with original filename and timestamp
-            suffix = "_split" if split_pages else "_parsed"
-            timestamp = int(time.time() * 1000)  # Use milliseconds for better uniqueness
-            zip_filename = f"{original_name}{suffix}_{timestamp}_{unique_suffix}.zip"
-            zip_path = os.path.join(temp_dir, zip_filename)
-            
-            # Create ZIP file asynchronously
             await create_zip_file_async(result_dir, zip_path, original_name, split_pages)
-            
-            download_url = f"/static/{zip_filename}"
-            
-            # Determine file type for response message
-            file_type = "PDF" if file_ext_with_dot == '.pdf' else "image"
-            parse_type = "with page splitting" if split_pages else "standard"
-            
-            return ParseResponse(
-                success=True,
-                message=f"{file_type} parsing ({parse_type}) completed successfully",
-                output_dir=result_dir,
-                files=files,
-                download_url=download_url
-            )
-            
+            await asyncio.get_event_loop().run_in_executor(None, artifact_janitor.sweep)
         finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_file_path)
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup temp file {temp_file_path}: {cleanup_error}")
-            
+            artifact_janitor.release(zip_path)
+
+        download_url = f"/static/{zip_filename}"
+
+        # Determine file type for response message
+        file_type = "PDF" if os.path.splitext(file.filename)[1].lower() == '.pdf' else "image"
+        parse_type = "with page splitting" if split_pages else "standard"
+
+        return ParseResponse(
+            success=True,
+            message=f"{file_type} parsing ({parse_type}) completed successfully",
+            output_dir=result_dir,
+            files=files,
+            download_url=download_url,
+            debug_urls=schedule_debug_renders(background_tasks, debug_jobs, original_name) or None,
+        )
     except Exception as e:
         logger.error(f"Parsing failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Parsing failed: {str(e)}")
+    finally:
+        # Results stay available until the janitor expires them
+        artifact_janitor.release(request_dir)
+
+def zip_entries(result_dir: str, original_name: str, split_pages: bool) -> List[Tuple[str, str]]:
+    """Map every file under result_dir to its name inside the download archive"""
+    entries = []
+    for root, dirs, filenames in os.walk(result_dir):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            rel_path = os.path.relpath(file_path, result_dir)
+
+            if split_pages:
+                # For split pages, maintain the page directory structure
+                # but add original name prefix
+                if rel_path.startswith('page_'):
+                    # Keep the page structure: page_0/filename -> page_0/original_name_filename
+                    parts = rel_path.split('/', 1)
+                    if len(parts) == 2:
+                        page_dir, filename_part = parts
+                        if filename_part.startswith('images/'):
+                            # Handle images: page_0/images/img.jpg -> page_0/images/original_name_img.jpg
+                            img_name = filename_part.replace('images/', '')
+                            new_filename = f"{page_dir}/images/{original_name}_{img_name}"
+                        else:
+                            # Handle other files in page directories
+                            new_filename = f"{page_dir}/{original_name}_{filename_part}"
+                    else:
+                        new_filename = f"{original_name}_{rel_path}"
+                else:
+                    new_filename = f"{original_name}_{rel_path}"
+            else:
+                # Handle different file types
+                if filename.endswith('.md'):
+                    new_filename = f"{original_name}.md"
+                elif filename.endswith('_content_list.json'):
+                    new_filename = f"{original_name}_content_list.json"
+                elif filename.endswith('_middle.json'):
+                    new_filename = f"{original_name}_middle.json"
+                elif filename.endswith('_middle.index.json'):
+                    new_filename = f"{original_name}_middle.index.json"
+                elif filename.endswith('_model.pdf'):
+                    new_filename = f"{original_name}_model.pdf"
+                elif filename.endswith('_layout.pdf'):
+                    new_filename = f"{original_name}_layout.pdf"
+                elif filename.endswith('_spans.pdf'):
+                    new_filename = f"{original_name}_spans.pdf"
+                elif filename.endswith('_debug.pdf'):
+                    new_filename = f"{original_name}_debug.pdf"
+                else:
+                    # For images and other files, keep relative path structure but rename
+                    if 'images/' in rel_path:
+                        # Keep images in images subfolder with original name prefix
+                        image_name = os.path.basename(rel_path)
+                        new_filename = f"images/{original_name}_{image_name}"
+                    else:
+                        new_filename = f"{original_name}_{filename}"
+
+            entries.append((file_path, new_filename))
+    return entries
+
+class _ZipStreamSink(io.RawIOBase):
+    """Unseekable sink collecting what zipfile writes so it can be yielded in chunks"""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+def iter_zip_stream(entries: List[Tuple[str, str]]):
+    """Generate a ZIP archive on the fly, without writing it to disk"""
+    sink = _ZipStreamSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for file_path, arcname in entries:
+            zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            with open(file_path, 'rb') as src, zipf.open(zinfo, 'w') as dst:
+                while True:
+                    chunk = src.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
 
 async def create_zip_file_async(result_dir, zip_path, original_name, split_pages):
     """Create ZIP file asynchronously"""
     def create_zip_sync():
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, filenames in os.walk(result_dir):
-                for filename in filenames:
-                    file_path = os.path.join(root, filename)
-                    rel_path = os.path.relpath(file_path, result_dir)
-                    
-                    if split_pages:
-                        # For split pages, maintain the page directory structure
-                        # but add original name prefix
-                        if rel_path.startswith('page_'):
-                            # Keep the page structure: page_0/filename -> page_0/original_name_filename
-                            parts = rel_path.split('/', 1)
-                            if len(parts) == 2:
-                                page_dir, filename_part = parts
-                                if filename_part.startswith('images/'):
-                                    # Handle images: page_0/images/img.jpg -> page_0/images/original_name_img.jpg
-                                    img_name = filename_part.replace('images/', '')
-                                    new_filename = f"{page_dir}/images/{original_name}_{img_name}"
-                                else:
-                                    # Handle other files in page directories
-                                    new_filename = f"{page_dir}/{original_name}_{filename_part}"
-                            else:
-                                new_filename = f"{original_name}_{rel_path}"
-                        else:
-                            new_filename = f"{original_name}_{rel_path}"
-                    else:
-                        # Handle different file types
-                        if filename.endswith('.md'):
-                            new_filename = f"{original_name}.md"
-                        elif filename.endswith('_content_list.json'):
-                            new_filename = f"{original_name}_content_list.json"
-                        elif filename.endswith('_middle.json'):
-                            new_filename = f"{original_name}_middle.json"
-                        elif filename.endswith('_model.pdf'):
-                            new_filename = f"{original_name}_model.pdf"
-                        elif filename.endswith('_layout.pdf'):
-                            new_filename = f"{original_name}_layout.pdf"
-                        elif filename.endswith('_spans.pdf'):
-                            new_filename = f"{original_name}_spans.pdf"
-                        else:
-                            # For images and other files, keep relative path structure but rename
-                            if 'images/' in rel_path:
-                                # Keep images in images subfolder with original name prefix
-                                image_name = os.path.basename(rel_path)
-                                new_filename = f"images/{original_name}_{image_name}"
-                            else:
-                                new_filename = f"{original_name}_{filename}"
-                    
-                    zipf.write(file_path, new_filename)
-    
+            for file_path, new_filename in zip_entries(result_dir, original_name, split_pages):
+                zipf.write(file_path, new_filename)
+
     # Run ZIP creation in thread pool to avoid blocking
     await asyncio.get_event_loop().run_in_executor(None, create_zip_sync)
 
@@ -679,14 +1020,12 @@ async def perform_ocr_task(file: UploadFile, task_type: str) -> TaskResponse:
         import uuid
         unique_suffix = str(uuid.uuid4())[:8]
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext, prefix=f"ocr_{unique_suffix}_") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        request_dir = tempfile.mkdtemp(prefix=f"monkeyocr_{task_type}_{unique_suffix}_", dir=work_dir)
+        artifact_janitor.hold(request_dir)
         
         try:
-            # Create output directory with unique name
-            output_dir = tempfile.mkdtemp(prefix=f"monkeyocr_{task_type}_{unique_suffix}_")
+            temp_file_path = await save_upload(file, os.path.join(request_dir, f"ocr_{unique_suffix}{file_ext}"))
+            output_dir = os.path.join(request_dir, "output")
             
             # Use optimized async single task recognition
             result_dir = await async_single_task_recognition(temp_file_path, output_dir, task_type)
@@ -711,12 +1050,13 @@ async def perform_ocr_task(file: UploadFile, task_type: str) -> TaskResponse:
             )
             
         finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_file_path)
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup temp file {temp_file_path}: {cleanup_error}")
+            # Clean up the upload and intermediate results
+            shutil.rmtree(request_dir, ignore_errors=True)
+            artifact_janitor.release(request_dir)
             
+    except HTTPException:
+        # an oversized upload (413) or a rejected request keeps its status code
+        raise
     except Exception as e:
         logger.error(f"OCR task failed: {str(e)}")
         return TaskResponse(
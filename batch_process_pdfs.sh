@@ -112,8 +112,17 @@ echo "=================================================="
 total_files=${#PDF_FILES[@]}
 success_count=0
 failed_count=0
+skipped_count=0
 failed_files=()
 
+# 运行清单：记录每个文件的内容哈希、状态和输出位置，重新运行时跳过已完成的文件
+MANIFEST="${MANIFEST:-$OUTPUT_DIR/.batch_manifest.sqlite}"
+MAX_RETRIES="${MAX_RETRIES:-3}"
+manifest() {
+    # 从脚本目录导入magic_pdf，与当前工作目录无关
+    PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}" python -m magic_pdf.data.run_manifest "$@" --max-retries "$MAX_RETRIES"
+}
+
 # 处理每个PDF文件
 for i in "${!PDF_FILES[@]}"; do
     file="${PDF_FILES[$i]}"
@@ -124,11 +133,36 @@ for i in "${!PDF_FILES[@]}"; do
     echo "📄 处理文件 $file_num/$total_files: $filename"
     echo "--------------------------------------------------"
     
+    # 查询运行清单：0 需要处理，10 已完成或重试次数用尽，11 与已处理文件内容相同，其他为清单错误
+    canonical_output=$(manifest check "$MANIFEST" "$file")
+    check_status=$?
+    if [ $check_status -eq 10 ]; then
+        echo "⏭️  已处理过，跳过: $filename"
+        ((skipped_count++))
+        continue
+    elif [ $check_status -eq 11 ]; then
+        if [ -n "$canonical_output" ] && [ ! -e "$OUTPUT_DIR/${filename%.*}" ]; then
+            ln -s "$canonical_output" "$OUTPUT_DIR/${filename%.*}"
+        fi
+        echo "🔗 内容与已处理文件相同，已链接结果: $filename"
+        ((success_count++))
+        continue
+    elif [ $check_status -ne 0 ]; then
+        echo "❌ 运行清单查询失败 (退出码 $check_status): $MANIFEST"
+        exit 1
+    fi
+    
     # 使用parse_enhanced.py处理文件
+    if ! manifest record "$MANIFEST" "$file" --status running; then
+        echo "❌ 运行清单写入失败: $MANIFEST"
+        exit 1
+    fi
     if python "$SCRIPT_DIR/parse_enhanced.py" "$file" -o "$OUTPUT_DIR"; then
+        manifest record "$MANIFEST" "$file" --status done --output "$OUTPUT_DIR/${filename%.*}"
         echo "✅ 成功处理: $filename"
         ((success_count++))
     else
+        manifest record "$MANIFEST" "$file" --status failed --error "parse_enhanced.py exited with an error"
         echo "❌ 处理失败: $filename"
         ((failed_count++))
         failed_files+=("$filename")
@@ -145,6 +179,7 @@ echo "📊 处理统计:"
 echo "   总文件数: $total_files"
 echo "   成功处理: $success_count"
 echo "   处理失败: $failed_count"
+echo "   跳过(已完成): $skipped_count"
 
 if [ $failed_count -gt 0 ]; then
     echo ""
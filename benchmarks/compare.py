@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Compare two benchmark result files and flag regressions.
+
+Exits with status 1 when any workload of the current run is worse than the
+baseline beyond the thresholds, so it can gate CI.
+
+    python benchmarks/compare.py benchmarks/results/base.json benchmarks/results/mock.json
+"""
+import json
+import sys
+from argparse import ArgumentParser
+
+
+def _relative_change(base: float, current: float) -> float:
+    if not base:
+        return 0.0
+    return (current - base) / base
+
+
+def compare(baseline: dict, current: dict, args) -> list:
+    """Rows of (workload, metric, base, current, change, regressed)."""
+    rows = []
+    for name, base in baseline['workloads'].items():
+        cur = current['workloads'].get(name)
+        if cur is None or 'skipped' in base or 'skipped' in cur:
+            continue
+
+        change = _relative_change(base['pages_per_s'], cur['pages_per_s'])
+        rows.append((name, 'pages_per_s', base['pages_per_s'], cur['pages_per_s'], change,
+                     change < -args.max_throughput_drop))
+
+        if 'peak_rss_mb' in base and 'peak_rss_mb' in cur:
+            change = _relative_change(base['peak_rss_mb'], cur['peak_rss_mb'])
+            rows.append((name, 'peak_rss_mb', base['peak_rss_mb'], cur['peak_rss_mb'], change,
+                         change > args.max_rss_increase))
+
+        if 'vlm_requests_per_page' in base and 'vlm_requests_per_page' in cur:
+            change = _relative_change(base['vlm_requests_per_page'], cur['vlm_requests_per_page'])
+            rows.append((name, 'vlm_requests_per_page', base['vlm_requests_per_page'],
+                         cur['vlm_requests_per_page'], change, change > args.max_vlm_increase))
+
+        # stage times per page, short stages are too noisy to judge
+        for stage, seconds in base.get('stages_s', {}).items():
+            if stage not in cur.get('stages_s', {}):
+                continue
+            base_per_page = seconds / base['pages']
+            cur_per_page = cur['stages_s'][stage] / cur['pages']
+            change = _relative_change(base_per_page, cur_per_page)
+            regressed = seconds >= args.min_stage_s and change > args.max_stage_increase
+            rows.append((name, f'{stage}_s_per_page', round(base_per_page, 4), round(cur_per_page, 4),
+                         change, regressed))
+    return rows
+
+
+def main():
+    parser = ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--max-throughput-drop', type=float, default=0.10,
+                        help='Allowed relative pages/s drop (default 0.10)')
+    parser.add_argument('--max-rss-increase', type=float, default=0.15,
+                        help='Allowed relative peak RSS increase (default 0.15)')
+    parser.add_argument('--max-vlm-increase', type=float, default=0.0,
+                        help='Allowed relative increase of VLM requests per page (default 0)')
+    parser.add_argument('--max-stage-increase', type=float, default=0.20,
+                        help='Allowed relative increase of a stage time per page (default 0.20)')
+    parser.add_argument('--min-stage-s', type=float, default=0.5,
+                        help='Stages shorter than this in the baseline are not judged (default 0.5)')
+    args = parser.parse_args()
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+
+    for key in ('chat_backend', 'device', 'layout_model'):
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            print(f"warning: {key} differs: {baseline['meta'].get(key)} vs {current['meta'].get(key)}")
+
+    rows = compare(baseline, current, args)
+    print(f"{'workload':<14} {'metric':<32} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, metric, base, cur, change, regressed in rows:
+        flag = '  ❌ regression' if regressed else ''
+        print(f'{name:<14} {metric:<32} {base:>10} {cur:>10} {change:>+8.1%}{flag}')
+
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f'{len(regressions)} regression(s)')
+        sys.exit(1)
+    print('✅ no regressions')
+
+
+if __name__ == '__main__':
+    main()
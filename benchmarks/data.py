@@ -0,0 +1,89 @@
+"""Inputs of the benchmark workloads.
+
+Everything is derived from the demo PDFs or generated deterministically, and
+cached under ``benchmarks/.data`` so repeated runs parse identical bytes.
+"""
+import os
+import random
+from typing import List
+
+import fitz
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEMO_PDFS = [os.path.join(ROOT, 'demo', 'demo1.pdf'), os.path.join(ROOT, 'demo', 'demo2.pdf')]
+DATA_DIR = os.path.join(ROOT, 'benchmarks', '.data')
+
+_WORDS = (
+    'the of and to in is that for it as with was on be by this are or from at which an have not '
+    'document layout table formula figure caption section result method model page text analysis '
+    'performance recognition structure reading order parsing system value measure sample data'
+).split()
+
+
+def _cached(name: str, build) -> str:
+    path = os.path.join(DATA_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        build(tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def single_page_pdf() -> str:
+    """First page of demo1.pdf."""
+    def build(path):
+        with fitz.open(DEMO_PDFS[0]) as src, fitz.open() as doc:
+            doc.insert_pdf(src, from_page=0, to_page=0)
+            doc.save(path)
+    return _cached('single_page.pdf', build)
+
+
+def text_pdf(pages: int = 100) -> str:
+    """Born-digital PDF of ``pages`` distinct pages with a title and paragraphs."""
+    def build(path):
+        rng = random.Random(pages)
+        with fitz.open() as doc:
+            for page_no in range(pages):
+                page = doc.new_page(width=612, height=792)
+                page.insert_text((72, 80), f'Section {page_no + 1}: {rng.choice(_WORDS).title()} analysis', fontsize=16)
+                y = 110
+                while y < 700:
+                    words = [rng.choice(_WORDS) for _ in range(rng.randint(40, 90))]
+                    paragraph = ' '.join(words).capitalize() + '.'
+                    rect = fitz.Rect(72, y, 540, y + 140)
+                    # returns the unused height of the box
+                    spare = page.insert_textbox(rect, paragraph, fontsize=10)
+                    y = rect.y1 - max(spare, 0) + 14
+            doc.save(path)
+    return _cached(f'text_{pages}.pdf', build)
+
+
+def scanned_pdf(dpi: int = 150) -> str:
+    """Image-only PDF of the demo pages, without a text layer."""
+    def build(path):
+        with fitz.open() as doc:
+            for demo in DEMO_PDFS:
+                with fitz.open(demo) as src:
+                    for src_page in src:
+                        pix = src_page.get_pixmap(dpi=dpi)
+                        page = doc.new_page(width=src_page.rect.width, height=src_page.rect.height)
+                        # scanners mostly produce JPEG pages
+                        page.insert_image(page.rect, stream=pix.tobytes('jpeg'))
+            doc.save(path)
+    return _cached(f'scanned_{dpi}.pdf', build)
+
+
+def image_folder(dpi: int = 150) -> List[str]:
+    """PNG renderings of the demo pages, one file per page."""
+    folder = os.path.join(DATA_DIR, f'images_{dpi}')
+    if not os.path.isdir(folder):
+        tmp_folder = f'{folder}.tmp'
+        os.makedirs(tmp_folder, exist_ok=True)
+        for demo in DEMO_PDFS:
+            name = os.path.splitext(os.path.basename(demo))[0]
+            with fitz.open(demo) as src:
+                for index, page in enumerate(src):
+                    page.get_pixmap(dpi=dpi).save(os.path.join(tmp_folder, f'{name}_{index:03d}.png'))
+        os.replace(tmp_folder, folder)
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder))
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Run the end-to-end benchmark workloads and write machine readable results.
+
+Every workload is parsed by the real pipeline (doc_analyze_llm -> pipe_ocr_mode
+-> dump) with one shared model. Per workload the result holds pages/s, the
+time of each stage, the peak RSS of the process and the number of VLM
+requests per page. See benchmarks/README.md.
+
+    python benchmarks/run.py -c benchmarks/configs/mock_cpu.yaml -o benchmarks/results/mock.json
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data  # noqa: E402
+from magic_pdf.config.output_profile import (OutputArtifact, OutputProfile,  # noqa: E402
+                                             PROFILE_ARTIFACTS, profile_artifacts)
+from magic_pdf.data.data_reader_writer import FileBasedDataWriter  # noqa: E402
+from magic_pdf.data.dataset import ImageDataset, PymuDocDataset  # noqa: E402
+from magic_pdf.model.custom_model import MonkeyOCR  # noqa: E402
+from magic_pdf.model.doc_analyze_by_custom_model_llm import doc_analyze_llm  # noqa: E402
+from magic_pdf.model.page_filter import get_page_filter  # noqa: E402
+
+WORKLOADS = (
+    'single_page', 'text_100', 'scanned', 'demo_pdfs', 'image_folder', 'grouped', 'split_pages', 'api',
+)
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS counter of this process (Linux)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    # not resettable, peak of the whole run
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Probe:
+    """Stage timers and VLM request counters of one workload run."""
+
+    def __init__(self):
+        self.stages = defaultdict(float)
+        self.vlm_requests = 0
+        self.vlm_batches = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] += elapsed
+
+
+class InstrumentedModel:
+    """Route layout and VLM calls of a model through the current probe."""
+
+    def __init__(self, model):
+        self.model = model
+        self.probe = Probe()
+        layout_model = model.layout_model
+        chat_model = model.chat_model
+        layout_predict = layout_model.batch_predict
+        chat_inference = chat_model.batch_inference
+
+        def batch_predict(images, batch_size):
+            with self.probe.stage('analyze.layout'):
+                return layout_predict(images, batch_size)
+
+        def batch_inference(images, questions):
+            with self.probe._lock:
+                self.probe.vlm_requests += len(images)
+                self.probe.vlm_batches += 1
+            with self.probe.stage('analyze.vlm'):
+                return chat_inference(images, questions)
+
+        # instance attributes shadow the bound methods
+        layout_model.batch_predict = batch_predict
+        chat_model.batch_inference = batch_inference
+
+    def new_probe(self) -> Probe:
+        self.probe = Probe()
+        return self.probe
+
+
+def parse_dataset(model, ds, output_dir, name, probe, split_pages=False, profile=OutputProfile.DEBUG) -> int:
+    """Parse one document like parse.py does, returns its page count."""
+    image_dir = os.path.join(output_dir, name, 'images')
+    md_dir = os.path.join(output_dir, name)
+    os.makedirs(image_dir, exist_ok=True)
+    image_writer = FileBasedDataWriter(image_dir)
+    md_writer = FileBasedDataWriter(md_dir)
+
+    with probe.stage('analyze'):
+        infer_result = ds.apply(doc_analyze_llm, MonkeyOCR_model=model, split_pages=split_pages)
+    results = infer_result if isinstance(infer_result, list) else [infer_result]
+    for index, result in enumerate(results):
+        suffix = f'_page_{index}' if isinstance(infer_result, list) else ''
+        with probe.stage('pipe'):
+            pipe_result = result.pipe_ocr_mode(image_writer, MonkeyOCR_model=model)
+        with probe.stage('dump'):
+            pipe_result.dump_profile(md_writer, f'{name}{suffix}', 'images', profile, overlays=False)
+        if OutputArtifact.DEBUG_PDF in profile_artifacts(profile):
+            with probe.stage('draw'):
+                pipe_result.draw_debug(md_writer, f'{name}{suffix}_debug.pdf', result)
+    return len(ds)
+
+
+def load_dataset(path):
+    with open(path, 'rb') as f:
+        file_bytes = f.read()
+    if path.lower().endswith('.pdf'):
+        return PymuDocDataset(file_bytes)
+    return ImageDataset(file_bytes)
+
+
+def run_files(model, paths, output_dir, probe, split_pages=False, profile=OutputProfile.DEBUG) -> int:
+    pages = 0
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        pages += parse_dataset(model, load_dataset(path), output_dir, name, probe, split_pages, profile)
+    return pages
+
+
+def run_grouped(model, paths, output_dir, probe, group_pages, profile=OutputProfile.DEBUG) -> int:
+    import parse
+
+    folder = os.path.dirname(paths[0])
+    pages = 0
+    # parse.py's -g path, only layout and VLM time can be told apart
+    for group in parse.create_file_groups_by_page_count(paths, group_pages):
+        parse.parse_multi_file_group(group, output_dir, model, folder, profile=profile)
+        pages += sum(len(load_dataset(path)) for path in group)
+    return pages
+
+
+def run_api(api_url, path, concurrency, requests_per_worker) -> dict:
+    """Upload ``path`` to a running API server from ``concurrency`` clients."""
+    import fitz
+    import requests
+
+    with fitz.open(path) as doc:
+        pages_per_request = len(doc)
+    latencies = []
+    errors = []
+
+    def client(_):
+        for _ in range(requests_per_worker):
+            start = time.perf_counter()
+            with open(path, 'rb') as f:
+                response = requests.post(f'{api_url.rstrip("/")}/parse', files={'file': f}, timeout=3600)
+            if response.ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(response.status_code)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'pages': pages_per_request * len(latencies),
+        'wall_s': round(wall, 3),
+        'pages_per_s': round(pages_per_request * len(latencies) / wall, 4) if wall else 0.0,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'latency_p50_s': round(statistics.median(latencies), 3) if latencies else None,
+        'latency_p95_s': round(latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else None,
+    }
+
+
+def run_workload(name, model, instrumented, args) -> dict:
+    if name == 'api':
+        if not args.api_url:
+            return {'skipped': 'no --api-url given'}
+        return run_api(args.api_url, data.single_page_pdf(), args.api_concurrency, args.api_requests)
+
+    # pages remembered by the page filter would turn later workloads into cache hits
+    get_page_filter(model).clear()
+    probe = instrumented.new_probe()
+    reset_peak_rss()
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        if name == 'single_page':
+            pages = run_files(model, [data.single_page_pdf()], output_dir, probe, profile=args.profile)
+        elif name == 'text_100':
+            pages = run_files(model, [data.text_pdf(100)], output_dir, probe, profile=args.profile)
+        elif name == 'scanned':
+            pages = run_files(model, [data.scanned_pdf()], output_dir, probe, profile=args.profile)
+        elif name == 'demo_pdfs':
+            pages = run_files(model, data.DEMO_PDFS, output_dir, probe, profile=args.profile)
+        elif name == 'image_folder':
+            pages = run_files(model, data.image_folder(), output_dir, probe, profile=args.profile)
+        elif name == 'grouped':
+            pages = run_grouped(model, data.image_folder(), output_dir, probe, args.group_pages, args.profile)
+        elif name == 'split_pages':
+            pages = run_files(model, data.DEMO_PDFS, output_dir, probe, split_pages=True, profile=args.profile)
+        else:
+            raise ValueError(f'unknown workload: {name}')
+        wall = time.perf_counter() - start
+
+    return {
+        'pages': pages,
+        'wall_s': round(wall, 3),
+        'pages_per_s': round(pages / wall, 4) if wall else 0.0,
+        'stages_s': {stage: round(seconds, 3) for stage, seconds in sorted(probe.stages.items())},
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'vlm_requests': probe.vlm_requests,
+        'vlm_batches': probe.vlm_batches,
+        'vlm_requests_per_page': round(probe.vlm_requests / pages, 3) if pages else 0.0,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = ArgumentParser(description='Run the MonkeyOCR benchmark workloads')
+    parser.add_argument('-c', '--config', default=os.path.join(ROOT, 'benchmarks', 'configs', 'mock_cpu.yaml'))
+    parser.add_argument('-o', '--output', help='Result JSON, defaults to benchmarks/results/<timestamp>.json')
+    parser.add_argument('-w', '--workloads', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument('--group-pages', type=int, default=8, help='Pages per group of the grouped workload')
+    parser.add_argument('--api-url', help='Running API server for the api workload, e.g. http://localhost:7861')
+    parser.add_argument('--api-concurrency', type=int, default=4)
+    parser.add_argument('--api-requests', type=int, default=2, help='Requests per API client')
+    parser.add_argument('--no-warmup', action='store_true', help='Do not warm the models up before timing')
+    parser.add_argument('--profile', choices=list(PROFILE_ARTIFACTS), default=OutputProfile.DEBUG,
+                        help='Output profile of the parsed documents, debug includes the draw stage')
+    args = parser.parse_args()
+
+    load_start = time.perf_counter()
+    model = MonkeyOCR(args.config)
+    load_time = time.perf_counter() - load_start
+    if not args.no_warmup:
+        model.warmup()
+    instrumented = InstrumentedModel(model)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_revision': git_revision(),
+            'host': platform.node(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'config': os.path.relpath(args.config, ROOT),
+            'device': model.device,
+            'layout_model': model.layout_model_name,
+            'reader': model.layout_reader_name,
+            'chat_backend': model.chat_config.get('backend'),
+            'chat_model': model.chat_model.model_name,
+            'model_load_s': round(load_time, 3),
+            'profile': args.profile,
+        },
+        'workloads': {},
+    }
+    for name in args.workloads:
+        print(f'running {name} ...', flush=True)
+        result = run_workload(name, model, instrumented, args)
+        results['workloads'][name] = result
+        if 'skipped' in result:
+            print(f'  skipped: {result["skipped"]}')
+        else:
+            print(f'  {result["pages"]} pages, {result["wall_s"]}s, {result["pages_per_s"]} pages/s')
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f'{time.strftime("%Y%m%d-%H%M%S")}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f'results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -8,23 +8,36 @@
 import json
 import re
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, TextIO, Tuple, Union
+
+from magic_pdf.dict2md.emitters import Emitter
+
+# 页面块的取值字段：按顺序取第一个非空的字段
+PREPROC_BLOCK_KEYS = ('preproc_blocks',)
+PARA_BLOCK_KEYS = ('para_blocks', 'preproc_blocks')
 
 
 class EnhancedTxtGenerator:
     """增强的TXT生成器"""
     
-    def __init__(self, middle_json_path: str, pdf_name: str):
+    def __init__(self, middle_json: Union[str, Path, Dict], pdf_name: str,
+                 block_keys: Tuple[str, ...] = PREPROC_BLOCK_KEYS):
         """
         初始化TXT生成器
         
         Args:
-            middle_json_path: 中间JSON文件路径
+            middle_json: 中间JSON文件路径，或已在内存中的中间结果（如 {'pdf_info': pipe_result.pdf_info}），后者不再读取磁盘
             pdf_name: PDF文件名（不含扩展名）
+            block_keys: 页面块的字段名，按顺序取第一个非空的字段
         """
-        self.middle_json_path = Path(middle_json_path)
         self.pdf_name = pdf_name
-        self.pdf_data = self._load_json_data()
+        self.block_keys = block_keys
+        if isinstance(middle_json, dict):
+            self.middle_json_path = None
+            self.pdf_data = middle_json
+        else:
+            self.middle_json_path = Path(middle_json)
+            self.pdf_data = self._load_json_data()
     
     def _load_json_data(self) -> Dict:
         """加载JSON数据"""
@@ -46,36 +59,52 @@ class EnhancedTxtGenerator:
             return ""
         
         pdf_info = self.pdf_data.get('pdf_info', [])
-        txt_lines = []
+        return "\n".join(self.page_txt(page_data) for page_data in pdf_info)
+    
+    def page_txt(self, page_data: Dict) -> str:
+        """
+        生成单页的TXT内容
         
-        for page_data in pdf_info:
-            page_idx = page_data.get('page_idx', 0)
-            page_num = page_idx + 1
-            
-            # 添加页面头部信息（修改格式：添加#号和新的图片URL）
-            page_image_url = f"http://9bn8of823990.vicp.fun:42712/images/{self.pdf_name}/page_images/{self.pdf_name}_page_{page_num}.png"
-            page_header = f"#（{self.pdf_name}）第{page_num}页原图内容：{page_image_url}"
-            
-            txt_lines.append(page_header)
-            txt_lines.append("&&页面内容...")  # 添加&&标记
-            txt_lines.append("")  # 空行
-            
-            # 处理页面内容
-            # 修复：使用正确的字段名 preproc_blocks 而不是 para_blocks
-            preproc_blocks = page_data.get('preproc_blocks', [])
-            page_content = self._process_page_blocks(preproc_blocks)
-            
-            if page_content.strip():
-                txt_lines.append(page_content)
-            else:
-                txt_lines.append(f"[第{page_num}页无文本内容]")
+        Args:
+            page_data: 页面数据（middle.json 中 pdf_info 的一项）
             
-            txt_lines.append("")  # 页面间空行
-            txt_lines.append("=" * 50)  # 页面分隔线
-            txt_lines.append("")
+        Returns:
+            str: 该页的TXT内容
+        """
+        page_idx = page_data.get('page_idx', 0)
+        page_num = page_idx + 1
+        txt_lines = []
+        
+        # 添加页面头部信息（修改格式：添加#号和新的图片URL）
+        page_image_url = f"http://9bn8of823990.vicp.fun:42712/images/{self.pdf_name}/page_images/{self.pdf_name}_page_{page_num}.png"
+        page_header = f"#（{self.pdf_name}）第{page_num}页原图内容：{page_image_url}"
+        
+        txt_lines.append(page_header)
+        txt_lines.append("&&页面内容...")  # 添加&&标记
+        txt_lines.append("")  # 空行
+        
+        # 处理页面内容（默认取 preproc_blocks，见 PREPROC_BLOCK_KEYS）
+        page_content = self._process_page_blocks(self._page_blocks(page_data))
+        
+        if page_content.strip():
+            txt_lines.append(page_content)
+        else:
+            txt_lines.append(f"[第{page_num}页无文本内容]")
+        
+        txt_lines.append("")  # 页面间空行
+        txt_lines.append("=" * 50)  # 页面分隔线
+        txt_lines.append("")
         
         return "\n".join(txt_lines)
     
+    def _page_blocks(self, page_data: Dict) -> List[Dict]:
+        """按 block_keys 的顺序取页面块"""
+        for key in self.block_keys:
+            blocks = page_data.get(key, [])
+            if blocks:
+                return blocks
+        return []
+    
     def _process_page_blocks(self, preproc_blocks: List[Dict]) -> str:
         """
         处理页面块内容
@@ -313,6 +342,27 @@ class EnhancedTxtGenerator:
             return False
 
 
+class EnhancedTxtEmitter(Emitter):
+    """逐页写出增强TXT，可交给 PipeResultLLM.dump_all 与其他结果在同一次遍历中生成"""
+    
+    def __init__(self, stream: TextIO, pdf_name: str, block_keys: Tuple[str, ...] = PREPROC_BLOCK_KEYS):
+        """
+        Args:
+            stream: TXT输出流
+            pdf_name: PDF文件名（不含扩展名）
+            block_keys: 页面块的字段名，按顺序取第一个非空的字段
+        """
+        self.stream = stream
+        self.generator = EnhancedTxtGenerator({}, pdf_name, block_keys)
+        self._first = True
+    
+    def page(self, page_info: dict):
+        if not self._first:
+            self.stream.write("\n")
+        self._first = False
+        self.stream.write(self.generator.page_txt(page_info))
+
+
 def main():
     """测试函数"""
     import argparse
@@ -0,0 +1,34 @@
+class OutputProfile:
+    MINIMAL = 'minimal'    # markdown only
+    STANDARD = 'standard'  # markdown, content list and middle json
+    DEBUG = 'debug'        # standard plus the layered debug PDF
+
+
+class OutputArtifact:
+    MARKDOWN = 'md'
+    CONTENT_LIST = 'content_list'
+    MIDDLE_JSON = 'middle_json'
+    DEBUG_PDF = 'debug_pdf'
+
+
+PROFILE_ARTIFACTS = {
+    OutputProfile.MINIMAL: frozenset([OutputArtifact.MARKDOWN]),
+    OutputProfile.STANDARD: frozenset([
+        OutputArtifact.MARKDOWN, OutputArtifact.CONTENT_LIST, OutputArtifact.MIDDLE_JSON,
+    ]),
+    OutputProfile.DEBUG: frozenset([
+        OutputArtifact.MARKDOWN, OutputArtifact.CONTENT_LIST, OutputArtifact.MIDDLE_JSON,
+        OutputArtifact.DEBUG_PDF,
+    ]),
+}
+
+
+def profile_artifacts(profile: str) -> frozenset:
+    """The artifacts written for an output profile.
+
+    Raises:
+        ValueError: profile is not one of OutputProfile
+    """
+    if profile not in PROFILE_ARTIFACTS:
+        raise ValueError(f'unknown output profile {profile!r}, expected one of {", ".join(PROFILE_ARTIFACTS)}')
+    return PROFILE_ARTIFACTS[profile]
@@ -1,5 +1,7 @@
 
+import io
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 
 
 class DataReader(ABC):
@@ -61,3 +63,22 @@ class DataWriter(ABC):
             if flag:
                 self.write(path, bit_data)
                 break
+
+    @contextmanager
+    def open_for_write(self, path: str):
+        """Open a text stream to the file, for output that is produced piece
+        by piece.
+
+        This implementation collects the text and writes it with
+        write_string when the block exits without error, writers that can
+        write through override it.
+
+        Args:
+            path (str): the target file where to write
+
+        Yields:
+            TextIO: the stream to write str to
+        """
+        buffer = io.StringIO()
+        yield buffer
+        self.write_string(path, buffer.getvalue())
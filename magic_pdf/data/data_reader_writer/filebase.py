@@ -1,4 +1,5 @@
 import os
+from contextlib import contextmanager
 
 from magic_pdf.data.data_reader_writer.base import DataReader, DataWriter
 
@@ -51,12 +52,27 @@ class FileBasedDataWriter(DataWriter):
             path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
             data (bytes): the data want to write
         """
+        with open(self._prepare_path(path), 'wb') as f:
+            f.write(data)
+
+    @contextmanager
+    def open_for_write(self, path: str):
+        """Open the file for writing text, utf-8 encoded.
+
+        Args:
+            path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
+
+        Yields:
+            TextIO: the file
+        """
+        with open(self._prepare_path(path), 'w', encoding='utf-8', errors='replace', newline='') as f:
+            yield f
+
+    def _prepare_path(self, path: str) -> str:
         fn_path = path
         if not os.path.isabs(fn_path) and len(self._parent_dir) > 0:
             fn_path = os.path.join(self._parent_dir, path)
 
         if not os.path.exists(os.path.dirname(fn_path)) and os.path.dirname(fn_path) != "":
             os.makedirs(os.path.dirname(fn_path), exist_ok=True)
-
-        with open(fn_path, 'wb') as f:
-            f.write(data)
+        return fn_path
@@ -0,0 +1,293 @@
+import json
+import mmap
+import os
+import re
+import zlib
+from typing import Dict, List, Optional
+
+import fitz
+from loguru import logger
+
+_STARTXREF_RE = re.compile(rb'startxref\s+(\d+)')
+_ROOT_RE = re.compile(rb'/Root\s+(\d+)\s+\d+\s+R')
+_PREV_RE = re.compile(rb'/Prev\s+(\d+)')
+_PAGES_RE = re.compile(rb'/Pages\s+(\d+)\s+\d+\s+R')
+_COUNT_RE = re.compile(rb'/Count\s+(\d+)')
+_LENGTH_RE = re.compile(rb'/Length\s+(\d+)(?!\s+\d+\s+R)')
+_SUBSECTION_RE = re.compile(rb'\s*(\d+)\s+(\d+)[ \t]*(?:\r\n|\r|\n)')
+_OBJ_HEADER_RE = re.compile(rb'\s*(\d+)\s+\d+\s+obj')
+
+_TAIL_SIZE = 1024
+_OBJ_READ_SIZE = 4096
+
+
+def _png_unpredict(data: bytes, columns: int) -> bytes:
+    out = bytearray()
+    prev = bytearray(columns)
+    for i in range(0, len(data), columns + 1):
+        filter_type = data[i]
+        row = bytearray(data[i + 1:i + 1 + columns])
+        if filter_type == 1:
+            for j in range(1, len(row)):
+                row[j] = (row[j] + row[j - 1]) & 0xFF
+        elif filter_type == 2:
+            for j in range(len(row)):
+                row[j] = (row[j] + prev[j]) & 0xFF
+        elif filter_type != 0:
+            raise ValueError(f'unsupported png predictor {filter_type}')
+        out += row
+        prev = row
+    return bytes(out)
+
+
+class _XrefReader:
+    """Just enough of a PDF cross reference reader to reach the page tree
+    root: classic xref tables, xref streams and object streams, following
+    /Prev for incrementally updated files."""
+
+    def __init__(self, mm: mmap.mmap):
+        self.mm = mm
+        # newest revision first
+        self.sections = []
+        self.root = None
+
+    def load(self, xref_pos: int) -> bool:
+        visited = set()
+        while xref_pos is not None and xref_pos not in visited:
+            visited.add(xref_pos)
+            if self.mm[xref_pos:xref_pos + 4] == b'xref':
+                trailer = self._load_table(xref_pos)
+            else:
+                trailer = self._load_stream(xref_pos)
+            if trailer is None:
+                return False
+            if self.root is None:
+                root = _ROOT_RE.search(trailer)
+                self.root = int(root.group(1)) if root else None
+            prev = _PREV_RE.search(trailer)
+            xref_pos = int(prev.group(1)) if prev else None
+        return self.root is not None
+
+    def _load_table(self, pos: int) -> bytes:
+        pos += 4
+        while True:
+            match = _SUBSECTION_RE.match(self.mm, pos)
+            if not match:
+                break
+            first, count = int(match.group(1)), int(match.group(2))
+            self.sections.append(('table', first, count, match.end()))
+            pos = match.end() + count * 20
+        trailer = self.mm[pos:pos + _OBJ_READ_SIZE]
+        end = trailer.find(b'startxref')
+        return trailer if end < 0 else trailer[:end]
+
+    def _stream(self, pos: int):
+        """Return the dictionary and the decoded data of the stream object at pos."""
+        head = self.mm[pos:pos + _OBJ_READ_SIZE]
+        keyword = head.find(b'stream')
+        length = _LENGTH_RE.search(head, 0, max(keyword, 0))
+        if keyword < 0 or not length:
+            return None, None
+        obj_dict = head[:keyword]
+        data_start = pos + keyword + len(b'stream')
+        if self.mm[data_start:data_start + 2] == b'\r\n':
+            data_start += 2
+        elif self.mm[data_start:data_start + 1] in (b'\n', b'\r'):
+            data_start += 1
+        data = self.mm[data_start:data_start + int(length.group(1))]
+        if b'/FlateDecode' in obj_dict:
+            data = zlib.decompress(data)
+        predictor = re.search(rb'/Predictor\s+(\d+)', obj_dict)
+        if predictor and int(predictor.group(1)) >= 10:
+            columns = re.search(rb'/Columns\s+(\d+)', obj_dict)
+            data = _png_unpredict(data, int(columns.group(1)) if columns else 1)
+        return obj_dict, data
+
+    def _load_stream(self, pos: int) -> bytes:
+        obj_dict, data = self._stream(pos)
+        if obj_dict is None or b'/XRef' not in obj_dict:
+            return None
+        widths = [int(w) for w in re.search(rb'/W\s*\[([\d\s]+)\]', obj_dict).group(1).split()]
+        index = re.search(rb'/Index\s*\[([\d\s]+)\]', obj_dict)
+        if index:
+            bounds = [int(v) for v in index.group(1).split()]
+        else:
+            bounds = [0, int(re.search(rb'/Size\s+(\d+)', obj_dict).group(1))]
+        row_size = sum(widths)
+        offset = 0
+        for first, count in zip(bounds[0::2], bounds[1::2]):
+            rows = data[offset * row_size:(offset + count) * row_size]
+            self.sections.append(('stream', first, count, rows, widths))
+            offset += count
+        return obj_dict
+
+    def _entry(self, obj_num: int):
+        for section in self.sections:
+            first, count = section[1], section[2]
+            if not first <= obj_num < first + count:
+                continue
+            if section[0] == 'table':
+                start = section[3] + (obj_num - first) * 20
+                entry = self.mm[start:start + 18]
+                return (1, int(entry[:10]), 0) if entry.endswith(b'n') else None
+            rows, widths = section[3], section[4]
+            row = rows[(obj_num - first) * sum(widths):(obj_num - first + 1) * sum(widths)]
+            fields, pos = [], 0
+            for width in widths:
+                fields.append(int.from_bytes(row[pos:pos + width], 'big'))
+                pos += width
+            entry_type = fields[0] if widths[0] else 1
+            return (entry_type, fields[1], fields[2]) if entry_type in (1, 2) else None
+        return None
+
+    def get_object(self, obj_num: int) -> Optional[bytes]:
+        entry = self._entry(obj_num)
+        if entry is None:
+            return None
+        if entry[0] == 1:
+            chunk = self.mm[entry[1]:entry[1] + _OBJ_READ_SIZE]
+            header = _OBJ_HEADER_RE.match(chunk)
+            if not header or int(header.group(1)) != obj_num:
+                return None
+            end = chunk.find(b'endobj')
+            return chunk if end < 0 else chunk[:end]
+
+        container = self._entry(entry[1])
+        if container is None or container[0] != 1:
+            return None
+        obj_dict, data = self._stream(container[1])
+        first = re.search(rb'/First\s+(\d+)', obj_dict) if obj_dict else None
+        if not first:
+            return None
+        first = int(first.group(1))
+        header = [int(v) for v in data[:first].split()]
+        nums, offsets = header[0::2], header[1::2] + [len(data) - first]
+        if obj_num not in nums:
+            return None
+        i = nums.index(obj_num)
+        return data[first + offsets[i]:first + offsets[i + 1]]
+
+
+def _page_count_from_xref(path: str) -> Optional[int]:
+    """Read the page count from the cross reference data, the catalog and the
+    root page tree node only. Returns None when any of them can not be read."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        startxref = None
+        for startxref in _STARTXREF_RE.finditer(mm[max(0, len(mm) - _TAIL_SIZE):]):
+            pass
+        if startxref is None:
+            return None
+
+        reader = _XrefReader(mm)
+        if not reader.load(int(startxref.group(1))):
+            return None
+        catalog = reader.get_object(reader.root)
+        pages = _PAGES_RE.search(catalog) if catalog else None
+        if not pages:
+            return None
+        pages_obj = reader.get_object(int(pages.group(1)))
+        count = _COUNT_RE.search(pages_obj) if pages_obj else None
+        return int(count.group(1)) if count else None
+
+
+def read_pdf_page_count(path: str) -> int:
+    """Get the page count of a PDF without loading the whole document.
+
+    Falls back to PyMuPDF when the cross reference data can not be read
+    directly (xref streams, damaged files).
+
+    Args:
+        path (str): the pdf file path
+
+    Returns:
+        int: number of pages
+    """
+    try:
+        page_count = _page_count_from_xref(path)
+    except (OSError, ValueError, AttributeError, zlib.error):
+        page_count = None
+    if page_count is None:
+        with fitz.open(path) as doc:
+            page_count = doc.page_count
+    return page_count
+
+
+class PageCountIndex:
+    """Page counts cached on disk, keyed by path and invalidated by mtime and
+    size changes."""
+
+    def __init__(self, index_path: Optional[str] = None):
+        self.index_path = index_path
+        self._entries: Dict[str, dict] = {}
+        self._dirty = False
+        if index_path and os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f'ignore unreadable page count index {index_path}: {e}')
+
+    def page_count(self, path: str) -> int:
+        """Get the page count of a supported file, images count as one page."""
+        if os.path.splitext(path)[1].lower() != '.pdf':
+            return 1
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self._entries.get(key)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry['pages']
+        pages = read_pdf_page_count(path)
+        self._entries[key] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'pages': pages}
+        self._dirty = True
+        return pages
+
+    def save(self):
+        if not self.index_path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        tmp_path = f'{self.index_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+
+def plan_file_groups(file_paths: List[str], max_pages_per_group: int, index: Optional[PageCountIndex] = None) -> List[List[str]]:
+    """Pack files into groups of at most max_pages_per_group pages with
+    first-fit-decreasing. A file larger than the budget gets its own group.
+
+    Args:
+        file_paths (List[str]): the files to group
+        max_pages_per_group (int): page budget of a group
+        index (PageCountIndex, optional): page count cache. Defaults to an in-memory one.
+
+    Returns:
+        List[List[str]]: the groups, files inside a group keep the input order
+    """
+    index = index or PageCountIndex()
+    order = {path: i for i, path in enumerate(file_paths)}
+
+    sized = []
+    for path in file_paths:
+        try:
+            pages = index.page_count(path)
+        except Exception as e:
+            logger.warning(f'could not determine page count for {path}: {e}')
+            pages = 1
+        sized.append((max(pages, 1), path))
+    sized.sort(key=lambda item: -item[0])
+
+    bins = []
+    for pages, path in sized:
+        for bin_ in bins:
+            if bin_[0] + pages <= max_pages_per_group:
+                bin_[0] += pages
+                bin_[1].append(path)
+                break
+        else:
+            bins.append([pages, [path]])
+
+    index.save()
+    for pages, paths in bins:
+        logger.info(f'file group: {len(paths)} files, {pages} pages')
+    return [sorted(paths, key=order.get) for _, paths in bins]
@@ -2,7 +2,10 @@ import json
 import os
 import tempfile
 import shutil
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
 
 from magic_pdf.config.exceptions import EmptyData, InvalidParams
 from magic_pdf.data.data_reader_writer import (FileBasedDataReader,
@@ -10,11 +13,97 @@ from magic_pdf.data.data_reader_writer import (FileBasedDataReader,
 from magic_pdf.data.dataset import ImageDataset, PymuDocDataset
 from magic_pdf.utils.office_to_pdf import convert_file_to_pdf, ConvertToPdfError
 
+class JsonlItem(NamedTuple):
+    """One manifest line of a streamed jsonl file.
+
+    dataset is None and error is set when the line could not be loaded.
+    """
+    line_no: int
+    record: dict
+    dataset: Optional[PymuDocDataset]
+    error: Optional[Exception]
+
+
+def _iter_jsonl_lines(s3_path_or_local: str, s3_client: MultiBucketS3DataReader | None):
+    if s3_path_or_local.startswith('s3://'):
+        if s3_client is None:
+            raise InvalidParams('s3_client is required when s3_path is provided')
+        # the manifest itself is small, the referenced documents are what must be streamed
+        lines = s3_client.read(s3_path_or_local).decode().split('\n')
+        yield from enumerate(lines, 1)
+    else:
+        with open(s3_path_or_local, 'r', encoding='utf-8') as f:
+            yield from enumerate(f, 1)
+
+
+def _read_jsonl_document(record: dict, s3_client: MultiBucketS3DataReader | None) -> bytes:
+    pdf_path = record.get('file_location', '') or record.get('path', '')
+    if len(pdf_path) == 0:
+        raise EmptyData('pdf file location is empty')
+    if pdf_path.startswith('s3://'):
+        if s3_client is None:
+            raise InvalidParams('s3_client is required when s3_path is provided')
+        return s3_client.read(pdf_path)
+    return FileBasedDataReader('').read(pdf_path)
+
+
+def iter_jsonl(
+    s3_path_or_local: str,
+    s3_client: MultiBucketS3DataReader | None = None,
+    prefetch: int = 4,
+) -> Iterator[JsonlItem]:
+    """Stream the jsonl file line by line, reading the referenced pdf files
+    ahead of the consumer.
+
+    At most prefetch documents are fetched concurrently, so memory stays
+    bounded by prefetch + 1 documents however long the jsonl file is.
+    Errors are reported per line instead of stopping the stream.
+
+    Args:
+        s3_path_or_local (str): local file or s3 path
+        s3_client (MultiBucketS3DataReader | None, optional): s3 client that support multiple bucket. Defaults to None.
+        prefetch (int, optional): number of documents read ahead. Defaults to 4.
+
+    Raises:
+        InvalidParams: if s3_path_or_local is s3 path but s3_client is not provided.
+
+    Yields:
+        JsonlItem: line number, parsed record, PymuDocDataset or the error of that line
+    """
+    pending = deque()
+
+    def collect(line_no, record, future):
+        try:
+            return JsonlItem(line_no, record, PymuDocDataset(future.result()), None)
+        except Exception as e:
+            return JsonlItem(line_no, record, None, e)
+
+    with ThreadPoolExecutor(max_workers=max(1, prefetch)) as executor:
+        for line_no, line in _iter_jsonl_lines(s3_path_or_local, s3_client):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise InvalidParams(f'line {line_no} is not a json object')
+                future = executor.submit(_read_jsonl_document, record, s3_client)
+            except (ValueError, InvalidParams) as e:
+                record, future = {}, Future()
+                future.set_exception(e)
+            pending.append((line_no, record, future))
+            if len(pending) > prefetch:
+                yield collect(*pending.popleft())
+        while pending:
+            yield collect(*pending.popleft())
+
+
 def read_jsonl(
     s3_path_or_local: str, s3_client: MultiBucketS3DataReader | None = None
 ) -> list[PymuDocDataset]:
     """Read the jsonl file and return the list of PymuDocDataset.
 
+    Use iter_jsonl for large files, this keeps every document in memory.
+
     Args:
         s3_path_or_local (str): local file or s3 path
         s3_client (MultiBucketS3DataReader | None, optional): s3 client that support multiple bucket. Defaults to None.
@@ -27,27 +116,12 @@ def read_jsonl(
     Returns:
         list[PymuDocDataset]: each line in the jsonl file will be converted to a PymuDocDataset
     """
-    bits_arr = []
-    if s3_path_or_local.startswith('s3://'):
-        if s3_client is None:
-            raise InvalidParams('s3_client is required when s3_path is provided')
-        jsonl_bits = s3_client.read(s3_path_or_local)
-    else:
-        jsonl_bits = FileBasedDataReader('').read(s3_path_or_local)
-    jsonl_d = [
-        json.loads(line) for line in jsonl_bits.decode().split('\n') if line.strip()
-    ]
-    for d in jsonl_d:
-        pdf_path = d.get('file_location', '') or d.get('path', '')
-        if len(pdf_path) == 0:
-            raise EmptyData('pdf file location is empty')
-        if pdf_path.startswith('s3://'):
-            if s3_client is None:
-                raise InvalidParams('s3_client is required when s3_path is provided')
-            bits_arr.append(s3_client.read(pdf_path))
-        else:
-            bits_arr.append(FileBasedDataReader('').read(pdf_path))
-    return [PymuDocDataset(bits) for bits in bits_arr]
+    datasets = []
+    for item in iter_jsonl(s3_path_or_local, s3_client):
+        if item.error is not None:
+            raise item.error
+        datasets.append(item.dataset)
+    return datasets
 
 
 def read_local_pdfs(path: str) -> list[PymuDocDataset]:
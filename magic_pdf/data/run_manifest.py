@@ -0,0 +1,273 @@
+"""Persistent manifest for resumable folder and batch runs.
+
+Every input is recorded with its content hash, the run options, its status,
+output location and timings in a small SQLite database. A rerun skips inputs
+already done with the same options, retries failed ones up to a limit (an
+input left running by a crashed process counts as failed) and links
+identical files (same content, different name) to the first one parsed.
+
+Shell usage (see batch_process_pdfs.sh):
+    python -m magic_pdf.data.run_manifest check MANIFEST FILE
+        exit 0: process, 10: skip, 11: duplicate (canonical output printed),
+        anything else is an error (Python itself exits 1 or 2 on failures)
+    python -m magic_pdf.data.run_manifest record MANIFEST FILE --status done --output DIR
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# exit codes of `check`, distinct from the 1 and 2 Python exits with on errors
+CHECK_PROCESS = 0
+CHECK_SKIP = 10
+CHECK_DUPLICATE = 11
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inputs (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    mtime_ns INTEGER,
+    size INTEGER,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    output TEXT,
+    linked_to TEXT,
+    error TEXT,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL
+)
+"""
+
+
+def compute_file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+@dataclass
+class RunPlan:
+    """What a (re)run has to do.
+
+    Attributes:
+        pending: inputs to parse, in input order
+        skipped: inputs already done, or failed too often
+        duplicates: input -> earlier input with identical content and options
+    """
+    pending: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    duplicates: Dict[str, str] = field(default_factory=dict)
+
+
+class RunManifest:
+    def __init__(self, manifest_path: str, options: Optional[dict] = None, max_retries: int = 3):
+        """Open (or create) a run manifest.
+
+        Args:
+            manifest_path (str): the sqlite file path
+            options (dict, optional): run options, an input is only considered done for the same options
+            max_retries (int, optional): attempts before a failing input is given up. Defaults to 3.
+        """
+        parent = os.path.dirname(os.path.abspath(manifest_path))
+        os.makedirs(parent, exist_ok=True)
+        self.manifest_path = manifest_path
+        self.options = json.dumps(options or {}, sort_keys=True)
+        self.max_retries = max_retries
+        self._conn = sqlite3.connect(manifest_path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._hashes: Dict[str, str] = {}
+
+    def close(self):
+        self._conn.close()
+
+    def _row(self, path: str):
+        return self._conn.execute(
+            'SELECT * FROM inputs WHERE path = ?', (os.path.abspath(path),)
+        ).fetchone()
+
+    def content_hash(self, path: str) -> str:
+        """Hash of the input, reusing the recorded one while mtime and size are unchanged."""
+        key = os.path.abspath(path)
+        if key in self._hashes:
+            return self._hashes[key]
+        stat = os.stat(path)
+        row = self._row(path)
+        if row is not None and row['mtime_ns'] == stat.st_mtime_ns and row['size'] == stat.st_size:
+            content_hash = row['content_hash']
+        else:
+            content_hash = compute_file_hash(path)
+        self._hashes[key] = content_hash
+        return content_hash
+
+    def find_done(self, content_hash: str, exclude: str = None):
+        """Find a finished, non-linked input with this content and the current options."""
+        return self._conn.execute(
+            'SELECT * FROM inputs WHERE content_hash = ? AND options = ? AND status = ? '
+            'AND linked_to IS NULL AND path != ? ORDER BY finished_at LIMIT 1',
+            (content_hash, self.options, STATUS_DONE, os.path.abspath(exclude or '')),
+        ).fetchone()
+
+    def should_skip(self, path: str) -> bool:
+        """The input is done, or failed max_retries times.
+
+        An input still running when it is planned again was left by a process
+        that died on it (e.g. killed by the OOM killer). That attempt counts as
+        failed, so an input that keeps crashing the worker is given up too.
+        """
+        row = self._row(path)
+        if row is None or row['content_hash'] != self.content_hash(path) or row['options'] != self.options:
+            return False
+        if row['status'] == STATUS_RUNNING:
+            self.mark_failed(path, 'interrupted: the process exited while parsing it')
+            row = self._row(path)
+        if row['status'] == STATUS_DONE:
+            return True
+        return row['status'] == STATUS_FAILED and row['attempts'] >= self.max_retries
+
+    def plan(self, paths: List[str]) -> RunPlan:
+        """Split the inputs into pending, skipped and duplicate ones."""
+        plan = RunPlan()
+        first_by_hash: Dict[str, str] = {}
+        for path in paths:
+            if self.should_skip(path):
+                plan.skipped.append(path)
+                continue
+            content_hash = self.content_hash(path)
+            done = self.find_done(content_hash, exclude=path)
+            if done is not None:
+                plan.duplicates[path] = done['path']
+            elif content_hash in first_by_hash:
+                plan.duplicates[path] = first_by_hash[content_hash]
+            else:
+                first_by_hash[content_hash] = path
+                plan.pending.append(path)
+        return plan
+
+    def _upsert(self, path: str, **values):
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        row = self._row(path)
+        record = {
+            'path': key,
+            'content_hash': self.content_hash(path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'options': self.options,
+            'attempts': row['attempts'] if row is not None and row['options'] == self.options else 0,
+            'output': None,
+            'linked_to': None,
+            'error': None,
+            'started_at': None,
+            'finished_at': None,
+            'duration': None,
+        }
+        if row is not None:
+            for name in ('output', 'started_at'):
+                record[name] = row[name]
+        record.update(values)
+        columns = ', '.join(record)
+        placeholders = ', '.join('?' for _ in record)
+        self._conn.execute(
+            f'INSERT OR REPLACE INTO inputs ({columns}) VALUES ({placeholders})',
+            tuple(record.values()),
+        )
+        self._conn.commit()
+
+    def mark_running(self, path: str):
+        row = self._row(path)
+        attempts = row['attempts'] if row is not None and row['options'] == self.options else 0
+        self._upsert(path, status=STATUS_RUNNING, attempts=attempts + 1, started_at=time.time())
+
+    def mark_done(self, path: str, output: Optional[str] = None, duration: Optional[float] = None):
+        row = self._row(path)
+        started_at = row['started_at'] if row is not None else None
+        finished_at = time.time()
+        if duration is None and started_at is not None:
+            duration = finished_at - started_at
+        self._upsert(path, status=STATUS_DONE, output=output, finished_at=finished_at, duration=duration)
+
+    def mark_failed(self, path: str, error: str):
+        self._upsert(path, status=STATUS_FAILED, error=error, finished_at=time.time())
+
+    def mark_linked(self, path: str, canonical_path: str) -> Optional[str]:
+        """Record path as a duplicate of canonical_path, return the canonical output."""
+        canonical = self._row(canonical_path)
+        if canonical is None or canonical['status'] != STATUS_DONE:
+            return None
+        self._upsert(
+            path,
+            status=STATUS_DONE,
+            output=canonical['output'],
+            linked_to=canonical['path'],
+            finished_at=time.time(),
+            duration=0.0,
+        )
+        return canonical['output']
+
+
+def link_output(canonical_output: str, output: str):
+    """Expose the canonical result under the duplicate's output location."""
+    if not canonical_output or os.path.lexists(output):
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    try:
+        os.symlink(os.path.abspath(canonical_output), output, target_is_directory=True)
+    except OSError as e:
+        logger.warning(f'could not link {output} -> {canonical_output}: {e}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run manifest helper for shell batch jobs')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    check = sub.add_parser('check', help='Decide whether FILE has to be processed')
+    record = sub.add_parser('record', help='Record the outcome of processing FILE')
+    for p in (check, record):
+        p.add_argument('manifest')
+        p.add_argument('file')
+        p.add_argument('--options', default='{}', help='Run options as JSON')
+        p.add_argument('--max-retries', type=int, default=3)
+    record.add_argument('--status', choices=[STATUS_RUNNING, STATUS_DONE, STATUS_FAILED], required=True)
+    record.add_argument('--output')
+    record.add_argument('--error', default='')
+
+    args = parser.parse_args()
+    manifest = RunManifest(args.manifest, json.loads(args.options), args.max_retries)
+    try:
+        if args.command == 'check':
+            if manifest.should_skip(args.file):
+                sys.exit(CHECK_SKIP)
+            done = manifest.find_done(manifest.content_hash(args.file), exclude=args.file)
+            if done is not None:
+                print(manifest.mark_linked(args.file, done['path']) or '')
+                sys.exit(CHECK_DUPLICATE)
+            sys.exit(CHECK_PROCESS)
+        if args.status == STATUS_RUNNING:
+            manifest.mark_running(args.file)
+        elif args.status == STATUS_DONE:
+            manifest.mark_done(args.file, args.output)
+        else:
+            manifest.mark_failed(args.file, args.error)
+    finally:
+        manifest.close()
+
+
+if __name__ == '__main__':
+    main()
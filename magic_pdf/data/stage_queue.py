@@ -0,0 +1,217 @@
+"""Shared directory handing saved inference results from analyze to pipe nodes.
+
+GPU nodes run only the analyze stage and save every result as a bundle (see
+InferenceResultLLM.save), CPU nodes claim the bundles and run the pipe and
+dump stage, so both kinds of node scale on their own. The queue is a
+directory on storage every node mounts::
+
+    queue/
+        incoming/   bundles being written
+        ready/      complete bundles, waiting for a pipe node
+        claimed/    bundles a pipe node works on
+        done/       piped bundles, when they are kept
+        failed/     bundles whose pipe stage failed, with error.txt
+
+Every move between the folders is a single ``os.rename``, which is atomic on
+one file system: a bundle is never seen half written, and exactly one node
+wins the claim of a bundle. A claim is named ``<name>.<host>.<id>``, unique
+to the node and the claim. Bundles of a node that died are put back with
+:meth:`StageQueue.requeue_stale`. A claim is not refreshed while it is being
+piped, so ``stale_after`` has to exceed the longest pipe time of a bundle,
+otherwise a bundle in progress is requeued and piped a second time.
+
+Shell usage:
+    python -m magic_pdf.data.stage_queue status QUEUE
+    python -m magic_pdf.data.stage_queue requeue QUEUE --stale-after 3600
+"""
+import argparse
+import os
+import shutil
+import socket
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from loguru import logger
+
+INCOMING = 'incoming'
+READY = 'ready'
+CLAIMED = 'claimed'
+DONE = 'done'
+FAILED = 'failed'
+STATES = (INCOMING, READY, CLAIMED, DONE, FAILED)
+
+ERROR_FILE = 'error.txt'
+
+
+class StageQueue:
+    def __init__(self, root: str):
+        """Open (or create) a queue directory.
+
+        Args:
+            root (str): the shared directory
+        """
+        self.root = root
+        for state in STATES:
+            os.makedirs(os.path.join(root, state), exist_ok=True)
+
+    def _path(self, state: str, name: str) -> str:
+        return os.path.join(self.root, state, name)
+
+    @staticmethod
+    def bundle_name(claimed: str) -> str:
+        """The name of a claimed bundle, without the claim suffix."""
+        return os.path.basename(claimed).rsplit('.', 2)[0]
+
+    @contextmanager
+    def publish(self, name: str) -> Iterator[str]:
+        """Write a bundle and hand it to the pipe nodes.
+
+        Yields the directory to save the bundle into. When the block exits
+        without error the bundle moves to ready, otherwise it is removed.
+        Unique names are the caller's business, an existing bundle of the same
+        name in ready is replaced.
+
+        Args:
+            name (str): the bundle name
+
+        Yields:
+            str: the directory to write the bundle to
+        """
+        staging = self._path(INCOMING, f'{name}.{uuid.uuid4().hex[:8]}')
+        os.makedirs(staging)
+        try:
+            yield staging
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        target = self._path(READY, name)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.rename(staging, target)
+
+    def claim(self) -> Optional[str]:
+        """Take the oldest ready bundle.
+
+        The claim gets a name of its own, so a bundle that was requeued while
+        this node still works on it never shares its directory with the next
+        claim.
+
+        Returns:
+            Optional[str]: the claimed bundle directory, None when nothing is ready
+        """
+        host = socket.gethostname().replace('.', '-') or 'node'
+        ready_dir = os.path.join(self.root, READY)
+        entries = []
+        for name in os.listdir(ready_dir):
+            try:
+                entries.append((os.stat(os.path.join(ready_dir, name)).st_mtime, name))
+            except FileNotFoundError:
+                continue
+        for _, name in sorted(entries):
+            claimed = self._path(CLAIMED, f'{name}.{host}.{uuid.uuid4().hex[:8]}')
+            try:
+                os.rename(self._path(READY, name), claimed)
+            except (FileNotFoundError, OSError):
+                # another node was faster
+                continue
+            # the claim time, for requeue_stale
+            os.utime(claimed)
+            return claimed
+        return None
+
+    def _claim_lost(self, claimed: str) -> bool:
+        if os.path.isdir(claimed):
+            return False
+        # requeued by requeue_stale while this node worked on it
+        logger.warning(f'claim {os.path.basename(claimed)} is gone, it was requeued as stale')
+        return True
+
+    def complete(self, claimed: str, keep: bool = False):
+        """Finish a claimed bundle, removing it unless keep. A claim that is
+        gone, because it was requeued meanwhile, is left alone."""
+        if self._claim_lost(claimed):
+            return
+        try:
+            if keep:
+                target = self._path(DONE, self.bundle_name(claimed))
+                if os.path.exists(target):
+                    shutil.rmtree(target)
+                os.rename(claimed, target)
+            else:
+                shutil.rmtree(claimed)
+        except FileNotFoundError:
+            self._claim_lost(claimed)
+
+    def fail(self, claimed: str, error: str):
+        """Move a claimed bundle to failed, with the error next to it. A claim
+        that is gone, because it was requeued meanwhile, is left alone."""
+        if self._claim_lost(claimed):
+            return
+        try:
+            with open(os.path.join(claimed, ERROR_FILE), 'w', encoding='utf-8') as f:
+                f.write(error)
+            target = self._path(FAILED, self.bundle_name(claimed))
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.rename(claimed, target)
+        except FileNotFoundError:
+            self._claim_lost(claimed)
+
+    def requeue_stale(self, stale_after: float) -> List[str]:
+        """Put bundles claimed longer than stale_after seconds ago back to
+        ready, e.g. after a pipe node died.
+
+        Claims are not refreshed while they are piped, so stale_after has to
+        exceed the longest pipe time of a bundle. A bundle requeued too early is
+        piped again by another node, the first node then finds its claim gone.
+
+        Returns:
+            List[str]: names of the requeued bundles
+        """
+        requeued = []
+        now = time.time()
+        claimed_dir = os.path.join(self.root, CLAIMED)
+        for claim_name in os.listdir(claimed_dir):
+            path = os.path.join(claimed_dir, claim_name)
+            name = self.bundle_name(path)
+            try:
+                if now - os.stat(path).st_mtime < stale_after:
+                    continue
+                os.rename(path, self._path(READY, name))
+            except (FileNotFoundError, OSError):
+                continue
+            logger.warning(f'requeued stale bundle {name}')
+            requeued.append(name)
+        return requeued
+
+    def counts(self) -> Dict[str, int]:
+        """Number of bundles per state."""
+        return {state: len(os.listdir(os.path.join(self.root, state))) for state in STATES}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Shared queue of saved inference results')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    status = sub.add_parser('status', help='print the number of bundles per state')
+    status.add_argument('queue')
+
+    requeue = sub.add_parser('requeue', help='put bundles of dead pipe nodes back to ready')
+    requeue.add_argument('queue')
+    requeue.add_argument('--stale-after', type=float, default=3600,
+                         help='seconds since the claim, longer than any pipe run (default: 3600)')
+
+    args = parser.parse_args(argv)
+    queue = StageQueue(args.queue)
+    if args.command == 'status':
+        for state, count in queue.counts().items():
+            print(f'{state}: {count}')
+    else:
+        for name in queue.requeue_stale(args.stale_after):
+            print(name)
+
+
+if __name__ == '__main__':
+    main()
@@ -64,3 +64,40 @@ def load_images_from_pdf(pdf_bytes: bytes, dpi=200, start_page_id=0, end_page_id
 
             images.append(img_dict)
     return images
+
+
+@ImportPIL
+def iter_images_from_pdf(pdf_path_or_bytes, dpi=150):
+    """Render the pages of a PDF one at a time as PIL images.
+
+    Only the page being rendered is held in memory, so callers can stream
+    pages into the model in bounded chunks. Pages are rendered by
+    fitz_doc_to_image, with its size cap.
+
+    Args:
+        pdf_path_or_bytes (str | bytes): the pdf file path or content
+        dpi (int, optional): render resolution. Defaults to 150.
+
+    Yields:
+        PIL.Image.Image: one RGB image per page
+    """
+    from PIL import Image
+    if isinstance(pdf_path_or_bytes, (bytes, bytearray)):
+        doc = fitz.open('pdf', pdf_path_or_bytes)
+    else:
+        doc = fitz.open(pdf_path_or_bytes)
+    with doc:
+        for page in doc:
+            yield Image.fromarray(fitz_doc_to_image(page, dpi=dpi)['img'])
+
+
+def iter_batches(items, batch_size: int):
+    """Group an iterable into lists of at most batch_size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
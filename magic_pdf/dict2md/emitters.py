@@ -0,0 +1,195 @@
+"""Output formats of a pipe result, produced in one walk over the pages.
+
+Every emitter gets the pages one by one and writes its format to a text
+stream as it goes, so the markdown, the content list, the plain text and the
+middle json of a document are made in a single traversal without building
+any of them as one big string:
+
+    with writer.open_for_write('doc.md') as md, writer.open_for_write('doc.txt') as txt:
+        emit_pages(pipe_res, [MarkdownEmitter(md, 'images'), PlainTextEmitter(txt)])
+
+Other formats plug in by subclassing :class:`Emitter`.
+"""
+from typing import List, TextIO
+
+from magic_pdf.config.constants import LINES_DELETED
+from magic_pdf.config.make_content_config import DropMode, MakeMode
+from magic_pdf.config.ocr_content_type import BlockType
+from magic_pdf.dict2md.ocr_mkcontent import make_page_content
+from magic_pdf.libs.json_stream import JsonStreamWriter
+from magic_pdf.libs.markdown_utils import fix_markdown_output
+from magic_pdf.libs.paged_container import CODEC_ZLIB, KIND_MIDDLE, PagedWriter
+from magic_pdf.post_proc.para_split_v3 import PARA_BLOCKS_REF, para_blocks_to_refs
+
+
+class Emitter:
+    """Receives the pages of a pipe result in order."""
+
+    def begin(self, pipe_res: dict):
+        """Called once before the first page."""
+        pass
+
+    def page(self, page_info: dict):
+        """Called with every page dict of pipe_res['pdf_info']."""
+        pass
+
+    def end(self):
+        """Called once after the last page."""
+        pass
+
+
+class MarkdownEmitter(Emitter):
+    """The markdown of PipeResultLLM.get_markdown."""
+
+    def __init__(self, stream: TextIO, img_dir_or_bucket_prefix: str,
+                 drop_mode=DropMode.NONE, md_make_mode=MakeMode.MM_MD):
+        self.stream = stream
+        self.img_dir_or_bucket_prefix = img_dir_or_bucket_prefix
+        self.drop_mode = drop_mode
+        self.md_make_mode = md_make_mode
+        self._first = True
+
+    def page(self, page_info: dict):
+        for paragraph in make_page_content(
+            page_info, self.md_make_mode, self.drop_mode, self.img_dir_or_bucket_prefix
+        ):
+            if not self._first:
+                self.stream.write('\n\n')
+            self._first = False
+            self.stream.write(fix_markdown_output(paragraph))
+
+
+class ContentListEmitter(Emitter):
+    """The content list json of PipeResultLLM.get_content_list."""
+
+    def __init__(self, stream: TextIO, img_dir_or_bucket_prefix: str, drop_mode=DropMode.NONE,
+                 pretty: bool = False):
+        self.img_dir_or_bucket_prefix = img_dir_or_bucket_prefix
+        self.drop_mode = drop_mode
+        self.json_writer = JsonStreamWriter(stream, pretty)
+
+    def begin(self, pipe_res: dict):
+        self.json_writer.begin_array()
+
+    def page(self, page_info: dict):
+        for item in make_page_content(
+            page_info, MakeMode.STANDARD_FORMAT, self.drop_mode, self.img_dir_or_bucket_prefix
+        ):
+            self.json_writer.value(item)
+
+    def end(self):
+        self.json_writer.end()
+
+
+class MiddleJsonEmitter(Emitter):
+    """The middle json of PipeResultLLM.get_middle_json, page by page.
+
+    ``offsets`` holds the byte range of every page in the output and ``meta``
+    the other top level members, for the page index.
+    """
+
+    def __init__(self, stream: TextIO, pretty: bool = False):
+        self.json_writer = JsonStreamWriter(stream, pretty)
+        self.offsets = []
+        self.meta = {}
+        self._pipe_res = None
+
+    def begin(self, pipe_res: dict):
+        self._pipe_res = pipe_res
+        self.meta = {key: value for key, value in pipe_res.items() if key != 'pdf_info'}
+        self.json_writer.begin_object()
+        keys = list(pipe_res.keys())
+        for key in keys[:keys.index('pdf_info')]:
+            self.json_writer.value(pipe_res[key], key=key)
+        self.json_writer.begin_array('pdf_info')
+
+    def page(self, page_info: dict):
+        if self._pipe_res.get('_para_blocks') == PARA_BLOCKS_REF:
+            page_info = para_blocks_to_refs([page_info])[0]
+        self.offsets.append(self.json_writer.value(page_info))
+
+    def end(self):
+        self.json_writer.end()
+        keys = list(self._pipe_res.keys())
+        for key in keys[keys.index('pdf_info') + 1:]:
+            self.json_writer.value(self._pipe_res[key], key=key)
+        self.json_writer.end()
+
+
+class PagedMiddleEmitter(Emitter):
+    """The middle json as a paged container, one compressed frame per page.
+
+    ``content`` holds the container once the last page is seen.
+    """
+
+    def __init__(self, codec: str = CODEC_ZLIB):
+        self.paged_writer = PagedWriter(codec)
+        self.content = None
+        self._pipe_res = None
+
+    def begin(self, pipe_res: dict):
+        self._pipe_res = pipe_res
+
+    def page(self, page_info: dict):
+        if self._pipe_res.get('_para_blocks') == PARA_BLOCKS_REF:
+            page_info = para_blocks_to_refs([page_info])[0]
+        self.paged_writer.add_page(page_info)
+
+    def end(self):
+        meta = {key: value for key, value in self._pipe_res.items() if key != 'pdf_info'}
+        meta['kind'] = KIND_MIDDLE
+        self.content = self.paged_writer.finish(meta)
+
+
+class PlainTextEmitter(Emitter):
+    """Plain text: the text of the paragraphs, titles and equations and the
+    captions and footnotes of images and tables, separated by blank lines."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self._first = True
+
+    @staticmethod
+    def _block_text(block: dict) -> str:
+        return ' '.join(
+            span['content'].strip()
+            for line in block.get('lines', [])
+            for span in line.get('spans', [])
+            if isinstance(span.get('content'), str) and span['content'].strip()
+        )
+
+    def _paragraphs(self, page_info: dict):
+        for para_block in page_info.get('para_blocks') or []:
+            if para_block.get(LINES_DELETED):
+                continue
+            if para_block['type'] in (BlockType.Image, BlockType.Table):
+                for block in para_block.get('blocks', []):
+                    if block['type'] not in (BlockType.ImageBody, BlockType.TableBody):
+                        yield self._block_text(block)
+            else:
+                yield self._block_text(para_block)
+
+    def page(self, page_info: dict):
+        for paragraph in self._paragraphs(page_info):
+            if not paragraph:
+                continue
+            if not self._first:
+                self.stream.write('\n\n')
+            self._first = False
+            self.stream.write(paragraph)
+
+
+def emit_pages(pipe_res: dict, emitters: List[Emitter]):
+    """Walk the pages of a pipe result once, feeding every emitter.
+
+    Args:
+        pipe_res (dict): the pipe result, with the pages in pipe_res['pdf_info']
+        emitters (List[Emitter]): the outputs to produce
+    """
+    for emitter in emitters:
+        emitter.begin(pipe_res)
+    for page_info in pipe_res['pdf_info']:
+        for emitter in emitters:
+            emitter.page(page_info)
+    for emitter in emitters:
+        emitter.end()
@@ -2,6 +2,7 @@ import re
 
 from loguru import logger
 
+from magic_pdf.config.constants import LINES_DELETED
 from magic_pdf.config.make_content_config import DropMode, MakeMode
 from magic_pdf.config.ocr_content_type import BlockType, ContentType
 from magic_pdf.libs.commons import join_path
@@ -241,6 +242,51 @@ def para_to_standard_format_v2(para_block, img_buket_path, page_idx, drop_reason
     return para_content
 
 
+def make_page_content(page_info: dict,
+                      make_mode: str,
+                      drop_mode: str,
+                      img_buket_path: str = '',
+                      ) -> list:
+    """The content of one page: markdown paragraphs for the markdown modes,
+    content list entries for MakeMode.STANDARD_FORMAT.
+
+    Returns:
+        list: empty for pages that are dropped or have no paragraphs
+    """
+    if page_info.get('need_drop', False):
+        drop_reason = page_info.get('drop_reason')
+        if drop_mode in (DropMode.NONE, DropMode.NONE_WITH_REASON):
+            pass
+        elif drop_mode == DropMode.WHOLE_PDF:
+            raise Exception((f'drop_mode is {DropMode.WHOLE_PDF} ,'
+                             f'drop_reason is {drop_reason}'))
+        elif drop_mode == DropMode.SINGLE_PAGE:
+            logger.warning((f'drop_mode is {DropMode.SINGLE_PAGE} ,'
+                            f'drop_reason is {drop_reason}'))
+            return []
+        else:
+            raise Exception('drop_mode can not be null')
+
+    paras_of_layout = page_info.get('para_blocks')
+    page_idx = page_info.get('page_idx')
+    if not paras_of_layout:
+        return []
+    if make_mode == MakeMode.MM_MD:
+        return ocr_mk_markdown_with_para_core_v2(
+            paras_of_layout, 'mm', img_buket_path)
+    elif make_mode == MakeMode.NLP_MD:
+        return ocr_mk_markdown_with_para_core_v2(
+            paras_of_layout, 'nlp')
+    elif make_mode == MakeMode.STANDARD_FORMAT:
+        return [
+            para_to_standard_format_v2(para_block, img_buket_path, page_idx)
+            for para_block in paras_of_layout
+            # merged into the last paragraph of the previous page
+            if not para_block.get(LINES_DELETED)
+        ]
+    return []
+
+
 def union_make(pdf_info_dict: list,
                make_mode: str,
                drop_mode: str,
@@ -248,45 +294,8 @@ def union_make(pdf_info_dict: list,
                ):
     output_content = []
     for page_info in pdf_info_dict:
-        drop_reason_flag = False
-        drop_reason = None
-        if page_info.get('need_drop', False):
-            drop_reason = page_info.get('drop_reason')
-            if drop_mode == DropMode.NONE:
-                pass
-            elif drop_mode == DropMode.NONE_WITH_REASON:
-                drop_reason_flag = True
-            elif drop_mode == DropMode.WHOLE_PDF:
-                raise Exception((f'drop_mode is {DropMode.WHOLE_PDF} ,'
-                                 f'drop_reason is {drop_reason}'))
-            elif drop_mode == DropMode.SINGLE_PAGE:
-                logger.warning((f'drop_mode is {DropMode.SINGLE_PAGE} ,'
-                                f'drop_reason is {drop_reason}'))
-                continue
-            else:
-                raise Exception('drop_mode can not be null')
-
-        paras_of_layout = page_info.get('para_blocks')
-        page_idx = page_info.get('page_idx')
-        if not paras_of_layout:
-            continue
-        if make_mode == MakeMode.MM_MD:
-            page_markdown = ocr_mk_markdown_with_para_core_v2(
-                paras_of_layout, 'mm', img_buket_path)
-            output_content.extend(page_markdown)
-        elif make_mode == MakeMode.NLP_MD:
-            page_markdown = ocr_mk_markdown_with_para_core_v2(
-                paras_of_layout, 'nlp')
-            output_content.extend(page_markdown)
-        elif make_mode == MakeMode.STANDARD_FORMAT:
-            for para_block in paras_of_layout:
-                if drop_reason_flag:
-                    para_content = para_to_standard_format_v2(
-                        para_block, img_buket_path, page_idx)
-                else:
-                    para_content = para_to_standard_format_v2(
-                        para_block, img_buket_path, page_idx)
-                output_content.append(para_content)
+        output_content.extend(
+            make_page_content(page_info, make_mode, drop_mode, img_buket_path))
     if make_mode in [MakeMode.MM_MD, MakeMode.NLP_MD]:
         return '\n\n'.join(output_content)
     elif make_mode == MakeMode.STANDARD_FORMAT:
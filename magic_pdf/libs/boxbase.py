@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 
 def _is_in_or_part_overlap(box1, box2) -> bool:
     if box1 is None or box2 is None:
@@ -434,3 +436,92 @@ def calculate_vertical_projection_overlap_ratio(block1, block2):
     # Proportion of the x-axis covered by the intersection
     # logger.info(f"intersection_length: {intersection_length}, block1_length: {block1_length}")
     return intersection_length / block1_length
+
+
+def _bbox_array(bboxes) -> np.ndarray:
+    return np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+
+
+def bbox_relative_pos_matrix(bboxes1, bboxes2):
+    """Pairwise :func:`bbox_relative_pos` of two lists of bboxes.
+
+    Returns:
+        tuple: (left, right, bottom, top), boolean arrays of shape (N, M),
+            entry [i, j] is the flag of bboxes1[i] against bboxes2[j]
+    """
+    a = _bbox_array(bboxes1)[:, None, :]
+    b = _bbox_array(bboxes2)[None, :, :]
+    left = b[..., 2] < a[..., 0]
+    right = a[..., 2] < b[..., 0]
+    bottom = b[..., 3] < a[..., 1]
+    top = a[..., 3] < b[..., 1]
+    return left, right, bottom, top
+
+
+def bbox_distance_matrix(bboxes1, bboxes2) -> np.ndarray:
+    """Pairwise :func:`bbox_distance` of two lists of bboxes, shape (N, M)."""
+    a = _bbox_array(bboxes1)[:, None, :]
+    b = _bbox_array(bboxes2)[None, :, :]
+    x1, y1, x1b, y1b = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+    x2, y2, x2b, y2b = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+    left, right, bottom, top = bbox_relative_pos_matrix(bboxes1, bboxes2)
+
+    # same precedence as the if chain of bbox_distance
+    conditions = [
+        top & left, left & bottom, bottom & right, right & top,
+        left, right, bottom, top,
+    ]
+    choices = [
+        np.sqrt((x1 - x2b) ** 2 + (y1b - y2) ** 2),
+        np.sqrt((x1 - x2b) ** 2 + (y1 - y2b) ** 2),
+        np.sqrt((x1b - x2) ** 2 + (y1 - y2b) ** 2),
+        np.sqrt((x1b - x2) ** 2 + (y1b - y2) ** 2),
+        x1 - x2b,
+        x2 - x1b,
+        y1 - y2b,
+        y2 - y1b,
+    ]
+    return np.select(conditions, choices, default=0.0)
+
+
+def calculate_iou_matrix(bboxes) -> np.ndarray:
+    """Pairwise :func:`calculate_iou` of a list of bboxes, shape (N, N)."""
+    boxes = _bbox_array(bboxes)
+    a = boxes[:, None, :]
+    b = boxes[None, :, :]
+    x_left = np.maximum(a[..., 0], b[..., 0])
+    y_top = np.maximum(a[..., 1], b[..., 1])
+    x_right = np.minimum(a[..., 2], b[..., 2])
+    y_bottom = np.minimum(a[..., 3], b[..., 3])
+
+    intersection_area = (x_right - x_left) * (y_bottom - y_top)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    union_area = areas[:, None] + areas[None, :] - intersection_area
+    valid = (
+        (x_right >= x_left) & (y_bottom >= y_top)
+        & (areas[:, None] != 0) & (areas[None, :] != 0)
+    )
+    iou = np.zeros_like(intersection_area)
+    np.divide(intersection_area, union_area, out=iou, where=valid)
+    return iou
+
+
+def is_in_matrix(bboxes1, bboxes2) -> np.ndarray:
+    """Pairwise :func:`_is_in`, entry [i, j] tells whether bboxes1[i] is in bboxes2[j]."""
+    a = _bbox_array(bboxes1)[:, None, :]
+    b = _bbox_array(bboxes2)[None, :, :]
+    return (
+        (a[..., 0] >= b[..., 0]) & (a[..., 1] >= b[..., 1])
+        & (a[..., 2] <= b[..., 2]) & (a[..., 3] <= b[..., 3])
+    )
+
+
+def is_part_overlap_matrix(bboxes1, bboxes2) -> np.ndarray:
+    """Pairwise :func:`_is_part_overlap` of two lists of bboxes, shape (N, M)."""
+    a = _bbox_array(bboxes1)[:, None, :]
+    b = _bbox_array(bboxes2)[None, :, :]
+    in_or_part_overlap = ~(
+        (a[..., 2] < b[..., 0]) | (a[..., 0] > b[..., 2])
+        | (a[..., 3] < b[..., 1]) | (a[..., 1] > b[..., 3])
+    )
+    return in_or_part_overlap & ~is_in_matrix(bboxes1, bboxes2)
@@ -1,9 +1,9 @@
 # Copyright (c) Opendatalab. All rights reserved.
-import torch
 import gc
 
 
 def clean_memory(device='cuda'):
+    import torch
     if device == 'cuda':
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
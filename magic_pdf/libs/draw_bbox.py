@@ -5,8 +5,13 @@ from magic_pdf.config.ocr_content_type import (BlockType, CategoryId,
 from magic_pdf.data.dataset import Dataset
 from magic_pdf.model.magic_model import MagicModel
 
+DEBUG_LAYER_MODEL = 'model'
+DEBUG_LAYER_LAYOUT = 'layout'
+DEBUG_LAYER_SPANS = 'spans'
+DEBUG_LAYERS = (DEBUG_LAYER_MODEL, DEBUG_LAYER_LAYOUT, DEBUG_LAYER_SPANS)
 
-def draw_bbox_without_number(i, bbox_list, page, rgb_config, fill_config):
+
+def draw_bbox_without_number(i, bbox_list, page, rgb_config, fill_config, oc=0):
     new_rgb = []
     for item in rgb_config:
         item = float(item) / 255
@@ -23,6 +28,7 @@ def draw_bbox_without_number(i, bbox_list, page, rgb_config, fill_config):
                 fill_opacity=0.3,
                 width=0.5,
                 overlay=True,
+                oc=oc,
             )  # Draw the rectangle
         else:
             page.draw_rect(
@@ -32,10 +38,11 @@ def draw_bbox_without_number(i, bbox_list, page, rgb_config, fill_config):
                 fill_opacity=1,
                 width=0.5,
                 overlay=True,
+                oc=oc,
             )  # Draw the rectangle
 
 
-def draw_bbox_with_number(i, bbox_list, page, rgb_config, fill_config, draw_bbox=True):
+def draw_bbox_with_number(i, bbox_list, page, rgb_config, fill_config, draw_bbox=True, oc=0):
     new_rgb = []
     for item in rgb_config:
         item = float(item) / 255
@@ -53,6 +60,7 @@ def draw_bbox_with_number(i, bbox_list, page, rgb_config, fill_config, draw_bbox
                     fill_opacity=0.3,
                     width=0.5,
                     overlay=True,
+                    oc=oc,
                 )  # Draw the rectangle
             else:
                 page.draw_rect(
@@ -62,13 +70,26 @@ def draw_bbox_with_number(i, bbox_list, page, rgb_config, fill_config, draw_bbox
                     fill_opacity=1,
                     width=0.5,
                     overlay=True,
+                    oc=oc,
                 )  # Draw the rectangle
         page.insert_text(
-            (x1 + 2, y0 + 10), str(j + 1), fontsize=10, color=new_rgb
+            (x1 + 2, y0 + 10), str(j + 1), fontsize=10, color=new_rgb, oc=oc
         )  # Insert the index in the top left corner of the rectangle
 
 
-def draw_layout_bbox(pdf_info, pdf_bytes, out_path, filename):
+def _draw_bbox_passes(i, page, bbox_passes, oc=0):
+    """Draw the boxes of page i of every (bbox_list, rgb_config, fill_config,
+    numbered, draw_bbox) pass on page, in the optional content group oc."""
+    for bbox_list, rgb_config, fill_config, numbered, draw_bbox in bbox_passes:
+        if i >= len(bbox_list):
+            continue
+        if numbered:
+            draw_bbox_with_number(i, bbox_list, page, rgb_config, fill_config, draw_bbox=draw_bbox, oc=oc)
+        else:
+            draw_bbox_without_number(i, bbox_list, page, rgb_config, fill_config, oc=oc)
+
+
+def _layout_bbox_passes(pdf_info):
     dropped_bbox_list = []
     tables_list, tables_body_list = [], []
     tables_caption_list, tables_footnote_list = [], []
@@ -171,34 +192,36 @@ def draw_layout_bbox(pdf_info, pdf_bytes, out_path, filename):
 
         layout_bbox_list.append(page_block_list)
 
-    pdf_docs = fitz.open('pdf', pdf_bytes)
+    return [
+        (dropped_bbox_list, [158, 158, 158], True, False, True),
+        # (tables_list, [153, 153, 0], True, False, True),  # color !
+        (tables_body_list, [204, 204, 0], True, False, True),
+        (tables_caption_list, [255, 255, 102], True, False, True),
+        (tables_footnote_list, [229, 255, 204], True, False, True),
+        # (imgs_list, [51, 102, 0], True, False, True),
+        (imgs_body_list, [153, 255, 51], True, False, True),
+        (imgs_caption_list, [102, 178, 255], True, False, True),
+        (imgs_footnote_list, [255, 178, 102], True, False, True),
+        (titles_list, [102, 102, 255], True, False, True),
+        (texts_list, [153, 0, 76], True, False, True),
+        (interequations_list, [0, 255, 0], True, False, True),
+        (lists_list, [40, 169, 92], True, False, True),
+        (indexs_list, [40, 169, 92], True, False, True),
+        (layout_bbox_list, [255, 0, 0], False, True, False),
+    ]
 
-    for i, page in enumerate(pdf_docs):
 
-        draw_bbox_without_number(i, dropped_bbox_list, page, [158, 158, 158], True)
-        # draw_bbox_without_number(i, tables_list, page, [153, 153, 0], True)  # color !
-        draw_bbox_without_number(i, tables_body_list, page, [204, 204, 0], True)
-        draw_bbox_without_number(i, tables_caption_list, page, [255, 255, 102], True)
-        draw_bbox_without_number(i, tables_footnote_list, page, [229, 255, 204], True)
-        # draw_bbox_without_number(i, imgs_list, page, [51, 102, 0], True)
-        draw_bbox_without_number(i, imgs_body_list, page, [153, 255, 51], True)
-        draw_bbox_without_number(i, imgs_caption_list, page, [102, 178, 255], True)
-        draw_bbox_without_number(i, imgs_footnote_list, page, [255, 178, 102], True),
-        draw_bbox_without_number(i, titles_list, page, [102, 102, 255], True)
-        draw_bbox_without_number(i, texts_list, page, [153, 0, 76], True)
-        draw_bbox_without_number(i, interequations_list, page, [0, 255, 0], True)
-        draw_bbox_without_number(i, lists_list, page, [40, 169, 92], True)
-        draw_bbox_without_number(i, indexs_list, page, [40, 169, 92], True)
-
-        draw_bbox_with_number(
-            i, layout_bbox_list, page, [255, 0, 0], False, draw_bbox=False
-        )
+def draw_layout_bbox(pdf_info, pdf_bytes, out_path, filename):
+    bbox_passes = _layout_bbox_passes(pdf_info)
+    pdf_docs = fitz.open('pdf', pdf_bytes)
+    for i, page in enumerate(pdf_docs):
+        _draw_bbox_passes(i, page, bbox_passes)
 
     # Save the PDF
     pdf_docs.save(f'{out_path}/{filename}')
 
 
-def draw_span_bbox(pdf_info, pdf_bytes, out_path, filename):
+def _span_bbox_passes(pdf_info):
     text_list = []
     inline_equation_list = []
     interline_equation_list = []
@@ -272,21 +295,27 @@ def draw_span_bbox(pdf_info, pdf_bytes, out_path, filename):
         interline_equation_list.append(page_interline_equation_list)
         image_list.append(page_image_list)
         table_list.append(page_table_list)
+    return [
+        (text_list, [255, 0, 0], False, False, True),
+        (inline_equation_list, [0, 255, 0], False, False, True),
+        (interline_equation_list, [0, 0, 255], False, False, True),
+        (image_list, [255, 204, 0], False, False, True),
+        (table_list, [204, 0, 255], False, False, True),
+        (dropped_list, [158, 158, 158], False, False, True),
+    ]
+
+
+def draw_span_bbox(pdf_info, pdf_bytes, out_path, filename):
+    bbox_passes = _span_bbox_passes(pdf_info)
     pdf_docs = fitz.open('pdf', pdf_bytes)
     for i, page in enumerate(pdf_docs):
-
-        draw_bbox_without_number(i, text_list, page, [255, 0, 0], False)
-        draw_bbox_without_number(i, inline_equation_list, page, [0, 255, 0], False)
-        draw_bbox_without_number(i, interline_equation_list, page, [0, 0, 255], False)
-        draw_bbox_without_number(i, image_list, page, [255, 204, 0], False)
-        draw_bbox_without_number(i, table_list, page, [204, 0, 255], False)
-        draw_bbox_without_number(i, dropped_list, page, [158, 158, 158], False)
+        _draw_bbox_passes(i, page, bbox_passes)
 
     # Save the PDF
     pdf_docs.save(f'{out_path}/{filename}')
 
 
-def draw_model_bbox(model_list, dataset: Dataset, out_path, filename):
+def _model_bbox_passes(model_list, dataset: Dataset):
     dropped_bbox_list = []
     tables_body_list, tables_caption_list, tables_footnote_list = [], [], []
     imgs_body_list, imgs_caption_list, imgs_footnote_list = [], [], []
@@ -337,25 +366,64 @@ def draw_model_bbox(model_list, dataset: Dataset, out_path, filename):
         dropped_bbox_list.append(page_dropped_list)
         imgs_footnote_list.append(imgs_footnote)
 
+    return [
+        (dropped_bbox_list, [158, 158, 158], True, True, True),  # color !
+        (tables_body_list, [204, 204, 0], True, True, True),
+        (tables_caption_list, [255, 255, 102], True, True, True),
+        (tables_footnote_list, [229, 255, 204], True, True, True),
+        (imgs_body_list, [153, 255, 51], True, True, True),
+        (imgs_caption_list, [102, 178, 255], True, True, True),
+        (imgs_footnote_list, [255, 178, 102], True, True, True),
+        (titles_list, [102, 102, 255], True, True, True),
+        (texts_list, [153, 0, 76], True, True, True),
+        (interequations_list, [0, 255, 0], True, True, True),
+    ]
+
+
+def draw_model_bbox(model_list, dataset: Dataset, out_path, filename):
+    bbox_passes = _model_bbox_passes(model_list, dataset)
     for i in range(len(dataset)):
-        page = dataset.get_page(i)
-        draw_bbox_with_number(
-            i, dropped_bbox_list, page, [158, 158, 158], True
-        )  # color !
-        draw_bbox_with_number(i, tables_body_list, page, [204, 204, 0], True)
-        draw_bbox_with_number(i, tables_caption_list, page, [255, 255, 102], True)
-        draw_bbox_with_number(i, tables_footnote_list, page, [229, 255, 204], True)
-        draw_bbox_with_number(i, imgs_body_list, page, [153, 255, 51], True)
-        draw_bbox_with_number(i, imgs_caption_list, page, [102, 178, 255], True)
-        draw_bbox_with_number(i, imgs_footnote_list, page, [255, 178, 102], True)
-        draw_bbox_with_number(i, titles_list, page, [102, 102, 255], True)
-        draw_bbox_with_number(i, texts_list, page, [153, 0, 76], True)
-        draw_bbox_with_number(i, interequations_list, page, [0, 255, 0], True)
+        _draw_bbox_passes(i, dataset.get_page(i), bbox_passes)
 
     # Save the PDF
     dataset.dump_to_file(f'{out_path}/{filename}')
 
 
+def draw_debug_bbox(pdf_bytes, pdf_info=None, model_list=None, dataset: Dataset = None,
+                    layers=DEBUG_LAYERS) -> bytes:
+    """Draw the model, layout and span overlays in one pass over the
+    document, each as a layer (optional content group) of a single PDF that
+    viewers can switch on and off. The first layer is visible when opened.
+
+    Args:
+        pdf_bytes (bytes): the document
+        pdf_info (list, optional): pages of the pipe result, for the layout and spans layers. Defaults to None.
+        model_list (list, optional): the model inference result, for the model layer. It is fixed up in place by MagicModel. Defaults to None.
+        dataset (Dataset, optional): the dataset of model_list. Defaults to None.
+        layers (tuple, optional): the layers to draw, of DEBUG_LAYERS. Defaults to all.
+
+    Returns:
+        bytes: the layered PDF
+    """
+    layer_passes = {}
+    for layer in layers:
+        if layer == DEBUG_LAYER_MODEL and model_list is not None:
+            layer_passes[layer] = _model_bbox_passes(model_list, dataset)
+        elif layer == DEBUG_LAYER_LAYOUT and pdf_info is not None:
+            layer_passes[layer] = _layout_bbox_passes(pdf_info)
+        elif layer == DEBUG_LAYER_SPANS and pdf_info is not None:
+            layer_passes[layer] = _span_bbox_passes(pdf_info)
+
+    pdf_docs = fitz.open('pdf', pdf_bytes)
+    ocgs = {
+        layer: pdf_docs.add_ocg(layer, on=n == 0) for n, layer in enumerate(layer_passes)
+    }
+    for i, page in enumerate(pdf_docs):
+        for layer, bbox_passes in layer_passes.items():
+            _draw_bbox_passes(i, page, bbox_passes, oc=ocgs[layer])
+    return pdf_docs.tobytes()
+
+
 def draw_line_sort_bbox(pdf_info, pdf_bytes, out_path, filename):
     layout_bbox_list = []
 
@@ -0,0 +1,194 @@
+"""Streaming JSON output and a page index to read single entries back.
+
+:class:`JsonStreamWriter` writes one JSON document to a text stream a
+member at a time, so large results (middle json, content list, model json)
+are never built as one string. Output is compact by default, encoded with
+orjson when it is installed. ``pretty=True`` gives the indented layout of
+``json.dumps(..., ensure_ascii=False, indent=4)``.
+
+The writer records where every item of a streamed array starts and ends in
+the encoded file. :func:`write_index` stores these offsets in a sidecar file
+next to the document, and :func:`load_indexed_item` reads a single item
+through ``DataReader.read_at``, without parsing the rest of the document.
+"""
+import json
+from typing import List, Optional, TextIO, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional, the json module is used instead
+    orjson = None
+
+INDEX_VERSION = 1
+
+_ORJSON_OPTIONS = 0
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(obj, pretty: bool = False) -> str:
+    """JSON text of obj.
+
+    Args:
+        obj: the value to encode
+        pretty (bool, optional): indent by 4 spaces like json.dumps(indent=4). Defaults to False, compact.
+
+    Returns:
+        str: the JSON text, non-ascii characters are kept
+    """
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=4)
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode('utf-8')
+        except TypeError:
+            # e.g. integers beyond 64 bit, the json module handles them
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _encoded_size(text: str) -> int:
+    # as the data writers encode: utf-8, unencodable characters replaced
+    return len(text.encode('utf-8', errors='replace'))
+
+
+class JsonStreamWriter:
+    """Write a JSON document to a text stream piece by piece.
+
+    Containers are opened with :meth:`begin_object` / :meth:`begin_array`
+    and closed with :meth:`end`, members are written with :meth:`value`::
+
+        json_writer = JsonStreamWriter(stream)
+        json_writer.begin_object()
+        json_writer.begin_array('pdf_info')
+        for page in pages:
+            json_writer.value(page)
+        json_writer.end()
+        json_writer.value(version, key='_version_name')
+        json_writer.end()
+    """
+
+    def __init__(self, stream: TextIO, pretty: bool = False):
+        self.stream = stream
+        self.pretty = pretty
+        # bytes written so far, in the encoding of the data writers
+        self.offset = 0
+        # per open container: [closing bracket, number of members]
+        self._stack = []
+
+    def _write(self, text: str):
+        self.stream.write(text)
+        self.offset += _encoded_size(text)
+
+    def _indent(self, level: int) -> str:
+        return '    ' * level
+
+    def _member_prefix(self, key: Optional[str]):
+        if self._stack:
+            container = self._stack[-1]
+            if container[1]:
+                self._write(',')
+            if self.pretty:
+                self._write('\n' + self._indent(len(self._stack)))
+            container[1] += 1
+            if (key is None) != (container[0] == ']'):
+                raise ValueError('object members need a key, array items must not have one')
+        if key is not None:
+            self._write(dumps(key) + (': ' if self.pretty else ':'))
+
+    def value(self, value, key: str = None) -> Tuple[int, int]:
+        """Write a member of the current container, or the whole document.
+
+        Args:
+            value: the value to write
+            key (str, optional): the member name when the container is an object. Defaults to None.
+
+        Returns:
+            Tuple[int, int]: byte offset and length of the value in the encoded output
+        """
+        self._member_prefix(key)
+        text = dumps(value, self.pretty)
+        if self.pretty and self._stack:
+            text = text.replace('\n', '\n' + self._indent(len(self._stack)))
+        start = self.offset
+        self._write(text)
+        return start, self.offset - start
+
+    def begin_object(self, key: str = None):
+        self._member_prefix(key)
+        self._write('{')
+        self._stack.append(['}', 0])
+
+    def begin_array(self, key: str = None):
+        self._member_prefix(key)
+        self._write('[')
+        self._stack.append([']', 0])
+
+    def end(self):
+        """Close the innermost open container."""
+        closing, count = self._stack.pop()
+        if self.pretty and count:
+            self._write('\n' + self._indent(len(self._stack)))
+        self._write(closing)
+
+
+def index_path(path: str) -> str:
+    """Path of the sidecar index of a JSON file: x.json -> x.index.json."""
+    if path.endswith('.json'):
+        return path[:-len('.json')] + '.index.json'
+    return path + '.index.json'
+
+
+def write_index(writer, path: str, offsets: List[Tuple[int, int]], meta: dict = None):
+    """Write the sidecar index of the JSON file at path.
+
+    Args:
+        writer (DataWriter): the writer the JSON file was written with
+        path (str): the JSON file
+        offsets (List[Tuple[int, int]]): byte offset and length of every item
+        meta (dict, optional): small values stored along, e.g. the other top level members. Defaults to None.
+    """
+    index = {
+        'version': INDEX_VERSION,
+        'items': [list(item) for item in offsets],
+        'meta': meta or {},
+    }
+    writer.write_string(index_path(path), dumps(index))
+
+
+def load_index(reader, path: str) -> Optional[dict]:
+    """The sidecar index of the JSON file at path, None when there is none."""
+    try:
+        index = json.loads(reader.read(index_path(path)))
+    except (OSError, ValueError):
+        return None
+    if index.get('version') != INDEX_VERSION:
+        return None
+    return index
+
+
+def load_indexed_item(reader, path: str, item_no: int, index: dict = None):
+    """Read one item of the streamed array of a JSON file through its index.
+
+    Args:
+        reader (DataReader): reader of the JSON file and its index
+        path (str): the JSON file
+        item_no (int): position of the item in the array
+        index (dict, optional): the loaded index, read when not given. Defaults to None.
+
+    Returns:
+        the decoded item
+
+    Raises:
+        FileNotFoundError: there is no usable index
+        IndexError: item_no is out of range
+    """
+    if index is None:
+        index = load_index(reader, path)
+        if index is None:
+            raise FileNotFoundError(f'no index for {path}')
+    offset, length = index['items'][item_no]
+    data = reader.read_at(path, offset, length)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
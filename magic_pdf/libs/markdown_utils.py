@@ -1,3 +1,5 @@
+import re
+
 
 def ocr_escape_special_markdown_char(content):
     special_chars = ["*", "`", "~", "$"]
@@ -5,3 +7,23 @@ def ocr_escape_special_markdown_char(content):
         content = content.replace(char, "\\" + char)
 
     return content
+
+
+# undo the escaping of $ and * and escape the special tokens of the VLM
+_MARKDOWN_OUTPUT_REPLACEMENTS = {
+    '\\$': '$',
+    '\\*': '*',
+    '<seg>': '\\<seg\\>',
+    '<sos': '\\<sos\\>',
+    '<eos>': '\\<eos\\>',
+    '<pad>': '\\<pad\\>',
+    '<unk>': '\\<unk\\>',
+    '<sep>': '\\<sep\\>',
+    '<cls>': '\\<cls\\>',
+}
+_MARKDOWN_OUTPUT_PATTERN = re.compile('|'.join(map(re.escape, _MARKDOWN_OUTPUT_REPLACEMENTS)))
+
+
+def fix_markdown_output(content: str) -> str:
+    """Final replacements of the markdown output, in a single pass."""
+    return _MARKDOWN_OUTPUT_PATTERN.sub(lambda m: _MARKDOWN_OUTPUT_REPLACEMENTS[m.group(0)], content)
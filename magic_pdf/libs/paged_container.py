@@ -0,0 +1,189 @@
+"""Paged binary container for per-page results (model output, middle json).
+
+Every page is a separately compressed JSON frame, so one page can be decoded
+without touching the others. Layout, little endian::
+
+    header   magic b'MKPG' | version u16 | codec u8 | reserved u8
+    frames   one compressed JSON document per page, then the meta frame
+    index    page_count x (offset u64, length u32)
+    footer   index_offset u64 | page_count u32 | meta_offset u64 | meta_length u32 | magic b'MKPG'
+
+The meta frame holds the members of the document besides its pages, e.g.
+``_para_blocks`` and ``_version_name`` of a middle json, and ``kind``
+(``model`` or ``middle``).
+
+:class:`PagedWriter` collects the frames and returns the file content,
+:class:`PagedReader` memory-maps a file (or wraps bytes already read) and
+decodes pages on demand::
+
+    with PagedReader.open('doc_middle.mkpg') as reader:
+        page = reader.page(37)
+"""
+import json
+import mmap
+import struct
+import zlib
+from typing import Iterator, Union
+
+import brotli
+
+from magic_pdf.libs.json_stream import dumps
+
+MAGIC = b'MKPG'
+FORMAT_VERSION = 1
+
+CODEC_NONE = 'none'
+CODEC_ZLIB = 'zlib'
+CODEC_BROTLI = 'brotli'
+CODECS = (CODEC_NONE, CODEC_ZLIB, CODEC_BROTLI)
+
+KIND_MODEL = 'model'
+KIND_MIDDLE = 'middle'
+
+_HEADER = struct.Struct('<4sHBB')
+_INDEX_ENTRY = struct.Struct('<QI')
+_FOOTER = struct.Struct('<QIQI4s')
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 6)
+    if codec == CODEC_BROTLI:
+        return brotli.compress(data, quality=6)
+    return data
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    if codec == CODEC_BROTLI:
+        return brotli.decompress(data)
+    return data
+
+
+class PagedWriter:
+    """Build a paged container page by page."""
+
+    def __init__(self, codec: str = CODEC_ZLIB):
+        if codec not in CODECS:
+            raise ValueError(f'codec must be one of {", ".join(CODECS)}, got {codec!r}')
+        self.codec = codec
+        self._buffer = bytearray(_HEADER.pack(MAGIC, FORMAT_VERSION, CODECS.index(codec), 0))
+        self._index = []
+
+    def _frame(self, obj) -> tuple:
+        frame = _compress(dumps(obj).encode('utf-8'), self.codec)
+        offset = len(self._buffer)
+        self._buffer += frame
+        return offset, len(frame)
+
+    def add_page(self, page):
+        """Append the frame of the next page."""
+        self._index.append(self._frame(page))
+
+    def finish(self, meta: dict = None) -> bytes:
+        """The content of the container, with meta as its meta frame."""
+        meta_offset, meta_length = self._frame(meta or {})
+        index_offset = len(self._buffer)
+        for offset, length in self._index:
+            self._buffer += _INDEX_ENTRY.pack(offset, length)
+        self._buffer += _FOOTER.pack(index_offset, len(self._index), meta_offset, meta_length, MAGIC)
+        return bytes(self._buffer)
+
+
+def pack_pages(pages: list, meta: dict = None, codec: str = CODEC_ZLIB) -> bytes:
+    """A paged container of pages.
+
+    Args:
+        pages (list): the page dicts
+        meta (dict, optional): the meta frame. Defaults to None.
+        codec (str, optional): one of CODECS. Defaults to CODEC_ZLIB.
+
+    Returns:
+        bytes: the container
+    """
+    writer = PagedWriter(codec)
+    for page in pages:
+        writer.add_page(page)
+    return writer.finish(meta)
+
+
+class PagedReader:
+    """Random page access to a paged container.
+
+    Use :meth:`open` to memory-map a local file, or pass the content (bytes,
+    or any buffer) directly.
+    """
+
+    def __init__(self, data: Union[bytes, memoryview, mmap.mmap]):
+        self._data = data
+        self._file = None
+        if len(data) < _HEADER.size + _FOOTER.size:
+            raise ValueError('not a paged container: too short')
+        magic, version, codec, _ = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError('not a paged container: bad magic')
+        if version > FORMAT_VERSION:
+            raise ValueError(f'paged container version {version} is newer than the supported {FORMAT_VERSION}')
+        if codec >= len(CODECS):
+            raise ValueError(f'unknown paged container codec {codec}')
+        self.version = version
+        self.codec = CODECS[codec]
+        index_offset, page_count, meta_offset, meta_length, magic = _FOOTER.unpack_from(
+            data, len(data) - _FOOTER.size
+        )
+        if magic != MAGIC:
+            raise ValueError('not a paged container: truncated')
+        self._index_offset = index_offset
+        self._page_count = page_count
+        self.meta = self._decode(meta_offset, meta_length)
+
+    @classmethod
+    def open(cls, path: str) -> 'PagedReader':
+        """Memory-map the container at path."""
+        f = open(path, 'rb')
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            reader = cls(data)
+        except Exception:
+            f.close()
+            raise
+        reader._file = f
+        return reader
+
+    def _decode(self, offset: int, length: int):
+        return json.loads(_decompress(self._data[offset:offset + length], self.codec))
+
+    def __len__(self) -> int:
+        return self._page_count
+
+    def page(self, page_no: int):
+        """Decode a single page.
+
+        Raises:
+            IndexError: page_no is out of range
+        """
+        if page_no < 0:
+            page_no += self._page_count
+        if not 0 <= page_no < self._page_count:
+            raise IndexError(f'page {page_no} out of range, the container has {self._page_count} pages')
+        offset, length = _INDEX_ENTRY.unpack_from(self._data, self._index_offset + page_no * _INDEX_ENTRY.size)
+        return self._decode(offset, length)
+
+    def pages(self) -> Iterator:
+        """Decode the pages one by one."""
+        for page_no in range(self._page_count):
+            yield self.page(page_no)
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,3 +1,5 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 import cv2
 import fitz
@@ -32,6 +34,108 @@ def cut_image(bbox: tuple, page_num: int, page: fitz.Page, return_path, imageWri
     return img_hash256_path
 
 
+# format -> (PIL format, file extension)
+IMAGE_FORMATS = {
+    'jpeg': ('JPEG', 'jpg'),
+    'png': ('PNG', 'png'),
+    'webp': ('WEBP', 'webp'),
+}
+
+_PIXMAP_MODES = {1: 'L', 3: 'RGB', 4: 'RGBA'}
+
+
+class ImageExtractor:
+    """Cut image and table regions out of the pages of a document, writing
+    each as a file named by the SHA-256 of its rendered pixels.
+
+    Regions are rendered on the calling thread, fitz documents are not thread
+    safe. Encoding and writing run on a thread pool, and identical crops, e.g.
+    a logo repeated on every page, are encoded and written only once. Call
+    close() (or use it as a context manager) when the document is done, it
+    waits for the pending writes.
+    """
+
+    def __init__(self, imageWriter: DataWriter, zoom: float = 3, image_format: str = 'jpeg',
+                 quality: int = 95, num_workers: int = 4):
+        """
+        Args:
+            imageWriter (DataWriter): writer of the image files
+            zoom (float, optional): render scale of the regions. Defaults to 3.
+            image_format (str, optional): jpeg, png or webp. Defaults to 'jpeg'.
+            quality (int, optional): jpeg and webp quality. Defaults to 95.
+            num_workers (int, optional): encoding threads, 0 encodes on the calling thread. Defaults to 4.
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f'image_format must be one of {", ".join(IMAGE_FORMATS)}, got {image_format!r}')
+        self.imageWriter = imageWriter
+        self.zoom = zoom
+        self.image_format = image_format
+        self.quality = quality
+        self._pool = ThreadPoolExecutor(num_workers, thread_name_prefix='image-extractor') if num_workers > 0 else None
+        # file name -> pending write, of every image of the document
+        self._written = {}
+
+    @classmethod
+    def from_config(cls, imageWriter: DataWriter, config: dict) -> 'ImageExtractor':
+        """Build an extractor from the image_extraction section of the model config."""
+        return cls(
+            imageWriter,
+            zoom=config.get('zoom', 3),
+            image_format=config.get('format', 'jpeg'),
+            quality=config.get('quality', 95),
+            num_workers=config.get('num_workers', 4),
+        )
+
+    def _encode(self, name: str, width: int, height: int, n: int, samples: bytes):
+        pil_format, _ = IMAGE_FORMATS[self.image_format]
+        image = Image.frombytes(_PIXMAP_MODES[n], (width, height), samples)
+        if pil_format == 'JPEG' and image.mode == 'RGBA':
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        if pil_format == 'PNG':
+            image.save(buffer, format=pil_format)
+        else:
+            image.save(buffer, format=pil_format, quality=self.quality)
+        self.imageWriter.write(name, buffer.getvalue())
+
+    def cut(self, bbox: tuple, page: fitz.Page) -> str:
+        """Render the region bbox of page and schedule its file.
+
+        Returns:
+            str: the file name of the image, relative to the writer
+        """
+        pix = page.get_pixmap(clip=fitz.Rect(*bbox), matrix=fitz.Matrix(self.zoom, self.zoom))
+        samples = pix.samples_mv
+        # the settings are part of the name, so other settings never reuse a file
+        hasher = hashlib.sha256(f'{pix.width}x{pix.height}x{pix.n}:{self.image_format}:{self.quality}:'.encode())
+        hasher.update(samples)
+        name = f'{hasher.hexdigest()}.{IMAGE_FORMATS[self.image_format][1]}'
+        if name not in self._written:
+            args = (name, pix.width, pix.height, pix.n, bytes(samples))
+            if self._pool is not None:
+                self._written[name] = self._pool.submit(self._encode, *args)
+            else:
+                self._encode(*args)
+                self._written[name] = None
+        return name
+
+    def close(self):
+        """Wait for the pending writes, raising the first failure."""
+        try:
+            for pending in self._written.values():
+                if pending is not None:
+                    pending.result()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 def cut_image_to_pil_image(bbox: tuple, page: fitz.Page, mode="pillow"):
 
 
@@ -5,18 +5,60 @@ import time
 from loguru import logger
 
 from magic_pdf.config.constants import MODEL_NAME
+from magic_pdf.model.crop_packing import CropPacker
+from magic_pdf.model.table_tiling import TableTiler
 from io import BytesIO
 from PIL import Image
 from magic_pdf.model.sub_modules.model_utils import (
-    clean_vram, crop_img)
+    clean_vram, crop_img, render_region)
 
 YOLO_LAYOUT_BASE_BATCH_SIZE = 1
 
+INSTRUCTION_TEXT = 'Please output the text content from the image.'
+INSTRUCTION_FORMULA = 'Please write out the expression of the formula in the image using LaTeX format.'
+INSTRUCTION_TABLE = 'This is the image of a table. Please output the table in html format.'
+
+# Layout categories sent to the VLM, everything else (abandon, image bodies,
+# footnotes, ...) is never cropped
+CID2INSTRUCTION = {
+    0: INSTRUCTION_TEXT,
+    1: INSTRUCTION_TEXT,
+    # 2: INSTRUCTION_TEXT,
+    4: INSTRUCTION_TEXT,
+    5: INSTRUCTION_TABLE,
+    6: INSTRUCTION_TEXT,
+    7: INSTRUCTION_TEXT,
+    8: INSTRUCTION_FORMULA,
+    # 9: INSTRUCTION_TEXT,
+    14: INSTRUCTION_FORMULA,
+    101: INSTRUCTION_TEXT,
+}
+
 class BatchAnalyzeLLM:
     def __init__(self, model):
         self.model = model
+        chat_config = model.configs.get('chat_config', {})
+        self.crop_packer = CropPacker.from_config(chat_config)
+        self.table_tiler = TableTiler.from_config(chat_config)
+        # cutting the page raster is faster on CPU, rendering from the PDF is opt-in
+        self.render_crops_from_pdf = chat_config.get('render_crops_from_pdf', False)
+
+    def __call__(self, images: list, split_pages: bool = False, pages: list = None, page_count: int = None) -> list:
+        """Run layout detection and VLM recognition on page rasters.
 
-    def __call__(self, images: list, split_pages: bool = False) -> list:
+        Args:
+            images (list): page rasters as numpy arrays
+            split_pages (bool, optional): pages are parsed separately. Defaults to False.
+            pages (list, optional): the source fitz pages of a PDF, aligned with images.
+                With chat_config.render_crops_from_pdf, crops are rendered from the page
+                instead of cut from the raster.
+            page_count (int, optional): pages of the document, when images is only part
+                of them (e.g. after the page filter). A single-page document is recognized
+                page by page like split pages. Defaults to len(images).
+
+        Returns:
+            list: layout results of each page
+        """
         images_layout_res = []
 
         layout_start_time = time.time()
@@ -54,6 +96,11 @@ class BatchAnalyzeLLM:
             images_layout_res += self.model.layout_model.batch_predict(
                 paddlex_layout_images, YOLO_LAYOUT_BASE_BATCH_SIZE 
             )
+        elif self.model.layout_model_name == MODEL_NAME.RecordedLayout:
+            # replayed layout, looked up by the page raster itself
+            images_layout_res += self.model.layout_model.batch_predict(
+                images, YOLO_LAYOUT_BASE_BATCH_SIZE
+            )
         else: 
             logger.error(f"Unsupported layout model name: {self.model.layout_model_name}")
             raise ValueError(f"Unsupported layout model name: {self.model.layout_model_name}")
@@ -67,14 +114,14 @@ class BatchAnalyzeLLM:
         llm_ocr_start = time.time()
         logger.info('VLM OCR start...')
         # Check if split_pages is True and handle pages without valid cids
-        if split_pages or len(images) == 1:
-            cid2instruction = [0, 1, 4, 5, 6, 7, 8, 14, 101]
-            
+        if page_count is None:
+            page_count = len(images)
+        if split_pages or page_count == 1:
             pages_to_process_directly = []
             for index in range(len(images)):
                 layout_res = images_layout_res[index]
                 # Check if this page has any valid cids
-                has_valid_cid = any(res['category_id'] in cid2instruction for res in layout_res)
+                has_valid_cid = any(res['category_id'] in CID2INSTRUCTION for res in layout_res)
                 
                 if not has_valid_cid:
                     pages_to_process_directly.append(index)
@@ -87,7 +134,7 @@ class BatchAnalyzeLLM:
                 for page_idx in pages_to_process_directly:
                     pil_img = Image.fromarray(images[page_idx])
                     direct_images.append(pil_img)
-                    direct_messages.append(f'''Please output the text content from the image.''')
+                    direct_messages.append(INSTRUCTION_TEXT)
                 
                 # Get direct recognition results
                 direct_results = self.model.chat_model.batch_inference(direct_images, direct_messages)
@@ -109,30 +156,42 @@ class BatchAnalyzeLLM:
                     }
                     images_layout_res[page_idx] = [pre_res, single_res]
 
-        new_images_all = []
-        cids_all = []
-        page_idxs = []
+        # Crop plan: only boxes that are recognized are cropped, results are
+        # scattered back by (page, box) index
+        plan = []
+        crop_images = []
+        crop_cids = []
+        crop_polys = []
         for index in range(len(images)):
             layout_res = images_layout_res[index]
-            pil_img = Image.fromarray(images[index])
-            new_images = []
-            cids = []
-            for res in layout_res:
-                new_image, useful_list = crop_img(
-                    res, pil_img, crop_paste_x=50, crop_paste_y=50
-                )
-                new_images.append(new_image)
-                cids.append(res['category_id'])
-            new_images_all.extend(new_images)
-            cids_all.extend(cids)
-            page_idxs.append(len(new_images_all) - len(new_images))
-        ocr_result = self.batch_llm_ocr(new_images_all, cids_all)
+            if not any(res['category_id'] in CID2INSTRUCTION for res in layout_res):
+                continue
+            page = pages[index] if pages is not None and self.render_crops_from_pdf else None
+            if page is not None and page.rotation == 0:
+                scale = images[index].shape[1] / page.rect.width
+                def crop(res):
+                    return render_region(res, page, scale, crop_paste_x=50, crop_paste_y=50)
+            else:
+                pil_img = Image.fromarray(images[index])
+                def crop(res):
+                    return crop_img(res, pil_img, crop_paste_x=50, crop_paste_y=50)
+            for i, res in enumerate(layout_res):
+                if res['category_id'] not in CID2INSTRUCTION:
+                    continue
+                new_image, useful_list = crop(res)
+                plan.append((index, i))
+                crop_images.append(new_image)
+                crop_cids.append(res['category_id'])
+                crop_polys.append(res['poly'])
+        crop_ocr = self.recognize_crops(crop_images, crop_cids, [index for index, _ in plan], crop_polys)
+        ocr_result = dict(zip(plan, crop_ocr))
+        crop_images.clear()
         for index in range(len(images)):
             ocr_results = []
             layout_res = images_layout_res[index]
             for i in range(len(layout_res)):
                 res = layout_res[i]
-                ocr = ocr_result[page_idxs[index]+i]
+                ocr = ocr_result.get((index, i), '')
                 if res['category_id'] in [8, 14]:
                     temp_res = copy.deepcopy(res)
                     temp_res['category_id'] = 14
@@ -161,6 +220,90 @@ class BatchAnalyzeLLM:
 
         return images_layout_res
 
+    def recognize_crops(self, images, cat_ids, page_idxs, polys):
+        """batch_llm_ocr with the optional table tiling and crop packing stages.
+
+        Tall tables are recognized as bands in the same batch as the other
+        crops and stitched back, tables whose bands can not be stitched are
+        recognized again as a whole.
+        """
+        tiles = {}
+        if self.table_tiler.enable:
+            for i, cid in enumerate(cat_ids):
+                if cid == 5:
+                    bands = self.table_tiler.tile(images[i])
+                    if bands:
+                        tiles[i] = bands
+            if tiles:
+                logger.info(f'table tiling: {len(tiles)} tables in {sum(len(b) for b in tiles.values())} bands')
+
+        request_images, request_cids, request_pages, request_polys, owners = [], [], [], [], []
+        for i in range(len(images)):
+            for image in tiles.get(i, [images[i]]):
+                request_images.append(image)
+                request_cids.append(cat_ids[i])
+                request_pages.append(page_idxs[i])
+                request_polys.append(polys[i])
+                owners.append(i)
+
+        if self.crop_packer.enable:
+            outs = self.packed_llm_ocr(request_images, request_cids, request_pages, request_polys)
+        else:
+            outs = self.batch_llm_ocr(request_images, request_cids)
+
+        results = [[] for _ in images]
+        for owner, out in zip(owners, outs):
+            results[owner].append(out)
+        retry = []
+        for i in tiles:
+            stitched = self.table_tiler.stitch(results[i])
+            if stitched is None:
+                retry.append(i)
+            else:
+                results[i] = [stitched]
+        if retry:
+            logger.info(f'table tiling: {len(retry)} tables recognized again as a whole')
+            retry_outs = self.batch_llm_ocr([images[i] for i in retry], [cat_ids[i] for i in retry])
+            for i, out in zip(retry, retry_outs):
+                results[i] = [out]
+        return [result[0] for result in results]
+
+    def packed_llm_ocr(self, images, cat_ids, page_idxs, polys):
+        """batch_llm_ocr with small adjacent text crops packed into shared requests.
+
+        Packs whose transcription can not be split back per region are
+        recognized again region by region.
+        """
+        groups = self.crop_packer.plan(page_idxs, cat_ids, polys)
+        request_images = []
+        request_cids = []
+        for group in groups:
+            if len(group) == 1:
+                request_images.append(images[group[0]])
+            else:
+                request_images.append(self.crop_packer.pack([images[i] for i in group]))
+            request_cids.append(cat_ids[group[0]])
+        logger.info(f'crop packing: {len(images)} crops in {len(groups)} requests')
+
+        outs = [''] * len(images)
+        retry = []
+        for group, out in zip(groups, self.batch_llm_ocr(request_images, request_cids)):
+            if len(group) == 1:
+                outs[group[0]] = out
+                continue
+            parts = self.crop_packer.split(out, len(group))
+            if parts is None:
+                retry.extend(group)
+                continue
+            for i, part in zip(group, parts):
+                outs[i] = part
+        if retry:
+            logger.info(f'crop packing: {len(retry)} crops recognized again one by one')
+            retry_outs = self.batch_llm_ocr([images[i] for i in retry], [cat_ids[i] for i in retry])
+            for i, out in zip(retry, retry_outs):
+                outs[i] = out
+        return outs
+
     def batch_llm_ocr(self, images, cat_ids, version='lmdeploy'):
         import re
         def sanitize_md(output):
@@ -180,43 +323,19 @@ class BatchAnalyzeLLM:
                 return '<html>\n'+output.replace('```html','<html>').replace('```','</html>').strip()+'\n</html>'
             return f"{cleaned[0].replace('```html','<html>').replace('```','</html>').strip()}"
         assert len(images) == len(cat_ids)
-        instruction = f'''Please output the text content from the image.'''
-        instruction_mf = f'''Please write out the expression of the formula in the image using LaTeX format.'''
-        instruction_table = f'''This is the image of a table. Please output the table in html format.'''
-        cid2instruction = {
-            0: instruction,
-            1: instruction,
-            # 2: instruction,
-            4: instruction,
-            5: instruction_table,
-            6: instruction,
-            7: instruction,
-            8: instruction_mf,
-            # 9: instruction,
-            14: instruction_mf,
-            101: instruction,
-        }
-        new_images = []
-        messages = []
-        ignore_idx = []
-        outs = []
+        # indexes of the images that are recognized, the rest stay ''
+        keep_idx = [i for i in range(len(images)) if cat_ids[i] in CID2INSTRUCTION]
+        outs = [''] * len(images)
+        if len(keep_idx) == 0:
+            return outs
         if version in ['vllm', 'lmdeploy']:
-            for i in range(len(images)):
-                if cat_ids[i] not in cid2instruction:
-                    ignore_idx.append(i)
-                    continue
-                new_images.append(images[i])
-                messages.append(cid2instruction[cat_ids[i]])
-            if len(new_images) == 0:
-                return [''] * len(images)
-            out = self.model.chat_model.batch_inference(new_images, messages)
-            outs.extend(out)
+            new_images = [images[i] for i in keep_idx]
+            messages = [CID2INSTRUCTION[cat_ids[i]] for i in keep_idx]
+            results = self.model.chat_model.batch_inference(new_images, messages)
         else:
             buffer = BytesIO()
-            for i in range(len(images)):
-                if cat_ids[i] not in cid2instruction:
-                    ignore_idx.append(i)
-                    continue
+            messages = []
+            for i in keep_idx:
                 images[i].save(buffer, format='JPEG')
                 image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
                 messages.append(
@@ -227,24 +346,18 @@ class BatchAnalyzeLLM:
                                 "type": "image",
                                 "image": "data:image/jpeg;base64," + image_base64,
                             },
-                            {"type": "text", "text": "{}".format(cid2instruction[cat_ids[i]])},
+                            {"type": "text", "text": "{}".format(CID2INSTRUCTION[cat_ids[i]])},
                         ],
                     },]
                 )
                 buffer.seek(0)
                 buffer.truncate(0)
-                # if len(messages) == max_batch_size or i == len(images) - 1:
-            outs.extend(self.model.llm_model.batch_inference(messages))
-        for j in ignore_idx:
-            outs.insert(j, '')
-        messages.clear()
-        ignore_idx.clear()
-        for j in range(len(outs)):
-            if cat_ids[j] in cid2instruction:
-                if cat_ids[j] == 5:
-                    outs[j] = sanitize_html(outs[j])
-                elif cat_ids[j] in [8, 14]:
-                    outs[j] = sanitize_mf(outs[j])
-                else:
-                    outs[j] = sanitize_md(outs[j])
+            results = self.model.llm_model.batch_inference(messages)
+        for j, out in zip(keep_idx, results):
+            if cat_ids[j] == 5:
+                outs[j] = sanitize_html(out)
+            elif cat_ids[j] in [8, 14]:
+                outs[j] = sanitize_mf(out)
+            else:
+                outs[j] = sanitize_md(out)
         return outs
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""CPU inference profile.
+
+Used when ``device`` is ``cpu``: sizes the torch thread pools from the cgroup
+CPU quota and affinity instead of the host core count, optionally pins the
+process to one NUMA node, and picks the weight dtype / quantization of the
+transformers VLM backend. Configured by the ``cpu_config`` section of
+model_configs.yaml.
+"""
+import glob
+import math
+import os
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+DEFAULT_CPU_CONFIG = {
+    'num_threads': 'auto',
+    'interop_threads': 1,
+    'numa_node': 'auto',
+    'dtype': 'auto',
+    'quantization': 'none',
+    'static_cache': False,
+}
+
+
+def _parse_cpulist(text: str) -> List[int]:
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-')
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota of the container in cores, None when unlimited."""
+    try:
+        # cgroup v2
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def numa_nodes() -> Dict[int, List[int]]:
+    """NUMA node id -> cpus, empty when the topology is not exposed."""
+    nodes = {}
+    for path in glob.glob('/sys/devices/system/node/node[0-9]*/cpulist'):
+        node = int(os.path.basename(os.path.dirname(path))[len('node'):])
+        with open(path) as f:
+            cpus = _parse_cpulist(f.read())
+        if cpus:
+            nodes[node] = cpus
+    return dict(sorted(nodes.items()))
+
+
+def cpu_supports_bf16() -> bool:
+    """Native bf16 matmul (AVX512-BF16 or AMX), where bf16 is faster than fp32."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    flags = line.split(':', 1)[1].split()
+                    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+    except OSError:
+        pass
+    return False
+
+
+def pin_numa_node(numa_node) -> Optional[int]:
+    """Restrict the process to the cpus of one NUMA node.
+
+    Memory is then first-touch allocated on that node as well. 'auto' picks
+    the node with the most allowed cpus when there are several.
+
+    Returns:
+        int: the node pinned to, None when nothing was done
+    """
+    if numa_node in (None, 'none', False) or not hasattr(os, 'sched_setaffinity'):
+        return None
+    nodes = numa_nodes()
+    if len(nodes) < 2:
+        return None
+    allowed = set(available_cpus())
+    if numa_node == 'auto':
+        numa_node = max(nodes, key=lambda node: len(allowed & set(nodes[node])))
+    cpus = allowed & set(nodes.get(int(numa_node), []))
+    if not cpus:
+        logger.warning(f'numa node {numa_node} has no allowed cpus, not pinning')
+        return None
+    os.sched_setaffinity(0, cpus)
+    return int(numa_node)
+
+
+def apply_cpu_profile(cpu_config: Optional[dict] = None) -> dict:
+    """Pin NUMA and size the torch thread pools for CPU inference.
+
+    Call once, before any model runs: torch only accepts the inter-op
+    thread count before its first parallel region.
+
+    Args:
+        cpu_config (dict, optional): the cpu_config section of the model config
+
+    Returns:
+        dict: the effective profile, with num_threads resolved
+    """
+    import torch
+
+    profile = dict(DEFAULT_CPU_CONFIG, **(cpu_config or {}))
+    node = pin_numa_node(profile['numa_node'])
+
+    num_threads = profile['num_threads']
+    if num_threads in (None, 'auto'):
+        num_threads = len(available_cpus())
+        limit = cgroup_cpu_limit()
+        if limit is not None:
+            num_threads = min(num_threads, max(1, math.floor(limit)))
+    num_threads = int(num_threads)
+    profile['num_threads'] = num_threads
+
+    # libraries loaded later (MKL, OpenMP in tokenizers, ...) read these
+    os.environ.setdefault('OMP_NUM_THREADS', str(num_threads))
+    os.environ.setdefault('MKL_NUM_THREADS', str(num_threads))
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(int(profile['interop_threads']))
+    except RuntimeError:
+        # already set, or parallel work has started
+        pass
+
+    logger.info(
+        f'cpu profile: {num_threads} threads, numa node {node}, '
+        f'dtype {profile["dtype"]}, quantization {profile["quantization"]}'
+    )
+    return profile
+
+
+def cpu_torch_dtype(profile: dict):
+    """Weight dtype of the VLM on CPU."""
+    import torch
+
+    dtype = profile.get('dtype', 'auto')
+    if profile.get('quantization') == 'int8':
+        # dynamic int8 Linear kernels take float32 activations
+        return torch.float32
+    if dtype == 'auto':
+        return torch.bfloat16 if cpu_supports_bf16() else torch.float32
+    return {'bfloat16': torch.bfloat16, 'float32': torch.float32}[dtype]
+
+
+def quantize_for_cpu(model, profile: dict):
+    """Dynamic int8 quantization of the Linear layers when configured."""
+    if profile.get('quantization', 'none') == 'none':
+        return model
+    if profile['quantization'] != 'int8':
+        raise ValueError(f'unsupported cpu quantization: {profile["quantization"]}')
+    import torch
+
+    logger.info('quantizing Linear layers to dynamic int8')
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
@@ -0,0 +1,125 @@
+"""Pack small, vertically adjacent text crops into one VLM request.
+
+Dense pages produce many tiny title / text / caption crops, each paying the
+full request overhead (chat template, padding image tokens, prefill). A
+packer stacks runs of such crops of the same category into one canvas with
+a printed separator line between them, and splits the transcription back at
+the separators. When the number of separators read back does not match, the
+caller recognizes the regions of that pack one by one instead.
+
+Configured by ``chat_config.crop_packing`` in model_configs.yaml.
+"""
+import re
+from typing import List, Optional
+
+from PIL import Image, ImageDraw, ImageFont
+
+# categories recognized with the plain text instruction
+PACKABLE_CATEGORIES = (0, 1, 4, 6, 7, 101)
+
+
+class CropPacker:
+    def __init__(
+        self,
+        enable: bool = False,
+        max_region_height: int = 120,
+        max_regions: int = 6,
+        max_gap: int = 40,
+        separator: str = '@@@@',
+        padding: int = 50,
+    ):
+        """Crop packing settings.
+
+        Args:
+            enable (bool, optional): pack crops at all. Defaults to False.
+            max_region_height (int, optional): only regions at most this high (layout pixels) are packed. Defaults to 120.
+            max_regions (int, optional): regions per pack. Defaults to 6.
+            max_gap (int, optional): max vertical gap between packed regions (layout pixels). Defaults to 40.
+            separator (str, optional): marker printed between regions. Defaults to '@@@@'.
+            padding (int, optional): white padding the crops were made with. Defaults to 50.
+        """
+        self.enable = enable
+        self.max_region_height = max_region_height
+        self.max_regions = max_regions
+        self.max_gap = max_gap
+        self.separator = separator
+        self.padding = padding
+        # the VLM may escape markdown punctuation of the marker
+        marker = ''.join(r'\\?' + re.escape(c) for c in separator)
+        self._separator_re = re.compile(rf'^[ \t]*{marker}[ \t]*$', flags=re.MULTILINE)
+        try:
+            self._font = ImageFont.load_default(size=28)
+        except TypeError:
+            # Pillow < 10.1 only has the small bitmap font
+            self._font = ImageFont.load_default()
+
+    @classmethod
+    def from_config(cls, chat_config: dict) -> 'CropPacker':
+        return cls(**(chat_config.get('crop_packing') or {}))
+
+    def _packable(self, cid, poly) -> bool:
+        return cid in PACKABLE_CATEGORIES and poly[5] - poly[1] <= self.max_region_height
+
+    def plan(self, page_idxs: List[int], cids: List[int], polys: List[list]) -> List[List[int]]:
+        """Group crop indexes into requests.
+
+        Runs of packable crops on the same page with the same category that
+        follow each other top to bottom in one column form a pack, every other
+        crop is a request of its own.
+
+        Returns:
+            List[List[int]]: crop indexes of each request, in crop order of their first member
+        """
+        groups = []
+        runs = {}
+        order = sorted(
+            range(len(cids)),
+            key=lambda i: (page_idxs[i], cids[i], polys[i][1], polys[i][0]),
+        )
+        for i in order:
+            if not self.enable or not self._packable(cids[i], polys[i]):
+                groups.append([i])
+                continue
+            # open runs of this page and category, one per column
+            open_runs = runs.setdefault((page_idxs[i], cids[i]), [])
+            for run in open_runs:
+                last = polys[run[-1]]
+                gap = polys[i][1] - last[5]
+                same_column = min(last[4], polys[i][4]) > max(last[0], polys[i][0])
+                if len(run) < self.max_regions and -self.max_gap <= gap <= self.max_gap and same_column:
+                    run.append(i)
+                    break
+            else:
+                run = [i]
+                open_runs.append(run)
+                groups.append(run)
+        return sorted(groups, key=lambda group: min(group))
+
+    def pack(self, images: List[Image.Image]) -> Image.Image:
+        """Stack padded crops into one canvas with separator lines between them."""
+        inner = [
+            img.crop((self.padding, self.padding, img.width - self.padding, img.height - self.padding))
+            for img in images
+        ]
+        bbox = self._font.getbbox(self.separator)
+        separator_height = bbox[3] - bbox[1] + 24
+        width = max(max(img.width for img in inner), bbox[2] - bbox[0]) + 2 * self.padding
+        height = sum(img.height for img in inner) + separator_height * (len(inner) - 1) + 2 * self.padding
+
+        canvas = Image.new('RGB', (width, height), 'white')
+        draw = ImageDraw.Draw(canvas)
+        y = self.padding
+        for n, img in enumerate(inner):
+            if n > 0:
+                draw.text((self.padding, y + 12 - bbox[1]), self.separator, fill='black', font=self._font)
+                y += separator_height
+            canvas.paste(img, (self.padding, y))
+            y += img.height
+        return canvas
+
+    def split(self, output: str, count: int) -> Optional[List[str]]:
+        """Split the transcription of a pack, None when the separators read back don't match."""
+        parts = self._separator_re.split(output)
+        if len(parts) != count:
+            return None
+        return [part.strip() for part in parts]
@@ -4,22 +4,55 @@ import os
 # os.environ["LMDEPLOY_USE_FLASH_ATTN"] = "0"  # 注释掉强制禁用
 os.environ["TRITON_DISABLE_LINE_INFO"] = "1"
 
-import torch
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from magic_pdf.config.constants import *
-from magic_pdf.model.sub_modules.model_init import AtomModelSingleton
-from magic_pdf.model.model_list import AtomicModel
 from magic_pdf.utils.load_image import load_image, encode_image_base64
-from transformers import LayoutLMv3ForTokenClassification
 from loguru import logger
 import yaml
-from qwen_vl_utils import process_vision_info
 from PIL import Image
 from typing import List, Union
-from openai import OpenAI
+
+# torch, transformers, qwen_vl_utils and the VLM backends are imported where
+# they are used, so importing this module (and running a CLI that needs only
+# part of the models) stays cheap.
+
+COMPONENT_LAYOUT = 'layout'
+COMPONENT_READER = 'reader'
+COMPONENT_CHAT = 'chat'
+COMPONENTS = (COMPONENT_LAYOUT, COMPONENT_READER, COMPONENT_CHAT)
+
+# layout_config.reader.name that orders blocks with xy-cut instead of a model
+READER_XYCUT = 'xycut'
+
+# chat backends that may be loaded on a pool thread; the others (lmdeploy,
+# vllm and their queues) set up signal handlers or event loops and are
+# always loaded on the thread constructing MonkeyOCR
+THREAD_SAFE_CHAT_BACKENDS = ('transformers', 'mock', 'api')
 
 
 class MonkeyOCR:
-    def __init__(self, config_path):
+    def __init__(self, config_path, components=None, block=True):
+        """Load the MonkeyOCR models described by a config file.
+
+        The layout model, the layout reader and the VLM are loaded
+        concurrently. Components not listed in ``components`` are loaded on
+        first use, e.g. single task recognition never needs layout or reader.
+        A VLM backend outside THREAD_SAFE_CHAT_BACKENDS is always loaded on the
+        calling thread, up front or on first use.
+
+        Args:
+            config_path (str): model config file
+            components (list, optional): components loaded up front, any of
+                'layout', 'reader' and 'chat'. Defaults to all of them.
+            block (bool, optional): wait for the components to be loaded. With
+                False they load in the background, see ``readiness``, except a
+                VLM backend outside THREAD_SAFE_CHAT_BACKENDS, which is always
+                loaded on the calling thread before returning. Defaults to True.
+        """
         current_file_path = os.path.abspath(__file__)
 
         current_dir = os.path.dirname(current_file_path)
@@ -33,31 +66,31 @@ class MonkeyOCR:
         self.device = self.configs.get('device', 'cpu')
         logger.info('using device: {}'.format(self.device))
 
-        bf16_supported = False
-        if self.device.startswith("cuda"):
-            bf16_supported = torch.cuda.is_bf16_supported()
-        elif self.device.startswith("mps"):
-            bf16_supported = True
-        
-        models_dir = self.configs.get(
+        self.models_dir = self.configs.get(
             'models_dir', os.path.join(root_dir, 'model_weight')
         )
 
-        logger.info('using models_dir: {}'.format(models_dir))
-        if not os.path.exists(models_dir):
-            raise FileNotFoundError(
-                f"Model directory '{models_dir}' not found. "
-                "Please run 'python download_model.py' to download the required models."
-            )
-        
+        logger.info('using models_dir: {}'.format(self.models_dir))
+
         self.layout_config = self.configs.get('layout_config')
         self.layout_model_name = self.layout_config.get(
             'model', MODEL_NAME.DocLayout_YOLO
         )
+        self.layout_reader_name = self.layout_config.get('reader').get('name')
+        # recorded layouts, xy-cut ordering and the mock VLM need no weights
+        needs_weights = (
+            self.layout_model_name == MODEL_NAME.DocLayout_YOLO
+            or self.layout_reader_name == 'layoutreader'
+        )
+        if needs_weights and not os.path.exists(self.models_dir):
+            raise FileNotFoundError(
+                f"Model directory '{self.models_dir}' not found. "
+                "Please run 'python download_model.py' to download the required models."
+            )
         
         # 检查是否启用FlashAttention
-        chat_config = self.configs.get('chat_config', {})
-        use_flash_attention = chat_config.get('use_flash_attention', False)
+        self.chat_config = self.configs.get('chat_config', {})
+        use_flash_attention = self.chat_config.get('use_flash_attention', False)
         
         if use_flash_attention:
             # 尝试启用FlashAttention
@@ -68,34 +101,186 @@ class MonkeyOCR:
             os.environ["LMDEPLOY_USE_FLASH_ATTN"] = "0"
             logger.info("❌ FlashAttention已禁用")
 
+        self._loaders = {
+            COMPONENT_LAYOUT: self._load_layout_model,
+            COMPONENT_READER: self._load_layoutreader_model,
+            COMPONENT_CHAT: self._load_chat_model,
+        }
+        self._futures = {}
+        self._futures_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=len(COMPONENTS), thread_name_prefix='monkeyocr-load')
+        self.warm = False
+
+        self.cpu_profile = None
+        if self.device == 'cpu':
+            from magic_pdf.model.cpu_profile import apply_cpu_profile
+
+            # before any model is loaded, torch fixes its thread pools on first use
+            self.cpu_profile = apply_cpu_profile(self.configs.get('cpu_config'))
+
+        components = list(components or COMPONENTS)
+        for name in components:
+            if name not in self._loaders:
+                raise ValueError(f'unknown MonkeyOCR component: {name}')
+        if COMPONENT_CHAT in components and not self._chat_thread_safe():
+            # the other components load next to it in the pool
+            for name in components:
+                if name != COMPONENT_CHAT:
+                    self._load_async(name)
+            self._load_now(COMPONENT_CHAT)
+        else:
+            for name in components:
+                self._load_async(name)
+        if block:
+            self.wait()
+
+    def _chat_thread_safe(self):
+        return self.chat_config.get('backend', 'lmdeploy') in THREAD_SAFE_CHAT_BACKENDS
+
+    def _load_async(self, name):
+        with self._futures_lock:
+            future = self._futures.get(name)
+            if future is None:
+                future = self._executor.submit(self._loaders[name])
+                self._futures[name] = future
+            return future
+
+    def _load_now(self, name):
+        from concurrent.futures import Future
+
+        future = Future()
+        with self._futures_lock:
+            if name in self._futures:
+                return self._futures[name]
+            self._futures[name] = future
+        try:
+            future.set_result(self._loaders[name]())
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def _component(self, name):
+        if name not in self._futures:
+            logger.info(f'loading {name} model on first use')
+        if name == COMPONENT_CHAT and not self._chat_thread_safe():
+            return self._load_now(name).result()
+        return self._load_async(name).result()
+
+    @property
+    def layout_model(self):
+        return self._component(COMPONENT_LAYOUT)
+
+    @property
+    def layoutreader_model(self):
+        return self._component(COMPONENT_READER)
+
+    @property
+    def chat_model(self):
+        return self._component(COMPONENT_CHAT)
+
+    def wait(self):
+        """Wait for the requested components, raising the first loading error."""
+        for future in list(self._futures.values()):
+            future.result()
+
+    def readiness(self) -> dict:
+        """Loading state of each component: 'ready', 'loading', 'failed: ...' or 'not loaded'."""
+        states = {}
+        for name in COMPONENTS:
+            future = self._futures.get(name)
+            if future is None:
+                states[name] = 'not loaded'
+            elif not future.done():
+                states[name] = 'loading'
+            elif future.exception() is not None:
+                states[name] = f'failed: {future.exception()}'
+            else:
+                states[name] = 'ready'
+        states['warm'] = self.warm
+        return states
+
+    @property
+    def ready(self) -> bool:
+        """All requested components are loaded."""
+        futures = list(self._futures.values())
+        return all(f.done() and f.exception() is None for f in futures)
+
+    def warmup(self):
+        """Run a dummy page through the requested components once, so CUDA
+        kernels are compiled and memory is allocated before the first real
+        request. Failures are logged and do not stop the caller."""
+        self.wait()
+        page = Image.new('RGB', (1224, 1584), 'white')
+        try:
+            if COMPONENT_LAYOUT in self._futures:
+                self.layout_model.batch_predict([page], 1)
+            if COMPONENT_READER in self._futures and self.layoutreader_model is not None:
+                import torch
+                from magic_pdf.model.sub_modules.reading_oreder.layoutreader.helpers import do_predict
+
+                with torch.no_grad():
+                    do_predict([[100, 100, 500, 120], [100, 130, 500, 150]], self.layoutreader_model)
+            if COMPONENT_CHAT in self._futures:
+                self.chat_model.batch_inference(
+                    [page.crop((0, 0, 448, 112))], ['Please output the text content from the image.']
+                )
+            self.warm = True
+            logger.info('MonkeyOCR warm-up done')
+        except Exception as e:
+            logger.warning(f'MonkeyOCR warm-up failed: {e}')
+
+    def _load_layout_model(self):
+        from magic_pdf.model.model_list import AtomicModel
+        from magic_pdf.model.sub_modules.model_init import AtomModelSingleton
+
         atom_model_manager = AtomModelSingleton()
         if self.layout_model_name == MODEL_NAME.DocLayout_YOLO:
-            layout_model_path = os.path.join(models_dir, self.configs['weights'][self.layout_model_name])
+            layout_model_path = os.path.join(self.models_dir, self.configs['weights'][self.layout_model_name])
             if not os.path.exists(layout_model_path):
                 raise FileNotFoundError(
                     f"Layout model file not found at '{layout_model_path}'. "
                     "Please run 'python download_model.py' to download the required models."
                 )
-            self.layout_model = atom_model_manager.get_atom_model(
+            layout_model = atom_model_manager.get_atom_model(
                 atom_model_name=AtomicModel.Layout,
                 layout_model_name=MODEL_NAME.DocLayout_YOLO,
                 doclayout_yolo_weights=layout_model_path,
                 device=self.device,
             )
         elif self.layout_model_name == MODEL_NAME.PaddleXLayoutModel:
-            self.layout_model = atom_model_manager.get_atom_model(
+            layout_model = atom_model_manager.get_atom_model(
                 atom_model_name=AtomicModel.Layout,
                 layout_model_name=MODEL_NAME.PaddleXLayoutModel,
                 paddlex_model_name=MODEL_NAME.PaddleXLayoutModel,
                 device=self.device,
             )
+        elif self.layout_model_name == MODEL_NAME.RecordedLayout:
+            layout_model = atom_model_manager.get_atom_model(
+                atom_model_name=AtomicModel.Layout,
+                layout_model_name=MODEL_NAME.RecordedLayout,
+                record_path=self.layout_config.get('record_path'),
+            )
+        else:
+            raise ValueError(f"Unsupported layout model name: {self.layout_model_name}")
         logger.info(f'layout model loaded: {self.layout_model_name}')
+        return layout_model
+
+    def _load_layoutreader_model(self):
+        if self.layout_reader_name == READER_XYCUT:
+            logger.info('layout reader: xy-cut, no model loaded')
+            return None
+
+        import torch
+        from transformers import LayoutLMv3ForTokenClassification
 
+        bf16_supported = False
+        if self.device.startswith("cuda"):
+            bf16_supported = torch.cuda.is_bf16_supported()
+        elif self.device.startswith("mps"):
+            bf16_supported = True
 
-        layout_reader_config = self.layout_config.get('reader')
-        self.layout_reader_name = layout_reader_config.get('name')
         if self.layout_reader_name == 'layoutreader':
-            layoutreader_model_dir = os.path.join(models_dir, self.configs['weights'][self.layout_reader_name])
+            layoutreader_model_dir = os.path.join(self.models_dir, self.configs['weights'][self.layout_reader_name])
             if os.path.exists(layoutreader_model_dir):
                 model = LayoutLMv3ForTokenClassification.from_pretrained(
                     layoutreader_model_dir
@@ -114,36 +299,46 @@ class MonkeyOCR:
                 model.to(self.device).eval()
         else:
             logger.error('model name not allow')
-        self.layoutreader_model = model
+            raise ValueError(f"Unsupported layout reader name: {self.layout_reader_name}")
         logger.info(f'layoutreader model loaded: {self.layout_reader_name}')
+        return model
 
-        self.chat_config = self.configs.get('chat_config', {})
+    def _load_chat_model(self):
         chat_backend = self.chat_config.get('backend', 'lmdeploy')
         chat_path = self.chat_config.get('weight_path', 'model_weight/Recognition')
         if chat_backend == 'lmdeploy':
             logger.info('Use LMDeploy as backend')
-            self.chat_model = MonkeyChat_LMDeploy(chat_path)
+            chat_model = MonkeyChat_LMDeploy(chat_path)
         elif chat_backend == 'vllm':
             logger.info('Use vLLM as backend')
-            self.chat_model = MonkeyChat_vLLM(chat_path)
+            chat_model = MonkeyChat_vLLM(chat_path)
         elif chat_backend == 'transformers':
             logger.info('Use transformers as backend')
             batch_size = self.chat_config.get('batch_size', 5)
-            self.chat_model = MonkeyChat_transformers(chat_path, batch_size, device=self.device)
+            chat_model = MonkeyChat_transformers(
+                chat_path, batch_size, device=self.device, cpu_profile=self.cpu_profile
+            )
+        elif chat_backend == 'mock':
+            logger.info('Use mock as backend, outputs are synthetic')
+            chat_model = MonkeyChat_Mock(
+                max_batch_size=self.chat_config.get('batch_size', 5),
+                **(self.chat_config.get('mock') or {}),
+            )
         elif chat_backend == 'api':
             logger.info('Use API as backend')
             api_config = self.configs.get('api_config', {})
             if not api_config:
                 raise ValueError("API configuration is required for API backend.")
-            self.chat_model = MonkeyChat_OpenAIAPI(
+            chat_model = MonkeyChat_OpenAIAPI(
                 url=api_config.get('url'),
                 model_name=api_config.get('model_name'),
                 api_key=api_config.get('api_key', None)
             )
         else:
             logger.warning('Use LMDeploy as default backend')
-            self.chat_model = MonkeyChat_LMDeploy(chat_path)
-        logger.info(f'VLM loaded: {self.chat_model.model_name}')
+            chat_model = MonkeyChat_LMDeploy(chat_path)
+        logger.info(f'VLM loaded: {chat_model.model_name}')
+        return chat_model
 
 class MonkeyChat_LMDeploy:
     def __init__(self, model_path, engine_config=None): 
@@ -159,6 +354,8 @@ class MonkeyChat_LMDeploy:
         self.gen_config=GenerationConfig(max_new_tokens=4096,do_sample=True,temperature=0,repetition_penalty=1.05)
 
     def _auto_config_dtype(self, engine_config=None, PytorchEngineConfig=None):
+        import torch
+
         if engine_config is None:
             # 配置GPU显存限制为21GB
             engine_config = PytorchEngineConfig(
@@ -205,6 +402,8 @@ class MonkeyChat_vLLM:
         self.gen_config = SamplingParams(max_tokens=4096,temperature=0,repetition_penalty=1.05)
     
     def _auto_gpu_mem_ratio(self, ratio):
+        import torch
+
         # 限制最大显存使用为21GB
         mem_free, mem_total = torch.cuda.mem_get_info()
         max_memory_bytes = 21 * 1024 * 1024 * 1024  # 21GB in bytes
@@ -234,7 +433,9 @@ class MonkeyChat_vLLM:
         return [o.outputs[0].text for o in outputs]
 
 class MonkeyChat_transformers:
-    def __init__(self, model_path: str, max_batch_size: int = 10, max_new_tokens=4096, device: str = None):
+    def __init__(self, model_path: str, max_batch_size: int = 10, max_new_tokens=4096, device: str = None,
+                 cpu_profile: dict = None):
+        import torch
         try:
             from transformers import Qwen2_5_VLForConditionalGeneration, AutoProcessor
         except ImportError:
@@ -296,19 +497,37 @@ class MonkeyChat_transformers:
         
         # 设置显存限制 - 修复设备ID格式
         max_memory = {0: "21GB"} if torch.cuda.is_available() else None
+        torch_dtype = torch.bfloat16 if bf16_supported else torch.float16
+        device_map = "auto"
+        self.static_cache = False
+        if self.device == 'cpu':
+            # CPU profile: no fp16 (slow or unsupported on CPU), stay off the GPU
+            from magic_pdf.model.cpu_profile import DEFAULT_CPU_CONFIG, cpu_torch_dtype
+
+            cpu_profile = cpu_profile or DEFAULT_CPU_CONFIG
+            max_memory = None
+            device_map = "cpu"
+            torch_dtype = cpu_torch_dtype(cpu_profile)
+            attn_implementation = "sdpa"
+            self.static_cache = cpu_profile.get('static_cache', False)
         if max_memory:
             logger.info(f"设置GPU显存限制: {max_memory}")
         
         try:
             self.model = Qwen2_5_VLForConditionalGeneration.from_pretrained(
                         model_path,
-                        torch_dtype=torch.bfloat16 if bf16_supported else torch.float16,
+                        torch_dtype=torch_dtype,
                         attn_implementation=attn_implementation,  # 强制使用eager
-                        device_map="auto",  # 使用auto进行设备映射
+                        device_map=device_map,  # 使用auto进行设备映射
                         max_memory=max_memory,  # 设置显存限制（使用整数作为设备ID）
                         low_cpu_mem_usage=True,  # 降低CPU内存使用
                         trust_remote_code=True,  # 添加信任远程代码
                     )
+            if self.device == 'cpu':
+                from magic_pdf.model.cpu_profile import quantize_for_cpu
+
+                self.model = quantize_for_cpu(self.model, cpu_profile)
+                logger.info(f"CPU dtype: {torch_dtype}, static KV cache: {self.static_cache}")
                 
             self.processor = AutoProcessor.from_pretrained(
                 model_path,
@@ -378,11 +597,15 @@ class MonkeyChat_transformers:
                         results.append(f"Error: {str(single_e)}")
             
             if self.device == 'cuda':
+                import torch
                 torch.cuda.empty_cache()
         
         return results
     
     def _process_batch(self, batch_images: List[Union[str, Image.Image]], batch_questions: List[str]) -> List[str]:
+        import torch
+        from qwen_vl_utils import process_vision_info
+
         all_messages = self.prepare_messages(batch_images, batch_questions)
         
         texts = []
@@ -403,6 +626,8 @@ class MonkeyChat_transformers:
             return_tensors="pt",
         ).to(self.device)
         
+        # a static KV cache is allocated once and reused by the following batches
+        cache_kwargs = {'cache_implementation': 'static'} if self.static_cache else {}
         with torch.no_grad():
             generated_ids = self.model.generate(
                 **inputs,
@@ -411,6 +636,7 @@ class MonkeyChat_transformers:
                 temperature=0.1,
                 repetition_penalty=1.05,
                 pad_token_id=self.processor.tokenizer.pad_token_id,
+                **cache_kwargs,
             )
         
         generated_ids_trimmed = [
@@ -424,6 +650,9 @@ class MonkeyChat_transformers:
         return [text.strip() for text in output_texts]
     
     def _process_single(self, image: Union[str, Image.Image], question: str) -> str:
+        import torch
+        from qwen_vl_utils import process_vision_info
+
         messages = [
             {
                 "role": "user",
@@ -475,6 +704,8 @@ class MonkeyChat_transformers:
     
 class MonkeyChat_OpenAIAPI:
     def __init__(self, url: str, model_name: str, api_key: str = None):
+        from openai import OpenAI
+
         self.model_name = model_name
         self.client = OpenAI(
             api_key=api_key,
@@ -533,4 +764,79 @@ class MonkeyChat_OpenAIAPI:
                 results.append(response.choices[0].message.content)
             except Exception as e:
                 results.append(f"Error: {e}")
-        return results
\ No newline at end of file
+        return results
+
+
+class MonkeyChat_Mock:
+    """Stand-in VLM that returns deterministic synthetic outputs.
+
+    Text, LaTeX or HTML is generated according to the instruction, sized by
+    the crop area and seeded by the crop content, so repeated runs produce
+    identical results. Each batch sleeps for a simple latency model:
+    ``batch_latency_ms + image_latency_ms * images + token_latency_ms * tokens``
+    where tokens is the longest output of the batch (decoding steps are
+    shared by the batch). Lets the pipeline be benchmarked without a GPU.
+    """
+
+    _WORDS = (
+        'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+        'incididunt ut labore et dolore magna aliqua ut enim ad minim veniam quis nostrud'
+    ).split()
+
+    def __init__(self, max_batch_size: int = 5, batch_latency_ms: float = 50.0, image_latency_ms: float = 10.0,
+                 token_latency_ms: float = 2.0, pixels_per_token: int = 400, max_new_tokens: int = 4096):
+        """
+        Args:
+            max_batch_size (int, optional): images per simulated batch. Defaults to 5.
+            batch_latency_ms (float, optional): fixed cost of a batch. Defaults to 50.0.
+            image_latency_ms (float, optional): prefill cost of each image. Defaults to 10.0.
+            token_latency_ms (float, optional): cost of one decoding step. Defaults to 2.0.
+            pixels_per_token (int, optional): crop area producing one output token. Defaults to 400.
+            max_new_tokens (int, optional): output length cap. Defaults to 4096.
+        """
+        self.model_name = 'mock'
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_latency_ms = batch_latency_ms
+        self.image_latency_ms = image_latency_ms
+        self.token_latency_ms = token_latency_ms
+        self.pixels_per_token = max(1, pixels_per_token)
+        self.max_new_tokens = max_new_tokens
+
+    def _generate(self, image: Image.Image, question: str) -> tuple:
+        width, height = image.size
+        tokens = min(max(1, width * height // self.pixels_per_token), self.max_new_tokens)
+        thumb = image.convert('L').resize((16, 16)).tobytes()
+        rng = random.Random(zlib.crc32(thumb + question.encode('utf-8')))
+
+        if 'LaTeX' in question:
+            terms = [
+                f'\\frac{{{rng.choice("abcxyz")}_{{{rng.randint(1, 9)}}}}}{{{rng.choice("mnpq")}}}'
+                for _ in range(max(1, tokens // 12))
+            ]
+            return ' + '.join(terms), tokens
+        if 'html' in question:
+            rows = max(1, height // 40)
+            cols = max(1, min(8, width // 150))
+            body = ''.join(
+                '<tr>' + ''.join(f'<td>{rng.choice(self._WORDS)}</td>' for _ in range(cols)) + '</tr>'
+                for _ in range(rows)
+            )
+            return f'<table>{body}</table>', min(rows * cols * 4, self.max_new_tokens)
+        return ' '.join(rng.choice(self._WORDS) for _ in range(tokens)), tokens
+
+    def batch_inference(self, images: List[Union[str, Image.Image]], questions: List[str]) -> List[str]:
+        results = []
+        for start in range(0, len(images), self.max_batch_size):
+            batch = [
+                self._generate(load_image(image), question)
+                for image, question in zip(images[start:start + self.max_batch_size],
+                                           questions[start:start + self.max_batch_size])
+            ]
+            latency_ms = (
+                self.batch_latency_ms
+                + self.image_latency_ms * len(batch)
+                + self.token_latency_ms * max(tokens for _, tokens in batch)
+            )
+            time.sleep(latency_ms / 1000.0)
+            results.extend(text for text, _ in batch)
+        return results
@@ -1,7 +1,9 @@
+import copy
 import time
 from loguru import logger
 from magic_pdf.model.batch_analyze_llm import BatchAnalyzeLLM
-from magic_pdf.data.dataset import Dataset, MultiFileDataset
+from magic_pdf.model.page_filter import PAGE_BLANK, PAGE_DUPLICATE, get_page_filter
+from magic_pdf.data.dataset import Dataset, MultiFileDataset, PymuDocDataset
 from magic_pdf.libs.clean_memory import clean_memory
 from magic_pdf.operators.models_llm import InferenceResultLLM
 from magic_pdf.data.dataset import ImageDataset
@@ -9,6 +11,39 @@ from io import BytesIO
 from PIL import Image
 
 
+def analyze_filtered_pages(batch_model, page_filter, images, pages, split_pages) -> list:
+    """Run the batch model on the pages the page filter keeps only.
+
+    Blank pages get an empty result, duplicates a copy of the result of the
+    page they duplicate (earlier in this document or from the filter cache).
+    """
+    decisions = page_filter.classify(images)
+    keep = [i for i, (kind, _) in enumerate(decisions) if kind not in (PAGE_BLANK, PAGE_DUPLICATE)]
+    if len(keep) == len(images):
+        kept_result = batch_model(images, split_pages=split_pages, pages=pages)
+    elif keep:
+        # the single page branch of the batch model depends on the document, not the kept pages
+        kept_result = batch_model(
+            [images[i] for i in keep],
+            split_pages=split_pages,
+            pages=[pages[i] for i in keep] if pages is not None else None,
+            page_count=len(images),
+        )
+    else:
+        kept_result = []
+
+    analyze_result = [None] * len(images)
+    for i, layout_res in zip(keep, kept_result):
+        analyze_result[i] = layout_res
+        page_filter.remember(decisions[i][1], layout_res)
+    for i, (kind, ref) in enumerate(decisions):
+        if kind == PAGE_BLANK:
+            analyze_result[i] = []
+        elif kind == PAGE_DUPLICATE:
+            analyze_result[i] = copy.deepcopy(analyze_result[ref]) if isinstance(ref, int) else ref
+    return analyze_result
+
+
 def doc_analyze_llm(
     dataset: Dataset,
     MonkeyOCR_model,
@@ -28,12 +63,18 @@ def doc_analyze_llm(
     doc_analyze_start = time.time()
 
     images = []
+    # PDF pages are kept so crops can be rendered from the page directly
+    pages = [] if isinstance(dataset, PymuDocDataset) else None
     for index in range(len(dataset)):
         if start_page_id <= index <= end_page_id:
             page_data = dataset.get_page(index)
             img_dict = page_data.get_image()
             images.append(img_dict['img'])
-    analyze_result = batch_model(images, split_pages=split_pages or split_files)
+            if pages is not None:
+                pages.append(page_data.get_doc())
+    analyze_result = analyze_filtered_pages(
+        batch_model, get_page_filter(MonkeyOCR_model), images, pages, split_pages or split_files
+    )
 
     # Handle MultiFileDataset with split_files
     if split_files and isinstance(dataset, MultiFileDataset):
@@ -1,10 +1,14 @@
 import enum
 
+import numpy as np
+
 from magic_pdf.config.model_block_type import ModelBlockTypeEnum
 from magic_pdf.config.ocr_content_type import CategoryId, ContentType
 from magic_pdf.data.dataset import Dataset
-from magic_pdf.libs.boxbase import (_is_in, bbox_distance, bbox_relative_pos,
-                                    calculate_iou)
+from magic_pdf.libs.boxbase import (bbox_distance_matrix, bbox_relative_pos,
+                                    bbox_relative_pos_matrix,
+                                    calculate_iou_matrix, is_in_matrix,
+                                    is_part_overlap_matrix)
 from magic_pdf.libs.coordinate_transform import get_scale_ratio
 from magic_pdf.pre_proc.remove_bbox_overlap import _remove_overlap_between_bbox
 
@@ -66,41 +70,36 @@ class MagicModel:
 
     def __fix_by_remove_high_iou_and_low_confidence(self):
         for model_page_info in self.__model_list:
-            need_remove_list = []
             layout_dets = model_page_info['layout_dets']
-            for i in range(len(layout_dets)):
-                for j in range(i + 1, len(layout_dets)):
-                    layout_det1 = layout_dets[i]
-                    layout_det2 = layout_dets[j]
-                    if layout_det1['category_id'] in [
-                        0,
-                        1,
-                        2,
-                        3,
-                        4,
-                        5,
-                        6,
-                        7,
-                        8,
-                        9,
-                    ] and layout_det2['category_id'] in [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]:
-                        if (
-                            calculate_iou(layout_det1['bbox'], layout_det2['bbox'])
-                            > 0.9
-                        ):
-                            if layout_det1['score'] < layout_det2['score']:
-                                layout_det_need_remove = layout_det1
-                            else:
-                                layout_det_need_remove = layout_det2
-
-                            if layout_det_need_remove not in need_remove_list:
-                                need_remove_list.append(layout_det_need_remove)
-                        else:
-                            continue
-                    else:
-                        continue
-            for need_remove in need_remove_list:
-                layout_dets.remove(need_remove)
+            candidates = [
+                idx for idx, layout_det in enumerate(layout_dets)
+                if layout_det['category_id'] in [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+            ]
+            if len(candidates) < 2:
+                continue
+            iou = calculate_iou_matrix([layout_dets[idx]['bbox'] for idx in candidates])
+            scores = np.array([layout_dets[idx]['score'] for idx in candidates], dtype=np.float64)
+            rows, cols = np.nonzero(np.triu(iou > 0.9, k=1))
+            if len(rows) == 0:
+                continue
+            # of every pair the one with the lower score goes, the second on ties
+            losers = np.unique(np.where(scores[rows] < scores[cols], rows, cols))
+
+            # equal dets are removed once, and it is the first of them that goes
+            first_equal = {}
+            need_remove = set()
+            for loser in losers:
+                layout_det = layout_dets[candidates[loser]]
+                key = (layout_det['category_id'], tuple(layout_det['bbox']), layout_det['score'])
+                if key not in first_equal:
+                    first_equal[key] = [
+                        idx for idx in candidates
+                        if layout_dets[idx]['category_id'] == key[0] and tuple(layout_dets[idx]['bbox']) == key[1]
+                    ]
+                need_remove.add(next(idx for idx in first_equal[key] if layout_dets[idx] == layout_det))
+            layout_dets[:] = [
+                layout_det for idx, layout_det in enumerate(layout_dets) if idx not in need_remove
+            ]
 
     def __init__(self, model_list: list, docs: Dataset):
         self.__model_list = model_list
@@ -110,23 +109,26 @@ class MagicModel:
         self.__fix_by_remove_high_iou_and_low_confidence()
         self.__fix_footnote()
 
-    def _bbox_distance(self, bbox1, bbox2):
-        left, right, bottom, top = bbox_relative_pos(bbox1, bbox2)
-        flags = [left, right, bottom, top]
-        count = sum([1 if v else 0 for v in flags])
-        if count > 1:
-            return float('inf')
-        if left or right:
-            l1 = bbox1[3] - bbox1[1]
-            l2 = bbox2[3] - bbox2[1]
-        else:
-            l1 = bbox1[2] - bbox1[0]
-            l2 = bbox2[2] - bbox2[0]
-
-        if l2 > l1 and (l2 - l1) / l1 > 0.3:
-            return float('inf')
+    def _bbox_distance_matrix(self, bboxes1, bboxes2):
+        """Distances of bboxes1 (figures or tables) to bboxes2 (footnotes),
+        inf where they are diagonal to each other or bboxes2 is more than 30%
+        longer along the side they face.
 
-        return bbox_distance(bbox1, bbox2)
+        Returns:
+            np.ndarray: shape (len(bboxes1), len(bboxes2))
+        """
+        boxes1 = np.asarray(bboxes1, dtype=np.float64).reshape(-1, 4)
+        boxes2 = np.asarray(bboxes2, dtype=np.float64).reshape(-1, 4)
+        left, right, bottom, top = bbox_relative_pos_matrix(boxes1, boxes2)
+        count = left.astype(int) + right + bottom + top
+        horizontal = left | right
+        l1 = np.where(horizontal, (boxes1[:, 3] - boxes1[:, 1])[:, None], (boxes1[:, 2] - boxes1[:, 0])[:, None])
+        l2 = np.where(horizontal, (boxes2[:, 3] - boxes2[:, 1])[None, :], (boxes2[:, 2] - boxes2[:, 0])[None, :])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            too_long = (l2 > l1) & ((l2 - l1) / l1 > 0.3)
+
+        distance = bbox_distance_matrix(boxes1, boxes2)
+        return np.where((count > 1) | too_long, float('inf'), distance)
 
     def __fix_footnote(self):
         # 3: figure, 5: table, 7: footnote
@@ -142,64 +144,31 @@ class MagicModel:
                     figures.append(obj)
                 elif obj['category_id'] == 5:
                     tables.append(obj)
-                if len(footnotes) * len(figures) == 0:
-                    continue
-            dis_figure_footnote = {}
-            dis_table_footnote = {}
-
-            for i in range(len(footnotes)):
-                for j in range(len(figures)):
-                    pos_flag_count = sum(
-                        list(
-                            map(
-                                lambda x: 1 if x else 0,
-                                bbox_relative_pos(
-                                    footnotes[i]['bbox'], figures[j]['bbox']
-                                ),
-                            )
-                        )
-                    )
-                    if pos_flag_count > 1:
-                        continue
-                    dis_figure_footnote[i] = min(
-                        self._bbox_distance(figures[j]['bbox'], footnotes[i]['bbox']),
-                        dis_figure_footnote.get(i, float('inf')),
-                    )
-            for i in range(len(footnotes)):
-                for j in range(len(tables)):
-                    pos_flag_count = sum(
-                        list(
-                            map(
-                                lambda x: 1 if x else 0,
-                                bbox_relative_pos(
-                                    footnotes[i]['bbox'], tables[j]['bbox']
-                                ),
-                            )
-                        )
-                    )
-                    if pos_flag_count > 1:
-                        continue
+            if len(footnotes) * len(figures) == 0:
+                continue
 
-                    dis_table_footnote[i] = min(
-                        self._bbox_distance(tables[j]['bbox'], footnotes[i]['bbox']),
-                        dis_table_footnote.get(i, float('inf')),
-                    )
-            for i in range(len(footnotes)):
-                if i not in dis_figure_footnote:
-                    continue
-                if dis_table_footnote.get(i, float('inf')) > dis_figure_footnote[i]:
-                    footnotes[i]['category_id'] = CategoryId.ImageFootnote
+            footnote_bboxes = [footnote['bbox'] for footnote in footnotes]
+            # nearest figure and table of every footnote, inf when there is none
+            dis_figure_footnote = self._bbox_distance_matrix(
+                [figure['bbox'] for figure in figures], footnote_bboxes
+            ).min(axis=0)
+            if tables:
+                dis_table_footnote = self._bbox_distance_matrix(
+                    [table['bbox'] for table in tables], footnote_bboxes
+                ).min(axis=0)
+            else:
+                dis_table_footnote = np.full(len(footnotes), float('inf'))
+
+            for i in np.nonzero(dis_table_footnote > dis_figure_footnote)[0]:
+                footnotes[i]['category_id'] = CategoryId.ImageFootnote
 
     def __reduct_overlap(self, bboxes):
-        N = len(bboxes)
-        keep = [True] * N
-        for i in range(N):
-            for j in range(N):
-                if i == j:
-                    continue
-                if _is_in(bboxes[i]['bbox'], bboxes[j]['bbox']):
-                    keep[i] = False
-        return [bboxes[i] for i in range(N) if keep[i]]
+        if not bboxes:
+            return []
+        inside = is_in_matrix([x['bbox'] for x in bboxes], [x['bbox'] for x in bboxes])
+        np.fill_diagonal(inside, False)
+        keep = ~inside.any(axis=1)
+        return [bboxes[i] for i in range(len(bboxes)) if keep[i]]
 
     def __tie_up_category_by_distance_v2(
         self,
@@ -257,54 +226,31 @@ class MagicModel:
             'right': [[-1, float('inf')]] * M,
         }
 
+        if objects and subjects:
+            obj_bboxes = [obj['bbox'] for obj in objects]
+            sub_bboxes = [sub['bbox'] for sub in subjects]
+            left, right, bottom, top = bbox_relative_pos_matrix(obj_bboxes, sub_bboxes)
+            # partly overlapping pairs are compared with the overlap split between them
+            for i, j in zip(*np.nonzero(is_part_overlap_matrix(obj_bboxes, sub_bboxes))):
+                bbox1, bbox2, _ = _remove_overlap_between_bbox(obj_bboxes[i], sub_bboxes[j])
+                left[i, j], right[i, j], bottom[i, j], top[i, j] = bbox_relative_pos(bbox1, bbox2)
+            single_direction = left.astype(int) + right + bottom + top <= 1
+            distance = bbox_distance_matrix(obj_bboxes, sub_bboxes)
+
+            for direction, flags in (('left', left), ('right', right), ('bottom', bottom), ('top', top)):
+                dis = np.where(single_direction & flags, distance, float('inf'))
+                # argmin takes the first of equally near subjects
+                nearest = dis.argmin(axis=1)
+                for i, j in enumerate(nearest):
+                    if dis[i, j] != float('inf'):
+                        dis_by_directions[direction][i] = [int(j), float(dis[i, j])]
+
         for i, obj in enumerate(objects):
             l_x_axis, l_y_axis = (
                 obj['bbox'][2] - obj['bbox'][0],
                 obj['bbox'][3] - obj['bbox'][1],
             )
             axis_unit = min(l_x_axis, l_y_axis)
-            for j, sub in enumerate(subjects):
-
-                bbox1, bbox2, _ = _remove_overlap_between_bbox(
-                    objects[i]['bbox'], subjects[j]['bbox']
-                )
-                left, right, bottom, top = bbox_relative_pos(bbox1, bbox2)
-                flags = [left, right, bottom, top]
-                if sum([1 if v else 0 for v in flags]) > 1:
-                    continue
-
-                if left:
-                    if dis_by_directions['left'][i][1] > bbox_distance(
-                        obj['bbox'], sub['bbox']
-                    ):
-                        dis_by_directions['left'][i] = [
-                            j,
-                            bbox_distance(obj['bbox'], sub['bbox']),
-                        ]
-                if right:
-                    if dis_by_directions['right'][i][1] > bbox_distance(
-                        obj['bbox'], sub['bbox']
-                    ):
-                        dis_by_directions['right'][i] = [
-                            j,
-                            bbox_distance(obj['bbox'], sub['bbox']),
-                        ]
-                if bottom:
-                    if dis_by_directions['bottom'][i][1] > bbox_distance(
-                        obj['bbox'], sub['bbox']
-                    ):
-                        dis_by_directions['bottom'][i] = [
-                            j,
-                            bbox_distance(obj['bbox'], sub['bbox']),
-                        ]
-                if top:
-                    if dis_by_directions['top'][i][1] > bbox_distance(
-                        obj['bbox'], sub['bbox']
-                    ):
-                        dis_by_directions['top'][i] = [
-                            j,
-                            bbox_distance(obj['bbox'], sub['bbox']),
-                        ]
 
             if (
                 dis_by_directions['top'][i][1] != float('inf')
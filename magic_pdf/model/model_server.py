@@ -0,0 +1,310 @@
+"""Standalone model server for MonkeyOCR.
+
+One long-lived process owns the layout, reader and VLM models. Any number of
+stateless HTTP / post-processing workers on the same Linux box talk to it over
+a Unix socket through :class:`RemoteMonkeyOCR`, which exposes the parts of
+:class:`MonkeyOCR` the pipeline uses (``layout_model``, ``layoutreader_model``,
+``chat_model``). Page rasters and crops are passed through shared memory, only
+small control messages are pickled over the socket.
+
+Usage:
+    python -m magic_pdf.model.model_server -c model_configs.yaml --socket /tmp/monkeyocr.sock
+"""
+import argparse
+import os
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import List, Union
+
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+from magic_pdf.model.custom_model import READER_XYCUT, MonkeyOCR
+
+DEFAULT_SOCKET_PATH = '/tmp/monkeyocr_model_server.sock'
+DEFAULT_AUTHKEY = b'monkeyocr'
+
+
+def _authkey_from_env() -> bytes:
+    return os.getenv('MONKEYOCR_MODEL_SERVER_AUTHKEY', DEFAULT_AUTHKEY.decode()).encode()
+
+
+class _SharedImageBatch:
+    """Pack a list of images into one shared memory block.
+
+    Paths are passed through as-is since client and server share a filesystem.
+    The block is owned (and unlinked) by the creating side.
+    """
+
+    def __init__(self, images: List[Union[str, Image.Image]]):
+        self.items = []
+        arrays = []
+        offset = 0
+        for img in images:
+            if isinstance(img, str):
+                self.items.append(('path', img))
+                continue
+            if isinstance(img, np.ndarray):
+                arr = img
+            else:
+                if img.mode not in ('RGB', 'RGBA', 'L'):
+                    img = img.convert('RGB')
+                arr = np.asarray(img)
+            arr = np.ascontiguousarray(arr, dtype=np.uint8)
+            self.items.append(('array', offset, arr.shape))
+            arrays.append((offset, arr))
+            offset += arr.nbytes
+
+        self.shm = None
+        if offset > 0:
+            self.shm = shared_memory.SharedMemory(create=True, size=offset)
+            for start, arr in arrays:
+                dst = np.ndarray(arr.shape, dtype=np.uint8, buffer=self.shm.buf, offset=start)
+                dst[...] = arr
+
+    def descriptor(self) -> dict:
+        return {'shm': self.shm.name if self.shm else None, 'items': self.items}
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _attach_shm(name: str) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name)
+    # The client owns the block; keep the resource tracker of this process from
+    # unlinking it (and warning about a leak) on exit.
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    return shm
+
+
+def _images_from_descriptor(descriptor: dict) -> List[Union[str, Image.Image]]:
+    shm = _attach_shm(descriptor['shm']) if descriptor['shm'] else None
+    try:
+        images = []
+        for item in descriptor['items']:
+            if item[0] == 'path':
+                images.append(item[1])
+            else:
+                _, offset, shape = item
+                view = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+                # copy out of the shared block, the client unlinks it after the reply
+                images.append(Image.fromarray(view.copy()))
+        return images
+    finally:
+        if shm is not None:
+            shm.close()
+
+
+class ModelServer:
+    """Serve a loaded :class:`MonkeyOCR` over a Unix socket.
+
+    Each client connection is handled by its own thread. Every model is
+    guarded by its own lock so that layout, reading order and VLM requests
+    from different workers can overlap.
+    """
+
+    def __init__(self, config_path: str, socket_path: str = DEFAULT_SOCKET_PATH, authkey: bytes = None):
+        # load in the background, requests wait for the models they need; must be
+        # constructed on the main thread, lmdeploy/vllm chat models load on it
+        self.model = MonkeyOCR(config_path, block=False)
+        self.socket_path = socket_path
+        self.authkey = authkey or _authkey_from_env()
+        self._locks = {
+            'layout': threading.Lock(),
+            'reader': threading.Lock(),
+            'chat': threading.Lock(),
+        }
+
+    def _info(self, payload):
+        chat_name = None
+        if self.model.readiness()['chat'] == 'ready':
+            chat_name = getattr(self.model.chat_model, 'model_name', None)
+        return {
+            'configs': self.model.configs,
+            'layout_model_name': self.model.layout_model_name,
+            'chat_model_name': chat_name,
+        }
+
+    def _readiness(self, payload):
+        return self.model.readiness()
+
+    def _layout(self, payload):
+        images = _images_from_descriptor(payload['images'])
+        with self._locks['layout']:
+            return self.model.layout_model.batch_predict(images, payload['batch_size'])
+
+    def _reader(self, payload):
+        import torch
+        from magic_pdf.model.sub_modules.reading_oreder.layoutreader.helpers import do_predict
+
+        with self._locks['reader'], torch.no_grad():
+            return do_predict(payload['boxes'], self.model.layoutreader_model)
+
+    def _chat(self, payload):
+        images = _images_from_descriptor(payload['images'])
+        with self._locks['chat']:
+            return self.model.chat_model.batch_inference(images, payload['questions'])
+
+    def _serve_connection(self, conn):
+        handlers = {
+            'info': self._info,
+            'readiness': self._readiness,
+            'layout': self._layout,
+            'reader': self._reader,
+            'chat': self._chat,
+        }
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, ConnectionResetError):
+                    return
+                try:
+                    conn.send(('ok', handlers[op](payload)))
+                except Exception as e:
+                    logger.exception(f'model server request {op} failed')
+                    conn.send(('error', f'{type(e).__name__}: {e}'))
+
+    def serve_forever(self):
+        threading.Thread(target=self.model.warmup, daemon=True).start()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        with Listener(self.socket_path, family='AF_UNIX', authkey=self.authkey) as listener:
+            logger.info(f'model server listening on {self.socket_path}')
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning(f'rejected model server connection: {e}')
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+
+class _RemoteLayoutModel:
+    def __init__(self, client):
+        self._client = client
+
+    def batch_predict(self, images: list, batch_size: int) -> list:
+        with _SharedImageBatch(images) as batch:
+            return self._client._call('layout', {'images': batch.descriptor(), 'batch_size': batch_size})
+
+
+class _RemoteLayoutReader:
+    def __init__(self, client):
+        self._client = client
+
+    def predict_orders(self, boxes: List[List[int]]) -> List[int]:
+        return self._client._call('reader', {'boxes': boxes})
+
+
+class _RemoteChatModel:
+    def __init__(self, client, model_name):
+        self._client = client
+        self._model_name = model_name
+
+    @property
+    def model_name(self):
+        # the server may still be loading the VLM when the client connects
+        if self._model_name is None:
+            self._model_name = self._client._call('info', None)['chat_model_name']
+        return self._model_name
+
+    def batch_inference(self, images: List[Union[str, Image.Image]], questions: List[str]) -> List[str]:
+        with _SharedImageBatch(images) as batch:
+            return self._client._call('chat', {'images': batch.descriptor(), 'questions': questions})
+
+
+class RemoteMonkeyOCR:
+    """Client side stand-in for :class:`MonkeyOCR` backed by a :class:`ModelServer`.
+
+    The configs are fetched from the server so both sides agree on them. The
+    device is reported as ``cpu`` so that workers never touch the GPU.
+
+    Args:
+        address (str): path of the server's Unix socket.
+        authkey (bytes, optional): shared secret, defaults to
+            ``MONKEYOCR_MODEL_SERVER_AUTHKEY``.
+    """
+
+    is_remote = True
+
+    def __init__(self, address: str = DEFAULT_SOCKET_PATH, authkey: bytes = None):
+        self.address = address
+        self.authkey = authkey or _authkey_from_env()
+        self._local = threading.local()
+
+        info = self._call('info', None)
+        self.configs = info['configs']
+        self.device = 'cpu'
+        self.layout_model_name = info['layout_model_name']
+        self.chat_config = self.configs.get('chat_config', {})
+        self.layout_model = _RemoteLayoutModel(self)
+        reader_name = (self.configs.get('layout_config') or {}).get('reader', {}).get('name')
+        # xy-cut ordering runs locally, there is no reader model to call
+        self.layoutreader_model = None if reader_name == READER_XYCUT else _RemoteLayoutReader(self)
+        self.chat_model = _RemoteChatModel(self, info['chat_model_name'])
+
+    def readiness(self) -> dict:
+        """Loading state of the server's models, see MonkeyOCR.readiness."""
+        try:
+            return self._call('readiness', None)
+        except Exception as e:
+            return {'server': f'unreachable: {e}'}
+
+    @property
+    def ready(self) -> bool:
+        return all(state == 'ready' for name, state in self.readiness().items() if name != 'warm')
+
+    def warmup(self):
+        """The server warms its models up itself."""
+
+    def _connection(self):
+        # Connections are not thread safe, keep one per calling thread.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _call(self, op: str, payload):
+        conn = self._connection()
+        try:
+            conn.send((op, payload))
+            status, result = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise
+        if status != 'ok':
+            raise RuntimeError(f'model server failed on {op}: {result}')
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the MonkeyOCR model server')
+    parser.add_argument('-c', '--config', default='model_configs.yaml', help='Config file path')
+    parser.add_argument(
+        '--socket',
+        default=os.getenv('MONKEYOCR_MODEL_SERVER', DEFAULT_SOCKET_PATH),
+        help='Unix socket path to listen on',
+    )
+    args = parser.parse_args()
+
+    ModelServer(args.config, args.socket).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""Cheap page pre-filter run before layout detection and recognition.
+
+Blank pages (almost no ink, and no glyph-sized cluster of it) get an empty
+layout result, and pages whose raster is an exact or (opt-in) near duplicate of an
+already analyzed page (covers, separator sheets, boilerplate repeated across
+documents) reuse that page's result. Configured by the ``page_filter`` section of model_configs.yaml.
+"""
+import copy
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+PAGE_KEEP = 'keep'
+PAGE_BLANK = 'blank'
+PAGE_DUPLICATE = 'duplicate'
+
+DEDUP_OFF = 'off'
+DEDUP_EXACT = 'exact'
+DEDUP_NEAR = 'near'
+
+
+def _ink_mask(img: np.ndarray, ink_threshold: int, margin: float, stride: int = 2) -> np.ndarray:
+    # pixels inside the margin, subsampled instead of resized so thin strokes
+    # are not averaged away
+    height, width = img.shape[:2]
+    dy, dx = int(height * margin), int(width * margin)
+    sample = img[dy:height - dy:stride, dx:width - dx:stride]
+    if sample.ndim == 3:
+        sample = sample.min(axis=2)
+    return sample < ink_threshold
+
+
+def ink_coverage(img: np.ndarray, ink_threshold: int = 160, margin: float = 0.03) -> float:
+    """Fraction of dark pixels on the page, ignoring a margin where scan
+    borders and shadows usually are.
+
+    Args:
+        img (np.ndarray): page raster, RGB or gray
+        ink_threshold (int, optional): gray level below which a pixel is ink. Defaults to 160.
+        margin (float, optional): ignored border, as a fraction of the page size. Defaults to 0.03.
+
+    Returns:
+        float: ratio of ink pixels in [0, 1]
+    """
+    mask = _ink_mask(img, ink_threshold, margin)
+    if mask.size == 0:
+        return 0.0
+    return float(np.count_nonzero(mask)) / mask.size
+
+
+def max_ink_cluster(img: np.ndarray, ink_threshold: int = 160, margin: float = 0.03, cell: int = 16) -> int:
+    """Largest number of ink pixels in one cell of a grid over the page, at
+    full resolution.
+
+    A glyph, even a lone page number, puts a dense cluster of ink into a
+    cell, while dust and scan noise are scattered specks of a few pixels.
+
+    Args:
+        img (np.ndarray): page raster, RGB or gray
+        ink_threshold (int, optional): gray level below which a pixel is ink. Defaults to 160.
+        margin (float, optional): ignored border, as a fraction of the page size. Defaults to 0.03.
+        cell (int, optional): cell size in pixels. Defaults to 16.
+
+    Returns:
+        int: ink pixels of the densest cell
+    """
+    mask = _ink_mask(img, ink_threshold, margin, stride=1)
+    height, width = mask.shape
+    if height == 0 or width == 0:
+        return 0
+    padded = np.zeros((-(-height // cell) * cell, -(-width // cell) * cell), dtype=np.uint16)
+    padded[:height, :width] = mask
+    cells = padded.reshape(padded.shape[0] // cell, cell, padded.shape[1] // cell, cell).sum(axis=(1, 3))
+    return int(cells.max())
+
+
+def dhash(img: np.ndarray, hash_size: int = 16) -> int:
+    """Difference hash of a gray thumbnail of the page."""
+    thumb = Image.fromarray(img).convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(thumb, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+class PageFilter:
+    def __init__(
+        self,
+        enable: bool = False,
+        blank_ink_ratio: float = 0.0001,
+        blank_max_cluster: int = 10,
+        ink_threshold: int = 160,
+        dedup: str = DEDUP_OFF,
+        near_max_distance: int = 6,
+        near_max_ink_diff: int = 16,
+        cache_size: int = 256,
+    ):
+        """Blank and duplicate page detector with a bounded result cache.
+
+        Args:
+            enable (bool, optional): run the filter at all. Defaults to False.
+            blank_ink_ratio (float, optional): pages with less ink are blank, 0 disables it. Defaults to 0.0001.
+            blank_max_cluster (int, optional): a page is only blank when no 16x16 pixel cell holds more
+                ink pixels than this, so a lone heading or page number is kept. Defaults to 10.
+            ink_threshold (int, optional): gray level below which a pixel is ink. Defaults to 160.
+            dedup (str, optional): 'off', 'exact' (identical rasters) or 'near' (dhash distance, confirmed
+                on the ink pixels). Defaults to 'off'.
+            near_max_distance (int, optional): max hamming distance of the 256 bit dhash in 'near' mode. Defaults to 6.
+            near_max_ink_diff (int, optional): 'near' mode: max number of pixels that are ink on only
+                one of the two pages, so a page with the same layout but other text is not taken
+                for a duplicate. Defaults to 16.
+            cache_size (int, optional): analyzed pages remembered for dedup. Defaults to 256.
+        """
+        if dedup not in (DEDUP_OFF, DEDUP_EXACT, DEDUP_NEAR):
+            raise ValueError(f'unknown page_filter dedup mode: {dedup}')
+        self.enable = enable
+        self.blank_ink_ratio = blank_ink_ratio
+        self.blank_max_cluster = blank_max_cluster
+        self.ink_threshold = ink_threshold
+        self.dedup = dedup
+        self.near_max_distance = near_max_distance
+        self.near_max_ink_diff = near_max_ink_diff
+        self.cache_size = cache_size
+        # (shape, digest, dhash) -> (packed ink mask in 'near' mode, layout result of an analyzed page)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, configs: dict) -> 'PageFilter':
+        return cls(**(configs.get('page_filter') or {}))
+
+    def _signature(self, img: np.ndarray):
+        """(shape, digest, dhash) of a page, and its packed ink mask in 'near' mode."""
+        digest = hashlib.blake2b(np.ascontiguousarray(img).data, digest_size=16).digest()
+        if self.dedup != DEDUP_NEAR:
+            return (img.shape, digest, None), None
+        ink = np.packbits(_ink_mask(img, self.ink_threshold, margin=0, stride=1))
+        return (img.shape, digest, dhash(img)), ink
+
+    def _same_page(self, signature, other_signature) -> bool:
+        (shape, digest, phash), ink = signature
+        (other_shape, other_digest, other_phash), other_ink = other_signature
+        if shape != other_shape:
+            return False
+        if digest == other_digest:
+            return True
+        if phash is None or bin(other_phash ^ phash).count('1') > self.near_max_distance:
+            return False
+        # the dhash only sees the layout, the ink has to agree too
+        differing = np.count_nonzero(np.unpackbits(np.bitwise_xor(ink, other_ink)))
+        return differing <= self.near_max_ink_diff
+
+    def _lookup(self, signature):
+        with self._lock:
+            for key in reversed(self._cache):
+                ink, layout_res = self._cache[key]
+                if self._same_page(signature, (key, ink)):
+                    self._cache.move_to_end(key)
+                    return copy.deepcopy(layout_res)
+        return None
+
+    def is_blank(self, img: np.ndarray) -> bool:
+        """Almost no ink, and none of it dense enough to be a glyph."""
+        if self.blank_ink_ratio <= 0:
+            return False
+        if ink_coverage(img, self.ink_threshold) >= self.blank_ink_ratio:
+            return False
+        return max_ink_cluster(img, self.ink_threshold) <= self.blank_max_cluster
+
+    def classify(self, images: List[np.ndarray]) -> List[tuple]:
+        """Decide for each page raster whether it has to be analyzed.
+
+        Returns:
+            List[tuple]: per page (PAGE_KEEP, signature), (PAGE_BLANK, None),
+                (PAGE_DUPLICATE, cached result) or (PAGE_DUPLICATE, index of an
+                earlier page in this batch)
+        """
+        decisions = []
+        batch_signatures = []
+        for index, img in enumerate(images):
+            if not self.enable:
+                decisions.append((PAGE_KEEP, None))
+                continue
+            if self.is_blank(img):
+                decisions.append((PAGE_BLANK, None))
+                continue
+            if self.dedup == DEDUP_OFF:
+                decisions.append((PAGE_KEEP, None))
+                continue
+
+            signature = self._signature(img)
+            cached = self._lookup(signature)
+            if cached is not None:
+                decisions.append((PAGE_DUPLICATE, cached))
+                continue
+            earlier = self._match_batch(signature, batch_signatures)
+            if earlier is not None:
+                decisions.append((PAGE_DUPLICATE, earlier))
+                continue
+            batch_signatures.append((index, signature))
+            decisions.append((PAGE_KEEP, signature))
+
+        blank = sum(1 for kind, _ in decisions if kind == PAGE_BLANK)
+        duplicate = sum(1 for kind, _ in decisions if kind == PAGE_DUPLICATE)
+        if blank or duplicate:
+            logger.info(f'page filter: {blank} blank, {duplicate} duplicate of {len(images)} pages')
+        return decisions
+
+    def _match_batch(self, signature, batch_signatures) -> Optional[int]:
+        for index, other_signature in batch_signatures:
+            if self._same_page(signature, other_signature):
+                return index
+        return None
+
+    def remember(self, signature, layout_res: list):
+        """Cache the result of an analyzed page for later duplicates."""
+        if signature is None or self.cache_size <= 0:
+            return
+        key, ink = signature
+        with self._lock:
+            self._cache[key] = (ink, copy.deepcopy(layout_res))
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        """Forget the remembered pages."""
+        with self._lock:
+            self._cache.clear()
+
+
+_page_filters = weakref.WeakKeyDictionary()
+_page_filters_lock = threading.Lock()
+
+
+def get_page_filter(model) -> PageFilter:
+    """The page filter of a (local or remote) MonkeyOCR model, its dedup cache
+    lives as long as the model so duplicates are found across documents."""
+    with _page_filters_lock:
+        page_filter = _page_filters.get(model)
+        if page_filter is None:
+            page_filter = PageFilter.from_config(getattr(model, 'configs', None) or {})
+            _page_filters[model] = page_filter
+        return page_filter
@@ -0,0 +1,98 @@
+"""Layout "model" that replays recorded layout results.
+
+Pages are looked up by a digest of their raster in a JSON file written by
+``tools/record_layout.py``. Pages that were not recorded get a synthetic
+layout cut from the ink profile of the page (one text block per band of
+ink between whitespace gaps), so the rest of the pipeline can run on any
+document without layout weights or a GPU. Meant for benchmarking and CI,
+not for real parsing.
+"""
+import copy
+import hashlib
+import json
+import os
+from typing import List, Union
+
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+from magic_pdf.config.ocr_content_type import CategoryId
+
+
+class RecordedLayoutModel:
+    def __init__(self, record_path: str = None, ink_threshold: int = 160, min_gap: int = 12):
+        """
+        Args:
+            record_path (str, optional): recorded layout JSON, pages not in it get a synthetic layout.
+            ink_threshold (int, optional): gray level below which a pixel is ink. Defaults to 160.
+            min_gap (int, optional): blank rows separating two synthetic blocks. Defaults to 12.
+        """
+        self.record_path = record_path
+        self.ink_threshold = ink_threshold
+        self.min_gap = min_gap
+        self.pages = {}
+        if record_path:
+            if os.path.exists(record_path):
+                with open(record_path, 'r', encoding='utf-8') as f:
+                    self.pages = json.load(f).get('pages', {})
+                logger.info(f'loaded {len(self.pages)} recorded layout pages from {record_path}')
+            else:
+                logger.warning(f'recorded layout {record_path} not found, using synthetic layouts')
+
+    @staticmethod
+    def _as_array(image: Union[np.ndarray, Image.Image]) -> np.ndarray:
+        if isinstance(image, Image.Image):
+            return np.asarray(image.convert('RGB'))
+        return image
+
+    @staticmethod
+    def page_key(image: Union[np.ndarray, Image.Image]) -> str:
+        """Digest of a page raster, the lookup key of its recorded layout."""
+        img = np.ascontiguousarray(RecordedLayoutModel._as_array(image))
+        digest = hashlib.blake2b(img.data, digest_size=16).hexdigest()
+        return f'{img.shape[1]}x{img.shape[0]}-{digest}'
+
+    def _synthetic_layout(self, img: np.ndarray) -> List[dict]:
+        gray = img.min(axis=2) if img.ndim == 3 else img
+        ink = gray < self.ink_threshold
+        rows = np.flatnonzero(ink.any(axis=1))
+        if rows.size == 0:
+            return []
+        # split the inked rows wherever the blank run between them is long enough
+        breaks = np.flatnonzero(np.diff(rows) > self.min_gap)
+        starts = np.concatenate(([rows[0]], rows[breaks + 1]))
+        ends = np.concatenate((rows[breaks], [rows[-1]]))
+
+        layout_res = []
+        for top, bottom in zip(starts.tolist(), ends.tolist()):
+            if bottom - top < 4:
+                continue
+            cols = np.flatnonzero(ink[top:bottom + 1].any(axis=0))
+            left, right = int(cols[0]), int(cols[-1]) + 1
+            bottom += 1
+            layout_res.append({
+                'category_id': CategoryId.Text,
+                'poly': [left, top, right, top, right, bottom, left, bottom],
+                'score': 1.0,
+            })
+        return layout_res
+
+    def predict(self, image: Union[np.ndarray, Image.Image]) -> List[dict]:
+        img = self._as_array(image)
+        recorded = self.pages.get(self.page_key(img))
+        if recorded is not None:
+            return copy.deepcopy(recorded)
+        return self._synthetic_layout(img)
+
+    def batch_predict(self, images: list, batch_size: int) -> list:
+        return [self.predict(image) for image in images]
+
+    def record(self, image: Union[np.ndarray, Image.Image], layout_res: List[dict]):
+        """Remember the layout result of a page, see ``save``."""
+        self.pages[self.page_key(image)] = copy.deepcopy(layout_res)
+
+    def save(self, record_path: str = None):
+        record_path = record_path or self.record_path
+        with open(record_path, 'w', encoding='utf-8') as f:
+            json.dump({'pages': self.pages}, f)
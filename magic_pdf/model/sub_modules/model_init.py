@@ -1,4 +1,3 @@
-import torch
 from loguru import logger
 
 from magic_pdf.config.constants import MODEL_NAME
@@ -8,6 +7,7 @@ def doclayout_yolo_model_init(weight, device='cpu'):
     from magic_pdf.model.sub_modules.layout.doclayout_yolo.DocLayoutYOLO import \
         DocLayoutYOLOModel
     if str(device).startswith("npu"):
+        import torch
         device = torch.device(device)
     model = DocLayoutYOLOModel(weight, device)
     return model
@@ -18,6 +18,12 @@ def paddex_layout_model_init(model_name: str, device: str):
     model = PaddleXLayoutModelWrapper(model_name=model_name, device=device)
     return model
 
+def recorded_layout_model_init(record_path: str = None):
+    from magic_pdf.model.sub_modules.layout.recorded.RecordedLayoutModel import \
+        RecordedLayoutModel
+    model = RecordedLayoutModel(record_path)
+    return model
+
 class AtomModelSingleton:
     _instance = None
     _models = {}
@@ -32,7 +38,8 @@ class AtomModelSingleton:
         layout_model_name = kwargs.get('layout_model_name', None)
 
         if atom_model_name in [AtomicModel.Layout]:
-            key = (atom_model_name, layout_model_name)
+            # a recorded layout is one model per recording
+            key = (atom_model_name, layout_model_name, kwargs.get('record_path'))
         else:
             key = atom_model_name
 
@@ -53,6 +60,10 @@ def atom_model_init(model_name: str, **kwargs):
                 model_name=kwargs.get('paddlex_model_name'),
                 device=kwargs.get('device')
             )
+        elif kwargs.get('layout_model_name') == MODEL_NAME.RecordedLayout:
+            atom_model = recorded_layout_model_init(
+                kwargs.get('record_path')
+            )
         else:
             logger.error('layout model name not allow')
             exit(1)
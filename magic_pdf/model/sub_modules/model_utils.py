@@ -1,6 +1,6 @@
 import time
 
-import torch
+import fitz
 from PIL import Image
 from loguru import logger
 
@@ -23,6 +23,43 @@ def crop_img(input_res, input_pil_img, crop_paste_x=0, crop_paste_y=0):
     return return_image, return_list
 
 
+def render_region(input_res, page: fitz.Page, scale, crop_paste_x=0, crop_paste_y=0):
+    """Rasterize a layout box straight from the PDF page, same output as crop_img.
+
+    The box is given in the pixel space of the page raster the layout model
+    saw, which was rendered at ``scale`` pixels per point, so rendering the
+    clip at the same scale gives the crop at exactly the resolution the VLM
+    receives without keeping a full page PIL image around.
+
+    Args:
+        input_res (dict): layout result with a pixel space 'poly'
+        page (fitz.Page): the unrotated source page
+        scale (float): pixels per PDF point of the layout raster
+        crop_paste_x (int, optional): horizontal white padding. Defaults to 0.
+        crop_paste_y (int, optional): vertical white padding. Defaults to 0.
+
+    Returns:
+        tuple: the padded PIL image and the same return_list as crop_img
+    """
+    crop_xmin, crop_ymin = int(input_res['poly'][0]), int(input_res['poly'][1])
+    crop_xmax, crop_ymax = int(input_res['poly'][4]), int(input_res['poly'][5])
+    crop_new_width = crop_xmax - crop_xmin + crop_paste_x * 2
+    crop_new_height = crop_ymax - crop_ymin + crop_paste_y * 2
+    return_image = Image.new('RGB', (crop_new_width, crop_new_height), 'white')
+
+    clip = fitz.Rect(crop_xmin / scale, crop_ymin / scale, crop_xmax / scale, crop_ymax / scale)
+    if not clip.is_empty:
+        pm = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip, alpha=False)
+        cropped_img = Image.frombytes('RGB', (pm.width, pm.height), pm.samples)
+        # the clip is snapped to whole pixels, never exceed the crop_img box size
+        cropped_img = cropped_img.crop((
+            0, 0, min(pm.width, crop_xmax - crop_xmin), min(pm.height, crop_ymax - crop_ymin)
+        ))
+        return_image.paste(cropped_img, (crop_paste_x, crop_paste_y))
+    return_list = [crop_paste_x, crop_paste_y, crop_xmin, crop_ymin, crop_xmax, crop_ymax, crop_new_width, crop_new_height]
+    return return_image, return_list
+
+
 # Select regions for OCR / formula regions / table regions
 def get_res_list_from_layout_res(layout_res):
     ocr_res_list = []
@@ -51,6 +88,7 @@ def clean_vram(device, vram_threshold=8):
 
 
 def get_vram(device):
+    import torch
     if torch.cuda.is_available() and device != 'cpu':
         total_memory = torch.cuda.get_device_properties(device).total_memory / (1024 ** 3)
         return total_memory
@@ -0,0 +1,189 @@
+"""Tiled recognition of tall tables.
+
+A tall table crop is cut into horizontal bands at full-width row rules, or
+for tables without them at whitespace gaps, found from the row ink profile. Every band after the first is prefixed
+with the table header strip so the VLM keeps the column context. The bands
+are recognized in the same batch as the other crops, then their ``<tr>``
+rows are stitched into the first band's table, dropping the repeated header
+rows. When the table can not be cut, or a band yields no rows, the caller
+falls back to recognizing the whole table.
+
+Configured by ``chat_config.table_tiling`` in model_configs.yaml.
+"""
+import re
+from typing import List, Optional
+
+import numpy as np
+from PIL import Image
+
+_ROW_RE = re.compile(r'<tr\b.*?</tr>', flags=re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>|\s+')
+_TABLE_END_RE = re.compile(r'</table>', flags=re.IGNORECASE)
+
+
+class TableTiler:
+    def __init__(
+        self,
+        enable: bool = False,
+        min_height: int = 1200,
+        max_band_height: int = 600,
+        max_header_height: int = 200,
+        min_header_height: int = 8,
+        min_gap: int = 3,
+        column_slices: int = 8,
+        padding: int = 50,
+    ):
+        """Table tiling settings.
+
+        Args:
+            enable (bool, optional): tile tall tables at all. Defaults to False.
+            min_height (int, optional): tables at least this high (layout pixels) are tiled. Defaults to 1200.
+            max_band_height (int, optional): target upper bound of a band height. Defaults to 600.
+            max_header_height (int, optional): the strip above the header cut is repeated as header
+                when it is not higher than this. Defaults to 200.
+            min_header_height (int, optional): rows of text ink the header strip must hold, so a cut
+                on the top border is not taken as the end of the header. Defaults to 8.
+            min_gap (int, optional): blank rows needed for a whitespace cut. Defaults to 3.
+            column_slices (int, optional): vertical slices a whitespace gap must be blank in. Defaults to 8.
+            padding (int, optional): white padding the crops were made with. Defaults to 50.
+        """
+        self.enable = enable
+        self.min_height = min_height
+        self.max_band_height = max_band_height
+        self.max_header_height = max_header_height
+        self.min_header_height = min_header_height
+        self.min_gap = min_gap
+        self.column_slices = column_slices
+        self.padding = padding
+
+    @classmethod
+    def from_config(cls, chat_config: dict) -> 'TableTiler':
+        return cls(**(chat_config.get('table_tiling') or {}))
+
+    @staticmethod
+    def _runs(kind: np.ndarray, min_run: int = 1) -> List[tuple]:
+        """(start, end) of the runs of True at least min_run rows long."""
+        runs = []
+        y = 0
+        while y < len(kind):
+            if kind[y]:
+                start = y
+                while y < len(kind) and kind[y]:
+                    y += 1
+                if y - start >= min_run:
+                    runs.append((start, y))
+            else:
+                y += 1
+        return runs
+
+    def _cut_candidates(self, gray: np.ndarray) -> List[int]:
+        """Rows where a band may end: the middle of full-width row rules in
+        ruled tables, else of whitespace gaps confirmed across the columns.
+
+        Gaps inside tall cells of ruled tables sit between two row rules and
+        are never cut. In tables without row rules, a gap only ends a row when
+        the text line below it has ink in as many column slices as a typical
+        line, not when a single tall cell continues alone.
+        """
+        ink_mask = gray < 160
+        rules = self._runs(ink_mask.mean(axis=1) > 0.9)
+        if len(rules) > 2:
+            # more than the top and bottom border: the rows are ruled
+            return [(start + end) // 2 for start, end in rules]
+
+        slices = [part for part in np.array_split(ink_mask, self.column_slices, axis=1) if part.shape[1]]
+        # rows x slices: ink in that slice of the row
+        slice_ink = np.stack([part.mean(axis=1) >= 0.002 for part in slices], axis=1)
+        blank = ~slice_ink.any(axis=1)
+        lines = self._runs(~blank)
+        if not lines:
+            return []
+        occupancy = [int(slice_ink[start:end].any(axis=0).sum()) for start, end in lines]
+        typical = float(np.median(occupancy))
+        candidates = []
+        for start, end in self._runs(blank, self.min_gap):
+            following = next((n for n, (line_start, _) in enumerate(lines) if line_start >= end), None)
+            if following is None or occupancy[following] >= typical:
+                candidates.append((start + end) // 2)
+        return candidates
+
+    def _header_end(self, gray: np.ndarray, candidates: List[int]) -> int:
+        """The first cut with at least min_header_height rows of text ink above
+        it, e.g. below the header row rather than on the table's top border.
+        0 when there is none within max_header_height."""
+        ink = (gray < 160).mean(axis=1)
+        text_rows = np.cumsum((ink > 0.002) & (ink <= 0.9))
+        for y in candidates:
+            if y > self.max_header_height:
+                break
+            if text_rows[y - 1] >= self.min_header_height:
+                return y
+        return 0
+
+    def tile(self, crop: Image.Image) -> Optional[List[Image.Image]]:
+        """Cut a padded table crop into band images, None when it should not be tiled."""
+        height = crop.height - 2 * self.padding
+        if not self.enable or height < self.min_height:
+            return None
+        inner = crop.crop((self.padding, self.padding, crop.width - self.padding, crop.height - self.padding))
+        gray = np.asarray(inner.convert('L'))
+        candidates = [y for y in self._cut_candidates(gray) if 0 < y < height]
+        if not candidates:
+            return None
+
+        header_end = self._header_end(gray, candidates)
+        cuts = [0]
+        for y in candidates:
+            if y - cuts[-1] > self.max_band_height:
+                # the previous candidate is the last one that keeps the band small enough
+                previous = max((c for c in candidates if cuts[-1] < c < y), default=None)
+                if previous is None:
+                    return None
+                cuts.append(previous)
+        if height - cuts[-1] > self.max_band_height:
+            last = max((c for c in candidates if c > cuts[-1]), default=None)
+            if last is None:
+                return None
+            cuts.append(last)
+        cuts.append(height)
+        if len(cuts) < 3:
+            return None
+
+        header = inner.crop((0, 0, inner.width, header_end)) if header_end else None
+        bands = []
+        for n, (top, bottom) in enumerate(zip(cuts, cuts[1:])):
+            band = inner.crop((0, top, inner.width, bottom))
+            if n > 0 and header is not None:
+                stacked = Image.new('RGB', (inner.width, header.height + band.height), 'white')
+                stacked.paste(header, (0, 0))
+                stacked.paste(band, (0, header.height))
+                band = stacked
+            padded = Image.new('RGB', (band.width + 2 * self.padding, band.height + 2 * self.padding), 'white')
+            padded.paste(band, (self.padding, self.padding))
+            bands.append(padded)
+        return bands
+
+    @staticmethod
+    def _row_key(row: str) -> str:
+        return _TAG_RE.sub('', row)
+
+    def stitch(self, outputs: List[str]) -> Optional[str]:
+        """Merge the html of the bands into the first band's table, None when it fails."""
+        first_rows = _ROW_RE.findall(outputs[0])
+        if not first_rows or not _TABLE_END_RE.search(outputs[0]):
+            return None
+        first_keys = [self._row_key(row) for row in first_rows]
+
+        extra_rows = []
+        for output in outputs[1:]:
+            rows = _ROW_RE.findall(output)
+            if not rows:
+                return None
+            # drop the repeated header rows at the top of the band
+            skip = 0
+            while skip < len(rows) - 1 and skip < len(first_keys) and self._row_key(rows[skip]) == first_keys[skip]:
+                skip += 1
+            extra_rows.extend(rows[skip:])
+
+        end = list(_TABLE_END_RE.finditer(outputs[0]))[-1]
+        return outputs[0][:end.start()] + ''.join(extra_rows) + outputs[0][end.start():]
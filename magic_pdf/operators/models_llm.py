@@ -1,18 +1,50 @@
 import copy
+import hashlib
 import json
 import os
+import socket
+import time
 from typing import Callable
 
 from magic_pdf.config.constants import PARSE_TYPE_OCR
 from magic_pdf.config.enums import SupportedPdfParseMethod
-from magic_pdf.data.data_reader_writer import DataWriter
-from magic_pdf.data.dataset import Dataset
+from magic_pdf.data.data_reader_writer import DataReader, DataWriter
+from magic_pdf.data.dataset import Dataset, ImageDataset, MultiFileDataset, PymuDocDataset
 from magic_pdf.libs.draw_bbox import draw_model_bbox
+from magic_pdf.libs.json_stream import JsonStreamWriter, dumps, write_index
+from magic_pdf.libs.paged_container import CODEC_ZLIB, KIND_MODEL, PagedReader, pack_pages
 from magic_pdf.libs.version import __version__
 from magic_pdf.operators.pipes_llm import PipeResultLLM
 from magic_pdf.pdf_parse_union_core_v2_llm import pdf_parse_union
 from magic_pdf.operators import InferenceResultBase
 
+# A saved inference result (see InferenceResultLLM.save) is a directory:
+#   bundle.json   format version, page metadata, where the source document is
+#   model.mkpg    the model output as a paged container
+#   source.pdf    the source document, unless saved as a reference
+BUNDLE_VERSION = 1
+BUNDLE_META = 'bundle.json'
+BUNDLE_MODEL = 'model.mkpg'
+BUNDLE_SOURCE = 'source.pdf'
+
+SOURCE_PDF = 'pdf'
+SOURCE_IMAGE = 'image'
+
+
+def load_bundle_meta(reader: DataReader, bundle_dir: str) -> dict:
+    """The bundle.json of a saved inference result.
+
+    Raises:
+        ValueError: the bundle was written by a newer version
+    """
+    meta = json.loads(reader.read(os.path.join(bundle_dir, BUNDLE_META)))
+    if meta.get('version', 0) > BUNDLE_VERSION:
+        raise ValueError(
+            f'{bundle_dir}: bundle version {meta.get("version")} is newer than the supported {BUNDLE_VERSION}'
+        )
+    return meta
+
+
 class InferenceResultLLM(InferenceResultBase):
     def __init__(self, inference_results: list, dataset: Dataset):
         """Initialized method.
@@ -38,16 +70,143 @@ class InferenceResultLLM(InferenceResultBase):
             copy.deepcopy(self._infer_res), self._dataset, dir_name, base_name
         )
 
-    def dump_model(self, writer: DataWriter, file_path: str):
-        """Dump model inference result to file.
+    def dump_model(self, writer: DataWriter, file_path: str, pretty: bool = False, index: bool = True):
+        """Dump model inference result to file, page by page.
 
         Args:
             writer (DataWriter): writer handle
             file_path (str): the location of target file
+            pretty (bool, optional): indent the json. Defaults to False, compact.
+            index (bool, optional): write the page index next to it, see load_indexed_item. Defaults to True.
         """
-        writer.write_string(
-            file_path, json.dumps(self._infer_res, ensure_ascii=False, indent=4)
-        )
+        with writer.open_for_write(file_path) as stream:
+            json_writer = JsonStreamWriter(stream, pretty)
+            json_writer.begin_array()
+            offsets = [json_writer.value(page) for page in self._infer_res]
+            json_writer.end()
+        if index:
+            write_index(writer, file_path, offsets)
+
+    def dump_model_paged(self, writer: DataWriter, file_path: str, codec: str = CODEC_ZLIB):
+        """Dump model inference result as a paged container, where every
+        page is compressed on its own and can be read without the others.
+
+        Args:
+            writer (DataWriter): writer handle
+            file_path (str): the location of target file
+            codec (str, optional): none, zlib or brotli. Defaults to CODEC_ZLIB.
+        """
+        writer.write(file_path, pack_pages(self._infer_res, {'kind': KIND_MODEL}, codec))
+
+    @staticmethod
+    def _open_model_paged(file_path: str) -> PagedReader:
+        reader = PagedReader.open(file_path)
+        if reader.meta.get('kind') != KIND_MODEL:
+            reader.close()
+            raise ValueError(f'{file_path} is not a model container')
+        return reader
+
+    @staticmethod
+    def load_model_paged_page(file_path: str, page_no: int) -> dict:
+        """Decode the inference result of a single page of a model container.
+
+        Args:
+            file_path (str): the location of the container, memory-mapped
+            page_no (int): the position of the page in the inference result
+
+        Returns:
+            dict: the page result
+        """
+        with InferenceResultLLM._open_model_paged(file_path) as reader:
+            return reader.page(page_no)
+
+    @classmethod
+    def load_model_paged(cls, file_path: str, dataset: Dataset) -> 'InferenceResultLLM':
+        """Load an inference result from a model container.
+
+        Args:
+            file_path (str): the location of the container
+            dataset (Dataset): the dataset the result was made of
+
+        Returns:
+            InferenceResultLLM: the result
+        """
+        with cls._open_model_paged(file_path) as reader:
+            return cls(list(reader.pages()), dataset)
+
+    def save(self, writer: DataWriter, bundle_dir: str, source_path: str = None, meta: dict = None,
+             codec: str = CODEC_ZLIB):
+        """Save the inference result with its source document, so the pipe
+        stage can run later, on another machine, with InferenceResultLLM.load.
+
+        Args:
+            writer (DataWriter): writer handle
+            bundle_dir (str): the directory of the saved result
+            source_path (str, optional): where the source document stays readable for the loading side,
+                e.g. on shared storage. It is referenced by path and sha256 instead of copied into the
+                bundle. Defaults to None, the document is stored in the bundle.
+            meta (dict, optional): caller values stored along, e.g. the output name. Defaults to None.
+            codec (str, optional): compression of the model container. Defaults to CODEC_ZLIB.
+        """
+        if source_path is None:
+            source = {'type': SOURCE_PDF, 'file': BUNDLE_SOURCE}
+            writer.write(os.path.join(bundle_dir, BUNDLE_SOURCE), self._dataset.data_bits())
+        elif isinstance(self._dataset, MultiFileDataset):
+            raise ValueError('a merged multi file dataset has no single source file, save it without source_path')
+        else:
+            source = {
+                'type': SOURCE_IMAGE if isinstance(self._dataset, ImageDataset) else SOURCE_PDF,
+                'path': source_path,
+                'sha256': hashlib.sha256(self._dataset._raw_data).hexdigest(),
+            }
+        self.dump_model_paged(writer, os.path.join(bundle_dir, BUNDLE_MODEL), codec)
+        bundle = {
+            'version': BUNDLE_VERSION,
+            'model_version': __version__,
+            'created_at': time.time(),
+            'host': socket.gethostname(),
+            'page_count': len(self._infer_res),
+            'pages': [page.get('page_info', {}) for page in self._infer_res],
+            'source': source,
+            'meta': meta or {},
+        }
+        # written last, a bundle without bundle.json is incomplete
+        writer.write_string(os.path.join(bundle_dir, BUNDLE_META), dumps(bundle, pretty=True))
+
+    @classmethod
+    def load(cls, reader: DataReader, bundle_dir: str) -> 'InferenceResultLLM':
+        """Load an inference result saved with InferenceResultLLM.save.
+
+        Args:
+            reader (DataReader): reader of the bundle, and of the source document when it is referenced
+            bundle_dir (str): the directory of the saved result
+
+        Returns:
+            InferenceResultLLM: the result, with the dataset of its source document
+
+        Raises:
+            ValueError: the bundle is incomplete, or the referenced document changed since it was saved
+        """
+        bundle = load_bundle_meta(reader, bundle_dir)
+        source = bundle['source']
+        if 'file' in source:
+            dataset = PymuDocDataset(reader.read(os.path.join(bundle_dir, source['file'])))
+        else:
+            bits = reader.read(source['path'])
+            if hashlib.sha256(bits).hexdigest() != source['sha256']:
+                raise ValueError(f'{bundle_dir}: source document {source["path"]} changed since the result was saved')
+            dataset = ImageDataset(bits) if source['type'] == SOURCE_IMAGE else PymuDocDataset(bits)
+
+        model_reader = PagedReader(reader.read(os.path.join(bundle_dir, BUNDLE_MODEL)))
+        if model_reader.meta.get('kind') != KIND_MODEL:
+            raise ValueError(f'{bundle_dir}: {BUNDLE_MODEL} is not a model container')
+        infer_res = list(model_reader.pages())
+        if len(infer_res) != bundle['page_count'] or len(infer_res) != len(dataset):
+            raise ValueError(
+                f'{bundle_dir}: {len(infer_res)} model pages, {bundle["page_count"]} recorded, '
+                f'{len(dataset)} in the source document'
+            )
+        return cls(infer_res, dataset)
 
     def get_infer_res(self):
         """Get the inference result.
@@ -1,15 +1,29 @@
 import copy
 import json
 import os
-from typing import Callable
+from contextlib import ExitStack
+from typing import Callable, List
 
 from magic_pdf.config.make_content_config import DropMode, MakeMode
-from magic_pdf.data.data_reader_writer import DataWriter
+from magic_pdf.config.output_profile import (OutputArtifact, OutputProfile,
+                                             profile_artifacts)
+from magic_pdf.data.data_reader_writer import DataReader, DataWriter
 from magic_pdf.data.dataset import Dataset
+from magic_pdf.dict2md.emitters import (ContentListEmitter, Emitter,
+                                        MarkdownEmitter, MiddleJsonEmitter,
+                                        PagedMiddleEmitter, PlainTextEmitter,
+                                        emit_pages)
 from magic_pdf.dict2md.ocr_mkcontent import union_make
-from magic_pdf.libs.draw_bbox import (draw_layout_bbox, draw_line_sort_bbox,
-                                      draw_span_bbox)
+from magic_pdf.libs.draw_bbox import (DEBUG_LAYER_MODEL, DEBUG_LAYERS,
+                                      draw_debug_bbox, draw_layout_bbox,
+                                      draw_line_sort_bbox, draw_span_bbox)
 from magic_pdf.libs.json_compressor import JsonCompressor
+from magic_pdf.libs.json_stream import load_index, load_indexed_item, write_index
+from magic_pdf.libs.markdown_utils import fix_markdown_output
+from magic_pdf.libs.paged_container import CODEC_ZLIB, KIND_MIDDLE, PagedReader
+from magic_pdf.post_proc.para_split_v3 import (PARA_BLOCKS_REF, para_blocks_to_refs,
+                                               resolve_page_para_block_refs,
+                                               resolve_para_block_refs)
 
 
 class PipeResultLLM:
@@ -23,6 +37,11 @@ class PipeResultLLM:
         self._pipe_res = pipe_res
         self._dataset = dataset
 
+    @property
+    def pdf_info(self) -> list:
+        """The page dicts of the result."""
+        return self._pipe_res['pdf_info']
+
     def get_markdown(
         self,
         img_dir_or_bucket_prefix: str,
@@ -43,7 +62,7 @@ class PipeResultLLM:
         md_content = union_make(
             pdf_info_list, md_make_mode, drop_mode, img_dir_or_bucket_prefix
         )
-        return md_content.replace('\$', '$').replace('\*', '*').replace('<seg>', '\<seg\>').replace('<sos', '\<sos\>').replace('<eos>', '\<eos\>').replace('<pad>', '\<pad\>').replace('<unk>', '\<unk\>').replace('<sep>', '\<sep\>').replace('<cls>', '\<cls\>')
+        return fix_markdown_output(md_content)
 
     def dump_md(
         self,
@@ -62,11 +81,10 @@ class PipeResultLLM:
             drop_mode (str, optional): Drop strategy when some page which is corrupted or inappropriate. Defaults to DropMode.NONE.
             md_make_mode (str, optional): The content Type of Markdown be made. Defaults to MakeMode.MM_MD.
         """
-
-        md_content = self.get_markdown(
-            img_dir_or_bucket_prefix, drop_mode=drop_mode, md_make_mode=md_make_mode
+        self.dump_all(
+            writer, md_path=file_path, img_dir_or_bucket_prefix=img_dir_or_bucket_prefix,
+            drop_mode=drop_mode, md_make_mode=md_make_mode,
         )
-        writer.write_string(file_path, md_content)
 
     def get_content_list(
         self,
@@ -97,6 +115,7 @@ class PipeResultLLM:
         file_path: str,
         image_dir_or_bucket_prefix: str,
         drop_mode=DropMode.NONE,
+        pretty: bool = False,
     ):
         """Dump Content List.
 
@@ -105,12 +124,11 @@ class PipeResultLLM:
             file_path (str): The file location of content list
             image_dir_or_bucket_prefix (str): The s3 bucket prefix or local file directory which used to store the figure
             drop_mode (str, optional): Drop strategy when some page which is corrupted or inappropriate. Defaults to DropMode.NONE.
+            pretty (bool, optional): indent the json. Defaults to False, compact.
         """
-        content_list = self.get_content_list(
-            image_dir_or_bucket_prefix, drop_mode=drop_mode,
-        )
-        writer.write_string(
-            file_path, json.dumps(content_list, ensure_ascii=False, indent=4)
+        self.dump_all(
+            writer, content_list_path=file_path,
+            img_dir_or_bucket_prefix=image_dir_or_bucket_prefix, drop_mode=drop_mode, pretty=pretty,
         )
 
     def get_middle_json(self) -> str:
@@ -119,17 +137,220 @@ class PipeResultLLM:
         Returns:
             str: The content of middle json
         """
-        return json.dumps(self._pipe_res, ensure_ascii=False, indent=4)
+        pipe_res = self._pipe_res
+        if pipe_res.get('_para_blocks') == PARA_BLOCKS_REF:
+            # para_blocks shared with preproc_blocks are written once
+            pipe_res = dict(pipe_res, pdf_info=para_blocks_to_refs(pipe_res['pdf_info']))
+        return json.dumps(pipe_res, ensure_ascii=False, indent=4)
 
-    def dump_middle_json(self, writer: DataWriter, file_path: str):
+    def dump_middle_json(self, writer: DataWriter, file_path: str, pretty: bool = False, index: bool = True):
         """Dump the result of pipeline.
 
         Args:
             writer (DataWriter): File writer handler
             file_path (str): The file location of middle json
+            pretty (bool, optional): indent the json. Defaults to False, compact.
+            index (bool, optional): write the page index next to it, see load_middle_json_page. Defaults to True.
+        """
+        self.dump_all(writer, middle_json_path=file_path, pretty=pretty, index=index)
+
+    def dump_middle_paged(self, writer: DataWriter, file_path: str, codec: str = CODEC_ZLIB):
+        """Dump the result of pipeline as a paged container, where every page
+        is compressed on its own and can be read without the others.
+
+        Args:
+            writer (DataWriter): File writer handler
+            file_path (str): The file location of the container
+            codec (str, optional): none, zlib or brotli. Defaults to CODEC_ZLIB.
+        """
+        self.dump_all(writer, middle_paged_path=file_path, paged_codec=codec)
+
+    @staticmethod
+    def _open_middle_paged(file_path: str) -> PagedReader:
+        reader = PagedReader.open(file_path)
+        if reader.meta.get('kind') != KIND_MIDDLE:
+            reader.close()
+            raise ValueError(f'{file_path} is not a middle json container')
+        return reader
+
+    @staticmethod
+    def load_middle_paged_page(file_path: str, page_no: int) -> dict:
+        """Decode a single page of a middle json container.
+
+        Args:
+            file_path (str): The file location of the container, memory-mapped
+            page_no (int): the position of the page in pdf_info
+
+        Returns:
+            dict: the page, with para_blocks resolved
+        """
+        with PipeResultLLM._open_middle_paged(file_path) as reader:
+            page = reader.page(page_no)
+            if reader.meta.get('_para_blocks') == PARA_BLOCKS_REF:
+                resolve_page_para_block_refs(page)
+        return page
+
+    @classmethod
+    def load_middle_paged(cls, file_path: str, dataset: Dataset) -> 'PipeResultLLM':
+        """Load a pipe result from a middle json container.
+
+        Args:
+            file_path (str): The file location of the container
+            dataset (Dataset): the dataset the result was made of
+
+        Returns:
+            PipeResultLLM: the result
+        """
+        with cls._open_middle_paged(file_path) as reader:
+            pipe_res = {'pdf_info': list(reader.pages())}
+            pipe_res.update((key, value) for key, value in reader.meta.items() if key != 'kind')
+        return cls(resolve_para_block_refs(pipe_res), dataset)
+
+    @staticmethod
+    def load_middle_json_page(reader: DataReader, file_path: str, page_no: int, index: dict = None) -> dict:
+        """Read a single page of a middle json through its page index,
+        without parsing the other pages.
+
+        Args:
+            reader (DataReader): reader of the middle json and its index
+            file_path (str): The file location of middle json
+            page_no (int): the position of the page in pdf_info
+            index (dict, optional): the index of the file, loaded with load_index when reading many pages. Defaults to None.
+
+        Returns:
+            dict: the page, with para_blocks resolved for files written in 'ref' mode
+        """
+        if index is None:
+            index = load_index(reader, file_path)
+        if index is None:
+            # no index, e.g. written by an older version
+            page = json.loads(reader.read(file_path))['pdf_info'][page_no]
+            meta = {}
+        else:
+            page = load_indexed_item(reader, file_path, page_no, index)
+            meta = index['meta']
+        if meta.get('_para_blocks') == PARA_BLOCKS_REF:
+            resolve_page_para_block_refs(page)
+        return page
+
+    def dump_all(
+        self,
+        writer: DataWriter,
+        md_path: str = None,
+        content_list_path: str = None,
+        middle_json_path: str = None,
+        txt_path: str = None,
+        img_dir_or_bucket_prefix: str = '',
+        drop_mode=DropMode.NONE,
+        md_make_mode=MakeMode.MM_MD,
+        emitters: List[Emitter] = None,
+        pretty: bool = False,
+        index: bool = True,
+        middle_paged_path: str = None,
+        paged_codec: str = CODEC_ZLIB,
+    ):
+        """Dump several outputs in one walk over the pages, each written to
+        the writer as it is produced.
+
+        Args:
+            writer (DataWriter): File writer handle
+            md_path (str, optional): The file location of markdown. Defaults to None, not written.
+            content_list_path (str, optional): The file location of content list. Defaults to None, not written.
+            middle_json_path (str, optional): The file location of middle json. Defaults to None, not written.
+            txt_path (str, optional): The file location of plain text. Defaults to None, not written.
+            img_dir_or_bucket_prefix (str, optional): The s3 bucket prefix or local file directory which used to store the figure. Defaults to ''.
+            drop_mode (str, optional): Drop strategy when some page which is corrupted or inappropriate. Defaults to DropMode.NONE.
+            md_make_mode (str, optional): The content Type of Markdown be made. Defaults to MakeMode.MM_MD.
+            emitters (List[Emitter], optional): further outputs fed in the same walk. Defaults to None.
+            pretty (bool, optional): indent the json outputs. Defaults to False, compact.
+            index (bool, optional): write the page index of the middle json. Defaults to True.
+            middle_paged_path (str, optional): The file location of the middle json as a paged container. Defaults to None, not written.
+            paged_codec (str, optional): compression of the paged container frames. Defaults to CODEC_ZLIB.
+        """
+        middle_json_emitter = None
+        paged_emitter = None
+        with ExitStack() as stack:
+            all_emitters = []
+            if md_path is not None:
+                all_emitters.append(MarkdownEmitter(
+                    stack.enter_context(writer.open_for_write(md_path)),
+                    img_dir_or_bucket_prefix, drop_mode, md_make_mode,
+                ))
+            if content_list_path is not None:
+                all_emitters.append(ContentListEmitter(
+                    stack.enter_context(writer.open_for_write(content_list_path)),
+                    img_dir_or_bucket_prefix, drop_mode, pretty,
+                ))
+            if middle_json_path is not None:
+                middle_json_emitter = MiddleJsonEmitter(
+                    stack.enter_context(writer.open_for_write(middle_json_path)), pretty
+                )
+                all_emitters.append(middle_json_emitter)
+            if txt_path is not None:
+                all_emitters.append(PlainTextEmitter(
+                    stack.enter_context(writer.open_for_write(txt_path))
+                ))
+            if middle_paged_path is not None:
+                paged_emitter = PagedMiddleEmitter(paged_codec)
+                all_emitters.append(paged_emitter)
+            all_emitters.extend(emitters or [])
+            emit_pages(self._pipe_res, all_emitters)
+        if middle_json_emitter is not None and index:
+            write_index(writer, middle_json_path, middle_json_emitter.offsets, middle_json_emitter.meta)
+        if paged_emitter is not None:
+            writer.write(middle_paged_path, paged_emitter.content)
+
+    def dump_profile(
+        self,
+        writer: DataWriter,
+        name: str,
+        img_dir_or_bucket_prefix: str,
+        profile: str = OutputProfile.STANDARD,
+        infer_result=None,
+        overlays: bool = True,
+        **kwargs,
+    ):
+        """Dump the artifacts of an output profile, named after name: name.md,
+        name_content_list.json, name_middle.json and name_debug.pdf.
+
+        Args:
+            writer (DataWriter): File writer handle
+            name (str): the base name of the files
+            img_dir_or_bucket_prefix (str): The s3 bucket prefix or local file directory which used to store the figure
+            profile (str, optional): one of OutputProfile. Defaults to OutputProfile.STANDARD.
+            infer_result (InferenceResultLLM, optional): the inference result, for the model layer of the debug PDF. Defaults to None.
+            overlays (bool, optional): draw the debug PDF of the profile, False when the caller runs draw_debug itself. Defaults to True.
+            kwargs: further arguments of dump_all, e.g. txt_path or pretty
+        """
+        artifacts = profile_artifacts(profile)
+        self.dump_all(
+            writer,
+            md_path=f'{name}.md' if OutputArtifact.MARKDOWN in artifacts else None,
+            content_list_path=f'{name}_content_list.json' if OutputArtifact.CONTENT_LIST in artifacts else None,
+            middle_json_path=f'{name}_middle.json' if OutputArtifact.MIDDLE_JSON in artifacts else None,
+            img_dir_or_bucket_prefix=img_dir_or_bucket_prefix,
+            **kwargs,
+        )
+        if overlays and OutputArtifact.DEBUG_PDF in artifacts:
+            self.draw_debug(writer, f'{name}_debug.pdf', infer_result)
+
+    def draw_debug(self, writer: DataWriter, file_path: str, infer_result=None, layers=DEBUG_LAYERS):
+        """Draw the model, layout and span overlays into one layered PDF, in a
+        single pass over the document.
+
+        Args:
+            writer (DataWriter): File writer handle
+            file_path (str): The file location of the debug PDF
+            infer_result (InferenceResultLLM, optional): the inference result of this pipe result, the model layer is left out without it. Defaults to None.
+            layers (tuple, optional): the layers to draw, of DEBUG_LAYERS. Defaults to all.
         """
-        middle_json = self.get_middle_json()
-        writer.write_string(file_path, middle_json)
+        model_list = None
+        if infer_result is not None and DEBUG_LAYER_MODEL in layers:
+            # MagicModel fixes the model list up in place
+            model_list = copy.deepcopy(infer_result.get_infer_res())
+        writer.write(file_path, draw_debug_bbox(
+            self._dataset.data_bits(), self._pipe_res['pdf_info'], model_list, self._dataset, layers
+        ))
 
     def draw_layout(self, file_path: str) -> None:
         """Draw the layout.
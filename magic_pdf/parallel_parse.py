@@ -0,0 +1,316 @@
+"""Process pool for the page post-processing of ``pdf_parse_union``.
+
+``parse_page_core`` (span filtering, block filling, title merging, reading
+order, image cutting) is pure Python and CPU bound, and pages are
+independent until ``para_split``. With ``post_process.num_workers`` set, the
+pages of a document are parsed in a pool of spawned worker processes:
+
+- every task carries the raw model results of a contiguous run of pages, the
+  worker builds a :class:`MagicModel` over a :class:`PageModelView` of just
+  those pages and opens the document from a temporary PDF file;
+- reading order predictions are sent back to the parent's layout reader
+  through a :class:`ReaderService`, so every page is ordered by the same
+  model (and precision) as in the serial path; with the xy-cut reader no
+  model is involved at all;
+- the parent collects the page dicts in page order and runs ``para_split``
+  as before.
+
+The pool is kept between documents. Only local file image writers are
+supported, other writers fall back to the serial loop.
+"""
+import atexit
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import Client, Listener
+from typing import List, Optional
+
+from loguru import logger
+
+from magic_pdf.data.data_reader_writer import FileBasedDataWriter
+
+
+def post_process_config(MonkeyOCR_model) -> dict:
+    """The ``post_process`` section of the model's config."""
+    return (getattr(MonkeyOCR_model, 'configs', None) or {}).get('post_process') or {}
+
+
+def image_extraction_config(MonkeyOCR_model) -> dict:
+    """The ``image_extraction`` section of the model's config."""
+    return (getattr(MonkeyOCR_model, 'configs', None) or {}).get('image_extraction') or {}
+
+
+def pool_size(MonkeyOCR_model) -> int:
+    """Configured number of pool workers."""
+    num_workers = post_process_config(MonkeyOCR_model).get('num_workers', 0)
+    if num_workers == 'auto':
+        num_workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    return int(num_workers or 0)
+
+
+def post_process_workers(MonkeyOCR_model, page_count: int) -> int:
+    """Number of workers a document is spread over, 0 for the serial loop."""
+    min_pages = max(1, post_process_config(MonkeyOCR_model).get('min_pages_per_worker', 4))
+    num_workers = min(pool_size(MonkeyOCR_model), page_count // min_pages)
+    return num_workers if num_workers > 1 else 0
+
+
+class PageModelView:
+    """``model_list`` stand-in holding the results of some pages only.
+
+    MagicModel iterates the model list and indexes it by page number, both
+    work on the pages of the view.
+    """
+
+    def __init__(self, entries: List[dict]):
+        self._entries = {entry['page_info']['page_no']: entry for entry in entries}
+
+    def __iter__(self):
+        return iter(self._entries.values())
+
+    def __getitem__(self, page_no):
+        return self._entries[page_no]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ReaderService:
+    """Serve reading order predictions of the parent's layout reader to pool
+    workers over a Unix socket."""
+
+    def __init__(self, reader_model):
+        self.reader_model = reader_model
+        self.authkey = os.urandom(16)
+        self._dir = tempfile.mkdtemp(prefix='monkeyocr-reader-')
+        self.address = os.path.join(self._dir, 'reader.sock')
+        self._listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        self._lock = threading.Lock()
+        self._conns = []
+        self._closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _predict(self, boxes):
+        if hasattr(self.reader_model, 'predict_orders'):
+            return self.reader_model.predict_orders(boxes)
+        import torch
+
+        from magic_pdf.pdf_parse_union_core_v2_llm import do_predict
+
+        with self._lock, torch.no_grad():
+            return do_predict(boxes, self.reader_model)
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    boxes = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send(('ok', self._predict(boxes)))
+                except Exception as e:
+                    logger.exception('reading order prediction failed')
+                    conn.send(('error', f'{type(e).__name__}: {e}'))
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            if self._closed:
+                conn.close()
+                return
+            self._conns.append(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def close(self):
+        self._closed = True
+        # wake the accept loop, closing the listener alone does not
+        try:
+            Client(self.address, family='AF_UNIX', authkey=self.authkey).close()
+        except OSError:
+            pass
+        self._listener.close()
+        for conn in self._conns:
+            conn.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
+class _ReaderClient:
+    def __init__(self, address, authkey):
+        self._conn = Client(address, family='AF_UNIX', authkey=authkey)
+
+    def predict_orders(self, boxes: List[List[int]]) -> List[int]:
+        self._conn.send(boxes)
+        status, result = self._conn.recv()
+        if status != 'ok':
+            raise RuntimeError(f'reader service failed: {result}')
+        return result
+
+    def close(self):
+        self._conn.close()
+
+
+class _WorkerModel:
+    """What parse_page_core needs of MonkeyOCR inside a worker."""
+
+    def __init__(self, device, layoutreader_model):
+        self.device = device
+        self.layoutreader_model = layoutreader_model
+
+
+# per worker process: open documents and reader connections, reused by the
+# tasks of the same document (a few, documents may be parsed concurrently)
+_WORKER_CACHE_SIZE = 4
+_worker_documents = OrderedDict()
+_worker_readers = OrderedDict()
+
+
+def _worker_document(pdf_path, reader_address, reader_authkey):
+    from magic_pdf.data.dataset import PymuDocDataset
+
+    if pdf_path not in _worker_documents:
+        with open(pdf_path, 'rb') as f:
+            _worker_documents[pdf_path] = PymuDocDataset(f.read())
+        while len(_worker_documents) > _WORKER_CACHE_SIZE:
+            _worker_documents.popitem(last=False)
+    _worker_documents.move_to_end(pdf_path)
+
+    reader = None
+    if reader_address:
+        if reader_address not in _worker_readers:
+            _worker_readers[reader_address] = _ReaderClient(reader_address, reader_authkey)
+            while len(_worker_readers) > _WORKER_CACHE_SIZE:
+                _worker_readers.popitem(last=False)[1].close()
+        _worker_readers.move_to_end(reader_address)
+        reader = _worker_readers[reader_address]
+    return _worker_documents[pdf_path], reader
+
+
+def _parse_pages(task: dict) -> List[tuple]:
+    from magic_pdf.libs.pdf_image_tools import ImageExtractor
+    from magic_pdf.model.magic_model import MagicModel
+    from magic_pdf.pdf_parse_union_core_v2_llm import parse_page_core
+
+    dataset, reader = _worker_document(task['pdf_path'], task['reader_address'], task['reader_authkey'])
+    magic_model = MagicModel(PageModelView(task['model_entries']), dataset)
+    worker_model = _WorkerModel('cpu', reader)
+    results = []
+    # images are named by content, identical ones of other tasks are the same file
+    with ImageExtractor.from_config(task['image_writer'], task['image_config']) as image_extractor:
+        for page_id in task['page_ids']:
+            page_info = parse_page_core(
+                dataset.get_page(page_id), magic_model, page_id, image_extractor,
+                task['parse_mode'], task['lang'], worker_model
+            )
+            results.append((page_id, page_info))
+    return results
+
+
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(num_workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != num_workers:
+            # only when the configured size changes, documents of any size share the pool
+            if _pool is not None:
+                _pool.shutdown(wait=True)
+            # spawn: the parent holds CUDA contexts and model threads that must not be forked
+            _pool = ProcessPoolExecutor(num_workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_size = num_workers
+            logger.info(f'started {num_workers} page post-processing workers')
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Drop a pool whose worker died, the next document starts a new one."""
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+            _pool_size = 0
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parallel_supported(dataset, imageWriter) -> bool:
+    # workers write the cut images themselves, the writer has to be a plain local one
+    return type(imageWriter) is FileBasedDataWriter and hasattr(dataset, 'data_bits')
+
+
+def parse_pages_in_pool(
+    model_list, dataset, page_ids: List[int], imageWriter, parse_mode, lang,
+    MonkeyOCR_model, num_workers: int
+) -> Optional[dict]:
+    """Parse pages with parse_page_core in the worker pool.
+
+    Args:
+        model_list (list): the raw (not MagicModel fixed) inference result of the document
+        dataset (Dataset): the document
+        page_ids (List[int]): pages to parse
+        imageWriter (FileBasedDataWriter): writer of the cut images
+        parse_mode (str): SupportedPdfParseMethod
+        lang (str): document language
+        MonkeyOCR_model: the model, only its layout reader is used
+        num_workers (int): workers the pages are spread over
+
+    Returns:
+        dict: page_id -> page_info, None when a worker died (e.g. out of memory)
+            and the document has to be parsed in the calling process
+    """
+    pool = _get_pool(pool_size(MonkeyOCR_model))
+    entries = {entry['page_info']['page_no']: entry for entry in model_list}
+    # a few tasks per worker keep them busy when pages differ in cost
+    chunk_size = max(1, math.ceil(len(page_ids) / (num_workers * 4)))
+
+    reader_model = MonkeyOCR_model.layoutreader_model
+    service = ReaderService(reader_model) if reader_model is not None else None
+    tmp_dir = tempfile.mkdtemp(prefix='monkeyocr-pages-')
+    try:
+        pdf_path = os.path.join(tmp_dir, 'doc.pdf')
+        with open(pdf_path, 'wb') as f:
+            f.write(dataset.data_bits())
+        futures = []
+        try:
+            for start in range(0, len(page_ids), chunk_size):
+                chunk = page_ids[start:start + chunk_size]
+                futures.append(pool.submit(_parse_pages, {
+                    'pdf_path': pdf_path,
+                    'page_ids': chunk,
+                    'model_entries': [entries[page_id] for page_id in chunk],
+                    'image_writer': imageWriter,
+                    'image_config': image_extraction_config(MonkeyOCR_model),
+                    'parse_mode': parse_mode,
+                    'lang': lang,
+                    'reader_address': service.address if service else None,
+                    'reader_authkey': service.authkey if service else None,
+                }))
+            page_infos = {}
+            for future in futures:
+                page_infos.update(future.result())
+            return page_infos
+        except BrokenProcessPool as e:
+            logger.warning(f'page post-processing worker died ({e}), parsing the document in process')
+            _discard_pool(pool)
+            return None
+    finally:
+        if service is not None:
+            service.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
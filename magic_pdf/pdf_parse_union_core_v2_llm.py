@@ -1,4 +1,3 @@
-import copy
 import math
 import re
 import statistics
@@ -6,7 +5,6 @@ import time
 from typing import List
 
 import fitz
-import torch
 from loguru import logger
 
 from magic_pdf.config.enums import SupportedPdfParseMethod
@@ -15,13 +13,14 @@ from magic_pdf.data.dataset import Dataset, PageableData
 from magic_pdf.libs.boxbase import calculate_overlap_area_in_bbox1_area_ratio, __is_overlaps_y_exceeds_threshold
 from magic_pdf.libs.clean_memory import clean_memory
 from magic_pdf.libs.convert_utils import dict_to_list
-from magic_pdf.libs.hash_utils import compute_md5
-from magic_pdf.libs.pdf_image_tools import cut_image_to_pil_image
+from magic_pdf.libs.pdf_image_tools import ImageExtractor, cut_image_to_pil_image
 from magic_pdf.model.magic_model import MagicModel
+from magic_pdf.parallel_parse import (image_extraction_config, parallel_supported, parse_pages_in_pool,
+                                      post_process_config, post_process_workers)
 
 
 from magic_pdf.model.sub_modules.model_init import AtomModelSingleton
-from magic_pdf.post_proc.para_split_v3 import para_split
+from magic_pdf.post_proc.para_split_v3 import PARA_BLOCKS_SHARED, para_split
 from magic_pdf.pre_proc.construct_page_dict import ocr_construct_page_component_v2
 from magic_pdf.pre_proc.cut_image import ocr_cut_image_and_table
 from magic_pdf.pre_proc.ocr_detect_all_bboxes import ocr_prepare_bboxes_for_layout_split_v2
@@ -298,17 +297,66 @@ def do_predict(boxes: List[List[int]], model) -> List[int]:
     return parse_logits(logits, len(boxes))
 
 
+# decimals of the fallback key, for coordinates that went through a float conversion
+BBOX_RANK_KEY_DIGITS = 2
+
+
+def _rounded_bbox_key(bbox):
+    return tuple(round(float(v), BBOX_RANK_KEY_DIGITS) for v in bbox)
+
+
+def bbox_rank_map(sorted_bboxes):
+    """The position of every bbox in sorted_bboxes, for lookups in O(1)
+    instead of sorted_bboxes.index(bbox).
+
+    Like list.index, the first occurrence wins for duplicate boxes. Boxes
+    are also keyed with rounded coordinates, a fallback when the exact
+    coordinates do not match.
+
+    Returns:
+        tuple: the exact and the rounded map, see bbox_rank
+    """
+    exact, rounded = {}, {}
+    for rank, bbox in enumerate(sorted_bboxes):
+        exact.setdefault(tuple(bbox), rank)
+        rounded.setdefault(_rounded_bbox_key(bbox), rank)
+    return exact, rounded
+
+
+def bbox_rank(rank_map, bbox):
+    """The position of bbox in the sorted boxes of bbox_rank_map.
+
+    Raises:
+        ValueError: bbox is not one of the sorted boxes
+    """
+    exact, rounded = rank_map
+    rank = exact.get(tuple(bbox))
+    if rank is None:
+        rank = rounded.get(_rounded_bbox_key(bbox))
+        if rank is None:
+            raise ValueError(f'{bbox} is not in the sorted bboxes')
+    return rank
+
+
+def _swap_virtual_lines(block):
+    # the inserted lines were only there for the reading order, the block
+    # gets its own lines back; both lists are owned by the block, no copy
+    block['virtual_lines'] = block['lines']
+    block['lines'] = block.pop('real_lines')
+
+
 def cal_block_index(fix_blocks, sorted_bboxes):
 
     if sorted_bboxes is not None:
 
+        rank_map = bbox_rank_map(sorted_bboxes)
         for block in fix_blocks:
             line_index_list = []
             if len(block['lines']) == 0:
-                block['index'] = sorted_bboxes.index(block['bbox'])
+                block['index'] = bbox_rank(rank_map, block['bbox'])
             else:
                 for line in block['lines']:
-                    line['index'] = sorted_bboxes.index(line['bbox'])
+                    line['index'] = bbox_rank(rank_map, line['bbox'])
                     line_index_list.append(line['index'])
                 median_value = statistics.median(line_index_list)
                 block['index'] = median_value
@@ -316,9 +364,7 @@ def cal_block_index(fix_blocks, sorted_bboxes):
 
             if block['type'] in [BlockType.ImageBody, BlockType.TableBody, BlockType.Title, BlockType.InterlineEquation]:
                 if 'real_lines' in block:
-                    block['virtual_lines'] = copy.deepcopy(block['lines'])
-                    block['lines'] = copy.deepcopy(block['real_lines'])
-                    del block['real_lines']
+                    _swap_virtual_lines(block)
     else:
 
         block_bboxes = []
@@ -329,9 +375,7 @@ def cal_block_index(fix_blocks, sorted_bboxes):
 
 
             if block['type'] in [BlockType.ImageBody, BlockType.TableBody]:
-                block['virtual_lines'] = copy.deepcopy(block['lines'])
-                block['lines'] = copy.deepcopy(block['real_lines'])
-                del block['real_lines']
+                _swap_virtual_lines(block)
 
         import numpy as np
 
@@ -345,8 +389,9 @@ def cal_block_index(fix_blocks, sorted_bboxes):
         assert len(res) == len(block_bboxes)
         sorted_boxes = random_boxes[np.array(res)].tolist()
 
-        for i, block in enumerate(fix_blocks):
-            block['index'] = sorted_boxes.index(block['bbox'])
+        rank_map = bbox_rank_map(sorted_boxes)
+        for block in fix_blocks:
+            block['index'] = bbox_rank(rank_map, block['bbox'])
 
 
         sorted_blocks = sorted(fix_blocks, key=lambda b: b['index'])
@@ -420,17 +465,19 @@ def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, MonkeyOCR_model
             if len(block['lines']) == 0:
                 add_lines_to_block(block)
             elif block['type'] in [BlockType.Title] and len(block['lines']) == 1 and (block['bbox'][3] - block['bbox'][1]) > line_height * 2:
-                block['real_lines'] = copy.deepcopy(block['lines'])
+                # add_lines_to_block gives the block a new list, the old one is kept as is
+                block['real_lines'] = block['lines']
                 add_lines_to_block(block)
             else:
                 for line in block['lines']:
                     bbox = line['bbox']
                     page_line_list.append(bbox)
         elif block['type'] in [BlockType.ImageBody, BlockType.TableBody, BlockType.InterlineEquation]:
-            block['real_lines'] = copy.deepcopy(block['lines'])
+            block['real_lines'] = block['lines']
             add_lines_to_block(block)
 
-    if len(page_line_list) > 200:
+    if len(page_line_list) > 200 or MonkeyOCR_model.layoutreader_model is None:
+        # xy-cut ordering in cal_block_index
         return None
 
 
@@ -469,8 +516,13 @@ def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, MonkeyOCR_model
         ), f'Invalid box. right: {right}, left: {left}, bottom: {bottom}, top: {top}'  # noqa: E126, E121
         boxes.append([left, top, right, bottom])
     model = MonkeyOCR_model.layoutreader_model
-    with torch.no_grad():
-        orders = do_predict(boxes, model)
+    if hasattr(model, 'predict_orders'):
+        # reader hosted by a separate model server
+        orders = model.predict_orders(boxes)
+    else:
+        import torch
+        with torch.no_grad():
+            orders = do_predict(boxes, model)
     sorted_bboxes = [page_line_list[i] for i in orders]
 
     return sorted_bboxes
@@ -593,7 +645,7 @@ def remove_outside_spans(spans, all_bboxes, all_discarded_blocks):
 
 
 def parse_page_core(
-    page_doc: PageableData, magic_model, page_id, pdf_bytes_md5, imageWriter, parse_mode, lang, MonkeyOCR_model
+    page_doc: PageableData, magic_model, page_id, image_extractor, parse_mode, lang, MonkeyOCR_model
 ):
     need_drop = False
     drop_reason = []
@@ -747,7 +799,7 @@ def parse_page_core(
         )
 
     spans = ocr_cut_image_and_table(
-        spans, page_doc, page_id, pdf_bytes_md5, imageWriter
+        spans, page_doc, page_id, image_extractor
     )
 
     block_with_spans, spans = fill_spans_in_blocks(all_bboxes, spans, 0.5)
@@ -801,12 +853,8 @@ def pdf_parse_union(
     lang=None,
 ):
 
-    pdf_bytes_md5 = compute_md5(dataset.data_bits())
-
     pdf_info_dict = {}
 
-    magic_model = MagicModel(model_list, dataset)
-
     # end_page_id = end_page_id if end_page_id else len(pdf_docs) - 1
     end_page_id = (
         end_page_id
@@ -818,34 +866,62 @@ def pdf_parse_union(
         logger.warning('end_page_id is out of range, use pdf_docs length')
         end_page_id = len(dataset) - 1
 
-    start_time = time.time()
+    page_ids = [page_id for page_id in range(len(dataset)) if start_page_id <= page_id <= end_page_id]
+    num_workers = post_process_workers(MonkeyOCR_model, len(page_ids))
+    modeled_pages = {page_dict['page_info']['page_no'] for page_dict in model_list}
+    parsed_pages = None
+    if num_workers and parallel_supported(dataset, imageWriter) and modeled_pages.issuperset(page_ids):
+        # the workers build their own MagicModel views of the raw model_list,
+        # None when the pool broke and the pages are parsed here after all
+        parsed_pages = parse_pages_in_pool(
+            model_list, dataset, page_ids, imageWriter, parse_mode, lang,
+            MonkeyOCR_model, num_workers
+        )
+    if parsed_pages is None:
+        magic_model = MagicModel(model_list, dataset)
 
-    for page_id, page in enumerate(dataset):
-        if debug_mode:
-            time_now = time.time()
-            logger.info(
-                f'page_id: {page_id}, last_page_cost_time: {round(time.time() - start_time, 2)}'
-            )
-            start_time = time_now
-
-        if start_page_id <= page_id <= end_page_id:
-            page_info = parse_page_core(
-                page, magic_model, page_id, pdf_bytes_md5, imageWriter, parse_mode, lang, MonkeyOCR_model
-            )
-        else:
-            page_info = page.get_page_info()
-            page_w = page_info.w
-            page_h = page_info.h
-            page_info = ocr_construct_page_component_v2(
-                [], [], page_id, page_w, page_h, [], [], [], [], [], True, 'skip page'
-            )
-        pdf_info_dict[f'page_{page_id}'] = page_info
+    # images of the document are encoded and written in the background, and only once per content
+    image_extractor = ImageExtractor.from_config(
+        imageWriter, image_extraction_config(MonkeyOCR_model)
+    ) if imageWriter and parsed_pages is None else None
 
-    para_split(pdf_info_dict)
+    start_time = time.time()
+
+    try:
+        for page_id, page in enumerate(dataset):
+            if debug_mode:
+                time_now = time.time()
+                logger.info(
+                    f'page_id: {page_id}, last_page_cost_time: {round(time.time() - start_time, 2)}'
+                )
+                start_time = time_now
+
+            if parsed_pages is not None and page_id in parsed_pages:
+                page_info = parsed_pages[page_id]
+            elif start_page_id <= page_id <= end_page_id:
+                page_info = parse_page_core(
+                    page, magic_model, page_id, image_extractor, parse_mode, lang, MonkeyOCR_model
+                )
+            else:
+                page_info = page.get_page_info()
+                page_w = page_info.w
+                page_h = page_info.h
+                page_info = ocr_construct_page_component_v2(
+                    [], [], page_id, page_w, page_h, [], [], [], [], [], True, 'skip page'
+                )
+            pdf_info_dict[f'page_{page_id}'] = page_info
+    finally:
+        if image_extractor is not None:
+            image_extractor.close()
+
+    config = post_process_config(MonkeyOCR_model)
+    para_blocks_mode = config.get('para_blocks', PARA_BLOCKS_SHARED)
+    para_split(pdf_info_dict, para_blocks_mode, config.get('merge_cross_page', False))
 
     pdf_info_list = dict_to_list(pdf_info_dict)
     new_pdf_info_dict = {
         'pdf_info': pdf_info_list,
+        '_para_blocks': para_blocks_mode,
     }
 
     clean_memory(MonkeyOCR_model.device)
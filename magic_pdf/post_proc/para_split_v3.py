@@ -28,6 +28,17 @@ class ListLineTag:
     IS_LIST_END_LINE = 'is_list_end_line'
 
 
+def __fill_bbox_fs(block):
+    block['bbox_fs'] = copy.deepcopy(block['bbox'])
+    if 'lines' in block and len(block['lines']) > 0:
+        block['bbox_fs'] = [
+            min([line['bbox'][0] for line in block['lines']]),
+            min([line['bbox'][1] for line in block['lines']]),
+            max([line['bbox'][2] for line in block['lines']]),
+            max([line['bbox'][3] for line in block['lines']]),
+        ]
+
+
 def __process_blocks(blocks):
     result = []
     current_group = []
@@ -37,14 +48,7 @@ def __process_blocks(blocks):
 
 
         if current_block['type'] == 'text':
-            current_block['bbox_fs'] = copy.deepcopy(current_block['bbox'])
-            if 'lines' in current_block and len(current_block['lines']) > 0:
-                current_block['bbox_fs'] = [
-                    min([line['bbox'][0] for line in current_block['lines']]),
-                    min([line['bbox'][1] for line in current_block['lines']]),
-                    max([line['bbox'][2] for line in current_block['lines']]),
-                    max([line['bbox'][3] for line in current_block['lines']]),
-                ]
+            __fill_bbox_fs(current_block)
             current_group.append(current_block)
 
 
@@ -357,21 +361,119 @@ def __para_merge_page(blocks):
             continue
 
 
-def para_split(pdf_info_dict):
-    all_blocks = []
+# how para_split fills para_blocks
+PARA_BLOCKS_COPY = 'copy'  # a deep copy of preproc_blocks, the legacy layout
+PARA_BLOCKS_SHARED = 'shared'  # the preproc_blocks dicts themselves
+PARA_BLOCKS_REF = 'ref'  # shared in memory, references in the middle json
+PARA_BLOCKS_MODES = (PARA_BLOCKS_COPY, PARA_BLOCKS_SHARED, PARA_BLOCKS_REF)
+
+PARA_BLOCK_REF = 'ref'
+
+
+def __merge_page_boundary(prev_page, page):
+    """Merge the first text block of a page into the last one of the
+    previous page, when it continues that paragraph.
+
+    The two blocks are copied before merging, the preproc_blocks they may be
+    shared with stay untouched.
+    """
+    if not prev_page['para_blocks'] or not page['para_blocks']:
+        return
+    prev_block = prev_page['para_blocks'][-1]
+    block = page['para_blocks'][0]
+    if prev_block['type'] != BlockType.Text or block['type'] != BlockType.Text:
+        return
+    if not prev_block.get('lines') or not block.get('lines'):
+        return
+
+    block, prev_block = copy.deepcopy(block), copy.deepcopy(prev_block)
+    __fill_bbox_fs(block)
+    __fill_bbox_fs(prev_block)
+    __merge_2_text_blocks(block, prev_block)
+    if block.get(LINES_DELETED):
+        page['para_blocks'][0] = block
+        prev_page['para_blocks'][-1] = prev_block
+
+
+def para_split(pdf_info_dict, para_blocks=PARA_BLOCKS_SHARED, merge_cross_page=False):
+    """Fill the para_blocks of every page, in one pass over the pages.
+
+    Args:
+        pdf_info_dict (dict): page key -> page dict with preproc_blocks
+        para_blocks (str, optional): 'copy' keeps an independent deep copy of
+            the blocks, 'shared' and 'ref' reuse the preproc_blocks dicts.
+            Defaults to 'shared'.
+        merge_cross_page (bool, optional): merge text paragraphs continued on
+            the next page, only the blocks at page boundaries are looked at.
+            Defaults to False.
+    """
+    if para_blocks not in PARA_BLOCKS_MODES:
+        raise ValueError(f'unknown para_blocks mode: {para_blocks}')
+
+    prev_page = None
     for page_num, page in pdf_info_dict.items():
-        blocks = copy.deepcopy(page['preproc_blocks'])
+        if para_blocks == PARA_BLOCKS_COPY:
+            blocks = copy.deepcopy(page['preproc_blocks'])
+        else:
+            blocks = list(page['preproc_blocks'])
         for block in blocks:
             block['page_num'] = page_num
             block['page_size'] = page['page_size']
-        all_blocks.extend(blocks)
-
-    # __para_merge_page(all_blocks)
-    for page_num, page in pdf_info_dict.items():
-        page['para_blocks'] = []
-        for block in all_blocks:
-            if block['page_num'] == page_num:
-                page['para_blocks'].append(block)
+        page['para_blocks'] = blocks
+
+        if merge_cross_page and prev_page is not None:
+            __merge_page_boundary(prev_page, page)
+        prev_page = page
+
+
+def para_blocks_to_refs(pdf_info: list) -> list:
+    """Middle json pages with the para_blocks that are shared with
+    preproc_blocks replaced by ``{'ref': index in preproc_blocks}``.
+
+    Blocks changed by the cross-page merge are kept in full. The pages are
+    shallow copies, the result is meant for serialization only.
+    """
+    pages = []
+    for page in pdf_info:
+        index_of = {id(block): index for index, block in enumerate(page.get('preproc_blocks', []))}
+        page = dict(page)
+        page['para_blocks'] = [
+            {PARA_BLOCK_REF: index_of[id(block)]} if id(block) in index_of else block
+            for block in page.get('para_blocks', [])
+        ]
+        pages.append(page)
+    return pages
+
+
+def resolve_para_block_refs(middle_json: dict) -> dict:
+    """Replace the ``{'ref': index}`` para_blocks of a middle json written in
+    'ref' mode by the preproc_blocks they point to, in place.
+
+    Middle json files written in the other modes are returned unchanged.
+
+    Args:
+        middle_json (dict): the loaded middle json
+
+    Returns:
+        dict: middle_json
+    """
+    if middle_json.get('_para_blocks') != PARA_BLOCKS_REF:
+        return middle_json
+    for page in middle_json['pdf_info']:
+        resolve_page_para_block_refs(page)
+    middle_json['_para_blocks'] = PARA_BLOCKS_SHARED
+    return middle_json
+
+
+def resolve_page_para_block_refs(page: dict) -> dict:
+    """:func:`resolve_para_block_refs` for a single page dict of a middle
+    json written in 'ref' mode, in place."""
+    preproc_blocks = page.get('preproc_blocks', [])
+    page['para_blocks'] = [
+        preproc_blocks[block[PARA_BLOCK_REF]] if PARA_BLOCK_REF in block and len(block) == 1 else block
+        for block in page.get('para_blocks', [])
+    ]
+    return page
 
 
 if __name__ == '__main__':
@@ -1,26 +1,16 @@
 from loguru import logger
 
 from magic_pdf.config.ocr_content_type import ContentType
-from magic_pdf.libs.commons import join_path
-from magic_pdf.libs.pdf_image_tools import cut_image
+from magic_pdf.libs.pdf_image_tools import ImageExtractor
 
 
-def ocr_cut_image_and_table(spans, page, page_id, pdf_bytes_md5, imageWriter):
-    def return_path(type):
-        return join_path(pdf_bytes_md5, type)
-
+def ocr_cut_image_and_table(spans, page, page_id, image_extractor: ImageExtractor):
     for span in spans:
         span_type = span['type']
-        if span_type == ContentType.Image:
-            if not check_img_bbox(span['bbox']) or not imageWriter:
-                continue
-            span['image_path'] = cut_image(span['bbox'], page_id, page, return_path=return_path('images'),
-                                           imageWriter=imageWriter)
-        elif span_type == ContentType.Table:
-            if not check_img_bbox(span['bbox']) or not imageWriter:
+        if span_type in (ContentType.Image, ContentType.Table):
+            if not check_img_bbox(span['bbox']) or not image_extractor:
                 continue
-            span['image_path'] = cut_image(span['bbox'], page_id, page, return_path=return_path('tables'),
-                                           imageWriter=imageWriter)
+            span['image_path'] = image_extractor.cut(span['bbox'], page)
 
     return spans
 
@@ -1,16 +1,27 @@
 #!/usr/bin/env python3
 # Copyright (c) Opendatalab. All rights reserved.
 import os
+import json
 import time
 import argparse
 import sys
-import torch.distributed as dist
-from pdf2image import convert_from_path
+import yaml
 
 from magic_pdf.data.data_reader_writer import FileBasedDataWriter, FileBasedDataReader
 from magic_pdf.data.dataset import PymuDocDataset, ImageDataset, MultiFileDataset
+from magic_pdf.data.read_api import iter_jsonl
+from magic_pdf.data.utils import iter_batches, iter_images_from_pdf
+from magic_pdf.data.grouping import PageCountIndex, plan_file_groups
+from magic_pdf.data.run_manifest import RunManifest, link_output
+from magic_pdf.data.stage_queue import StageQueue
 from magic_pdf.model.doc_analyze_by_custom_model_llm import doc_analyze_llm
-from magic_pdf.model.custom_model import MonkeyOCR
+from magic_pdf.model.custom_model import MonkeyOCR, COMPONENT_READER
+from magic_pdf.operators.models_llm import InferenceResultLLM, load_bundle_meta
+from magic_pdf.config.output_profile import OutputProfile, PROFILE_ARTIFACTS
+
+STAGE_ALL = 'all'
+STAGE_ANALYZE = 'analyze'
+STAGE_PIPE = 'pipe'
 
 TASK_INSTRUCTIONS = {
     'text': 'Please output the text content from the image.',
@@ -18,7 +29,19 @@ TASK_INSTRUCTIONS = {
     'table': 'This is the image of a table. Please output the table in html format.'
 }
 
-def parse_folder(folder_path, output_dir, config_path, task=None, split_pages=False, group_size=None):
+def file_output_dir(file_path, output_dir, base_folder_path=None):
+    """
+    Output directory of a file, keeping its folder relative to base_folder_path when given
+    """
+    file_name = '.'.join(os.path.basename(file_path).split(".")[:-1])
+    if base_folder_path:
+        rel_path = os.path.relpath(os.path.dirname(file_path), base_folder_path)
+        if rel_path != '.':
+            return os.path.join(output_dir, rel_path, file_name)
+    return os.path.join(output_dir, file_name)
+
+def parse_folder(folder_path, output_dir, config_path, task=None, split_pages=False, group_size=None,
+                 manifest_path=None, max_retries=3, profile=OutputProfile.STANDARD):
     """
     Parse all PDF and image files in a folder
     
@@ -28,6 +51,9 @@ def parse_folder(folder_path, output_dir, config_path, task=None, split_pages=Fa
         config_path: Configuration file path
         task: Optional task type for single task recognition
         group_size: Number of files to group together by total page count (None means process individually)
+        manifest_path: Optional run manifest; completed files are skipped on rerun, failed ones retried
+        max_retries: Attempts per file before it is given up when a manifest is used
+        profile: Output profile, the artifacts written per file (minimal/standard/debug)
     """
     print(f"Starting to parse folder: {folder_path}")
     
@@ -54,18 +80,44 @@ def parse_folder(folder_path, output_dir, config_path, task=None, split_pages=Fa
     
     all_files.sort()
     
+    # Resume from the run manifest: skip finished files, parse identical files only once
+    manifest = None
+    skipped_files = []
+    duplicate_files = {}
+    files_to_process = all_files
+    if manifest_path:
+        # every option that changes the outputs, files done with other options are parsed again
+        options = {
+            'task': task,
+            'split_pages': split_pages,
+            'profile': profile,
+            'group_size': group_size if group_size and group_size > 1 else None,
+        }
+        manifest = RunManifest(manifest_path, options, max_retries)
+        plan = manifest.plan(all_files)
+        files_to_process = plan.pending
+        skipped_files = plan.skipped
+        duplicate_files = plan.duplicates
+        print(f"Manifest {manifest_path}: {len(plan.pending)} to process, "
+              f"{len(plan.skipped)} skipped, {len(plan.duplicates)} duplicates")
+    
     # Initialize model once for all files
-    print("Loading model...")
-    MonkeyOCR_model = MonkeyOCR(config_path)
+    MonkeyOCR_model = None
+    if files_to_process:
+        print("Loading model...")
+        # single task recognition only needs the VLM
+        MonkeyOCR_model = MonkeyOCR(config_path, components=['chat'] if task else None)
     
     successful_files = []
     failed_files = []
     
     if group_size and group_size > 1:
         # Group files by total page count
-        print(f"Found {len(all_files)} files to process in groups with max {group_size} total pages")
+        print(f"Found {len(files_to_process)} files to process in groups with max {group_size} total pages")
         
-        file_groups = create_file_groups_by_page_count(all_files, group_size)
+        file_groups = create_file_groups_by_page_count(
+            files_to_process, group_size, os.path.join(output_dir, '.page_count_index.json')
+        ) if files_to_process else []
         print(f"Created {len(file_groups)} file groups")
         
         for i, file_group in enumerate(file_groups, 1):
@@ -75,42 +127,70 @@ def parse_folder(folder_path, output_dir, config_path, task=None, split_pages=Fa
                 print(f"  - {os.path.basename(file_path)}")
             print(f"{'='*60}")
             
+            if manifest:
+                for path in file_group:
+                    manifest.mark_running(path)
             try:
                 if task:
                     result_dir = single_task_recognition_multi_file_group(file_group, output_dir, MonkeyOCR_model, task, folder_path)
                 else:
-                    result_dir = parse_multi_file_group(file_group, output_dir, MonkeyOCR_model, folder_path, split_pages)
+                    result_dir = parse_multi_file_group(file_group, output_dir, MonkeyOCR_model, folder_path, split_pages, profile)
                 
                 successful_files.extend(file_group)
+                if manifest:
+                    for path in file_group:
+                        manifest.mark_done(path, file_output_dir(path, output_dir, folder_path))
                 print(f"✅ Successfully processed file group {i}")
                 
             except Exception as e:
                 failed_files.extend([(path, str(e)) for path in file_group])
+                if manifest:
+                    for path in file_group:
+                        manifest.mark_failed(path, str(e))
                 print(f"❌ Failed to process file group {i}: {str(e)}")
     else:
         # Process files individually
-        print(f"Found {len(all_files)} files to process individually:")
-        for file_path in all_files:
+        print(f"Found {len(files_to_process)} files to process individually:")
+        for file_path in files_to_process:
             print(f"  - {file_path}")
         
-        for i, file_path in enumerate(all_files, 1):
+        for i, file_path in enumerate(files_to_process, 1):
             print(f"\n{'='*60}")
-            print(f"Processing file {i}/{len(all_files)}: {os.path.basename(file_path)}")
+            print(f"Processing file {i}/{len(files_to_process)}: {os.path.basename(file_path)}")
             print(f"{'='*60}")
             
+            if manifest:
+                manifest.mark_running(file_path)
             try:
                 if task:
                     result_dir = single_task_recognition(file_path, output_dir, MonkeyOCR_model, task)
                 else:
-                    result_dir = parse_file(file_path, output_dir, MonkeyOCR_model)
+                    result_dir = parse_file(file_path, output_dir, MonkeyOCR_model, profile=profile)
                 
                 successful_files.append(file_path)
+                if manifest:
+                    manifest.mark_done(file_path, result_dir)
                 print(f"✅ Successfully processed: {os.path.basename(file_path)}")
                 
             except Exception as e:
                 failed_files.append((file_path, str(e)))
+                if manifest:
+                    manifest.mark_failed(file_path, str(e))
                 print(f"❌ Failed to process {os.path.basename(file_path)}: {str(e)}")
     
+    # Duplicates reuse the result of the identical file parsed first
+    for file_path, canonical_path in duplicate_files.items():
+        canonical_output = manifest.mark_linked(file_path, canonical_path)
+        if canonical_output:
+            base_folder = folder_path if group_size and group_size > 1 else None
+            link_output(canonical_output, file_output_dir(file_path, output_dir, base_folder))
+            successful_files.append(file_path)
+            print(f"🔗 Linked duplicate {os.path.basename(file_path)} -> {os.path.basename(canonical_path)}")
+        else:
+            failed_files.append((file_path, f"identical to {canonical_path}, which was not processed"))
+    if manifest:
+        manifest.close()
+    
     if not all_files:
         print("No supported files found in the folder.")
         return
@@ -126,6 +206,8 @@ def parse_folder(folder_path, output_dir, config_path, task=None, split_pages=Fa
     print(f"Total files: {total_files}")
     print(f"Successful: {len(successful_files)}")
     print(f"Failed: {len(failed_files)}")
+    if manifest_path:
+        print(f"Skipped (manifest): {len(skipped_files)}")
     print(f"Total processing time: {total_processing_time:.2f}s")
     
     if failed_files:
@@ -135,63 +217,22 @@ def parse_folder(folder_path, output_dir, config_path, task=None, split_pages=Fa
     
     return output_dir
 
-def create_file_groups_by_page_count(file_paths, max_pages_per_group):
+def create_file_groups_by_page_count(file_paths, max_pages_per_group, index_path=None):
     """
-    Create file groups based on total page count limit
+    Create file groups based on total page count limit, bin-packed first-fit-decreasing
     
     Args:
         file_paths: List of file paths
         max_pages_per_group: Maximum total pages per group
+        index_path: Optional page count cache file, reused across runs
         
     Returns:
         List of file groups
     """
-    import fitz
-    
-    groups = []
-    current_group = []
-    current_page_count = 0
-    
-    for file_path in file_paths:
-        try:
-            # Get page count for this file
-            file_ext = os.path.splitext(file_path)[1].lower()
-            if file_ext == '.pdf':
-                with fitz.open(file_path) as doc:
-                    file_page_count = len(doc)
-            else:
-                # Images have 1 page
-                file_page_count = 1
-            
-            # Check if adding this file would exceed the limit
-            if current_page_count + file_page_count > max_pages_per_group and current_group:
-                # Start a new group
-                groups.append(current_group)
-                current_group = [file_path]
-                current_page_count = file_page_count
-            else:
-                # Add to current group
-                current_group.append(file_path)
-                current_page_count += file_page_count
-                
-        except Exception as e:
-            print(f"Warning: Could not determine page count for {file_path}: {e}")
-            # Treat as 1 page if we can't determine
-            if current_page_count + 1 > max_pages_per_group and current_group:
-                groups.append(current_group)
-                current_group = [file_path]
-                current_page_count = 1
-            else:
-                current_group.append(file_path)
-                current_page_count += 1
-    
-    # Add the last group if not empty
-    if current_group:
-        groups.append(current_group)
-    
-    return groups
+    return plan_file_groups(file_paths, max_pages_per_group, PageCountIndex(index_path))
 
-def parse_multi_file_group(file_paths, output_dir, MonkeyOCR_model, base_folder_path, split_pages=False):
+def parse_multi_file_group(file_paths, output_dir, MonkeyOCR_model, base_folder_path, split_pages=False,
+                           profile=OutputProfile.STANDARD):
     """
     Parse a group of mixed PDF and image files using MultiFileDataset
     
@@ -201,6 +242,7 @@ def parse_multi_file_group(file_paths, output_dir, MonkeyOCR_model, base_folder_
         MonkeyOCR_model: Pre-initialized model instance
         base_folder_path: Base folder path for maintaining relative structure
         split_pages: Whether to further split each file's results by pages
+        profile: Output profile, the artifacts written per file (minimal/standard/debug)
     """
     print(f"Starting to parse multi-file group with {len(file_paths)} files")
     
@@ -276,12 +318,9 @@ def parse_multi_file_group(file_paths, output_dir, MonkeyOCR_model, base_folder_
                 page_pipe_result = page_infer_result.pipe_ocr_mode(page_image_writer, MonkeyOCR_model=MonkeyOCR_model)
                 
                 # Save page-specific results
-                page_infer_result.draw_model(os.path.join(page_local_md_dir, f"{file_name}_page_{page_idx}_model.pdf"))
-                page_pipe_result.draw_layout(os.path.join(page_local_md_dir, f"{file_name}_page_{page_idx}_layout.pdf"))
-                page_pipe_result.draw_span(os.path.join(page_local_md_dir, f"{file_name}_page_{page_idx}_spans.pdf"))
-                page_pipe_result.dump_md(page_md_writer, f"{file_name}_page_{page_idx}.md", page_image_dir)
-                page_pipe_result.dump_content_list(page_md_writer, f"{file_name}_page_{page_idx}_content_list.json", page_image_dir)
-                page_pipe_result.dump_middle_json(page_md_writer, f'{file_name}_page_{page_idx}_middle.json')
+                page_pipe_result.dump_profile(
+                    page_md_writer, f"{file_name}_page_{page_idx}", page_image_dir, profile, page_infer_result
+                )
         else:
             # Create file-specific writers
             file_image_writer = FileBasedDataWriter(file_local_image_dir)
@@ -291,18 +330,49 @@ def parse_multi_file_group(file_paths, output_dir, MonkeyOCR_model, base_folder_
             file_pipe_result = file_infer_result.pipe_ocr_mode(file_image_writer, MonkeyOCR_model=MonkeyOCR_model)
             
             # Save file-specific results using original file name
-            file_infer_result.draw_model(os.path.join(file_local_md_dir, f"{file_name}_model.pdf"))
-            file_pipe_result.draw_layout(os.path.join(file_local_md_dir, f"{file_name}_layout.pdf"))
-            file_pipe_result.draw_span(os.path.join(file_local_md_dir, f"{file_name}_spans.pdf"))
-            file_pipe_result.dump_md(file_md_writer, f"{file_name}.md", image_dir)
-            file_pipe_result.dump_content_list(file_md_writer, f"{file_name}_content_list.json", image_dir)
-            file_pipe_result.dump_middle_json(file_md_writer, f'{file_name}_middle.json')
+            file_pipe_result.dump_profile(file_md_writer, file_name, image_dir, profile, file_infer_result)
     
     print(f"All {len(infer_result)} files processed and saved in separate directories")
     
     # Return the base directory containing all individual file results
     return output_dir
 
+def iter_task_images(file_path):
+    """
+    Yield the pages of a PDF rendered one at a time, or the single image of an image file
+    """
+    file_extension = file_path.split(".")[-1].lower()
+    if file_extension == 'pdf':
+        yield from iter_images_from_pdf(file_path, dpi=150)
+    elif file_extension in ['jpg', 'jpeg', 'png']:
+        from PIL import Image
+        yield Image.open(file_path)
+    else:
+        raise ValueError(f"Single task recognition supports PDF and image files, got: {file_extension}")
+
+def recognize_images(MonkeyOCR_model, images, instruction):
+    """
+    Run the chat model over an image stream in chunks of chat_config.page_chunk_size,
+    so only one chunk of rendered pages is held in memory at a time
+    
+    Args:
+        MonkeyOCR_model: Pre-initialized model instance
+        images: Iterable of PIL images
+        instruction: Prompt used for every image
+    
+    Returns:
+        List of responses, one per image
+    """
+    chunk_size = getattr(MonkeyOCR_model, 'chat_config', {}).get('page_chunk_size', 16)
+    responses = []
+    for chunk in iter_batches(images, chunk_size):
+        try:
+            responses.extend(MonkeyOCR_model.chat_model.batch_inference(chunk, [instruction] * len(chunk)))
+        finally:
+            for img in chunk:
+                img.close()
+    return responses
+
 def single_task_recognition_multi_file_group(file_paths, output_dir, MonkeyOCR_model, task, base_folder_path):
     """
     Single task recognition for a group of mixed PDF and image files
@@ -335,45 +405,23 @@ def single_task_recognition_multi_file_group(file_paths, output_dir, MonkeyOCR_m
         print(f"Processing file {file_idx + 1}/{len(file_paths)}: {file_name} - Output dir: {local_md_dir}")
         md_writer = FileBasedDataWriter(local_md_dir)
         
-        # Load images for this file
         file_extension = file_path.split(".")[-1].lower()
-        images = []
-        
-        if file_extension == 'pdf':
-            try:
-                # Convert PDF pages to PIL images directly
-                print(f"Converting PDF pages to images for {file_name}...")
-                images = convert_from_path(file_path, dpi=150)
-                print(f"Converted {len(images)} pages to images")
-            except Exception as e:
-                raise RuntimeError(f"Failed to convert PDF to images: {str(e)}")
-        elif file_extension in ['jpg', 'jpeg', 'png']:
-            # Load single image
-            from PIL import Image
-            images = [Image.open(file_path)]
-        else:
+        if file_extension not in ['pdf', 'jpg', 'jpeg', 'png']:
             print(f"Skipping unsupported file: {file_path}")
             continue
         
-        # Start recognition for this file
-        print(f"Performing {task} recognition on {len(images)} image(s) from {file_name}...")
+        # Start recognition for this file, pages are rendered as they are consumed
+        print(f"Performing {task} recognition on {file_name}...")
         start_time = time.time()
         
         try:
-            # Prepare instructions for all images
-            instructions = [instruction] * len(images)
-            
-            # Use chat model for single task recognition with PIL images directly
-            responses = MonkeyOCR_model.chat_model.batch_inference(images, instructions)
+            responses = recognize_images(MonkeyOCR_model, iter_task_images(file_path), instruction)
             
             recognition_time = time.time() - start_time
-            print(f"Recognition time for {file_name}: {recognition_time:.2f}s")
+            print(f"Recognition time for {file_name}: {recognition_time:.2f}s ({len(responses)} image(s))")
             
             # Combine results
-            combined_result = responses[0]
-            for i, response in enumerate(responses):
-                if i > 0:
-                    combined_result = combined_result + "\n\n" + response
+            combined_result = "\n\n".join(responses)
             
             # Save result
             result_filename = f"{file_name}_{task}_result.md"
@@ -381,14 +429,6 @@ def single_task_recognition_multi_file_group(file_paths, output_dir, MonkeyOCR_m
             
             print(f"File {file_name} {task} recognition completed!")
             print(f"Result saved to: {os.path.join(local_md_dir, result_filename)}")
-            
-            # Clean up resources for this file
-            try:
-                for img in images:
-                    if hasattr(img, 'close'):
-                        img.close()
-            except Exception as cleanup_error:
-                print(f"Warning: Error during cleanup for {file_name}: {cleanup_error}")
                 
         except Exception as e:
             raise RuntimeError(f"Single task recognition failed for {file_name}: {str(e)}")
@@ -425,51 +465,27 @@ def single_task_recognition(input_file, output_dir, MonkeyOCR_model, task):
     # Get task instruction
     instruction = TASK_INSTRUCTIONS.get(task, TASK_INSTRUCTIONS['text'])
     
-    # Check file type and prepare images
     file_extension = input_file.split(".")[-1].lower()
-    images = []
-    
     if file_extension == 'pdf':
         print("⚠️  WARNING: PDF input detected for single task recognition.")
-        print("⚠️  WARNING: Converting all PDF pages to images for processing.")
+        print("⚠️  WARNING: All PDF pages are rendered and recognized in chunks.")
         print("⚠️  WARNING: This may take longer and use more resources than image input.")
         print("⚠️  WARNING: Consider using individual images for better performance.")
-        
-        try:
-            # Convert PDF pages to PIL images directly
-            print("Converting PDF pages to images...")
-            images = convert_from_path(input_file, dpi=150)
-            print(f"Converted {len(images)} pages to images")
-            
-        except Exception as e:
-            raise RuntimeError(f"Failed to convert PDF to images: {str(e)}")
-            
-    elif file_extension in ['jpg', 'jpeg', 'png']:
-        # Load single image
-        from PIL import Image
-        images = [Image.open(input_file)]
-    else:
+    elif file_extension not in ['jpg', 'jpeg', 'png']:
         raise ValueError(f"Single task recognition supports PDF and image files, got: {file_extension}")
     
-    # Start recognition
-    print(f"Performing {task} recognition on {len(images)} image(s)...")
+    # Start recognition, pages are rendered as they are consumed
+    print(f"Performing {task} recognition...")
     start_time = time.time()
     
     try:
-        # Prepare instructions for all images
-        instructions = [instruction] * len(images)
-        
-        # Use chat model for single task recognition with PIL images directly
-        responses = MonkeyOCR_model.chat_model.batch_inference(images, instructions)
+        responses = recognize_images(MonkeyOCR_model, iter_task_images(input_file), instruction)
         
         recognition_time = time.time() - start_time
         print(f"Recognition time: {recognition_time:.2f}s")
         
         # Combine results
-        combined_result = responses[0]
-        for i, response in enumerate(responses):
-            if i > 0:
-                combined_result = combined_result + "\n\n" + response
+        combined_result = "\n\n".join(responses)
         
         # Save result
         result_filename = f"{name_without_suff}_{task}_result.md"
@@ -477,28 +493,18 @@ def single_task_recognition(input_file, output_dir, MonkeyOCR_model, task):
         
         print(f"Single task recognition completed!")
         print(f"Task: {task}")
-        print(f"Processed {len(images)} image(s)")
+        print(f"Processed {len(responses)} image(s)")
         print(f"Result saved to: {os.path.join(local_md_dir, result_filename)}")
         
-        # Clean up resources
-        try:
-            # Give some time for async tasks to complete
-            time.sleep(0.5)
-            
-            # Close images if they were opened
-            for img in images:
-                if hasattr(img, 'close'):
-                    img.close()
-                    
-        except Exception as cleanup_error:
-            print(f"Warning: Error during cleanup: {cleanup_error}")
+        # Give some time for async tasks to complete
+        time.sleep(0.5)
         
         return local_md_dir
         
     except Exception as e:
         raise RuntimeError(f"Single task recognition failed: {str(e)}")
 
-def parse_file(input_file, output_dir, MonkeyOCR_model, split_pages=False):
+def parse_file(input_file, output_dir, MonkeyOCR_model, split_pages=False, profile=OutputProfile.STANDARD):
     """
     Parse PDF or image and save results
     
@@ -507,6 +513,7 @@ def parse_file(input_file, output_dir, MonkeyOCR_model, split_pages=False):
         output_dir: Output directory
         MonkeyOCR_model: Pre-initialized model instance
         split_pages: Whether to split result by pages
+        profile: Output profile, the artifacts written (minimal/standard/debug)
     """
     print(f"Starting to parse file: {input_file}")
     
@@ -517,17 +524,6 @@ def parse_file(input_file, output_dir, MonkeyOCR_model, split_pages=False):
     # Get filename
     name_without_suff = '.'.join(os.path.basename(input_file).split(".")[:-1])
     
-    # Prepare output directory
-    local_image_dir = os.path.join(output_dir, name_without_suff, "images")
-    local_md_dir = os.path.join(output_dir, name_without_suff)
-    image_dir = os.path.basename(local_image_dir)
-    os.makedirs(local_image_dir, exist_ok=True)
-    os.makedirs(local_md_dir, exist_ok=True)
-    
-    print(f"Output dir: {local_md_dir}")
-    image_writer = FileBasedDataWriter(local_image_dir)
-    md_writer = FileBasedDataWriter(local_md_dir)
-    
     # Read file content
     reader = FileBasedDataReader()
     file_bytes = reader.read(input_file)
@@ -539,6 +535,32 @@ def parse_file(input_file, output_dir, MonkeyOCR_model, split_pages=False):
     else:
         ds = ImageDataset(file_bytes)
     
+    return parse_dataset(ds, name_without_suff, output_dir, MonkeyOCR_model, split_pages, profile)
+
+def parse_dataset(ds, name_without_suff, output_dir, MonkeyOCR_model, split_pages=False,
+                  profile=OutputProfile.STANDARD):
+    """
+    Parse an already loaded dataset and save results under output_dir/name_without_suff
+    
+    Args:
+        ds: PymuDocDataset or ImageDataset
+        name_without_suff: Name used for the result directory and files
+        output_dir: Output directory
+        MonkeyOCR_model: Pre-initialized model instance
+        split_pages: Whether to split result by pages
+        profile: Output profile, the artifacts written (minimal/standard/debug)
+    """
+    # Prepare output directory
+    local_image_dir = os.path.join(output_dir, name_without_suff, "images")
+    local_md_dir = os.path.join(output_dir, name_without_suff)
+    image_dir = os.path.basename(local_image_dir)
+    os.makedirs(local_image_dir, exist_ok=True)
+    os.makedirs(local_md_dir, exist_ok=True)
+    
+    print(f"Output dir: {local_md_dir}")
+    image_writer = FileBasedDataWriter(local_image_dir)
+    md_writer = FileBasedDataWriter(local_md_dir)
+    
     # Start inference
     print("Performing document parsing...")
     start_time = time.time()
@@ -573,12 +595,9 @@ def parse_file(input_file, output_dir, MonkeyOCR_model, split_pages=False):
             page_pipe_result = page_infer_result.pipe_ocr_mode(page_image_writer, MonkeyOCR_model=MonkeyOCR_model)
             
             # Save page-specific results
-            page_infer_result.draw_model(os.path.join(page_local_md_dir, f"{name_without_suff}_page_{page_idx}_model.pdf"))
-            page_pipe_result.draw_layout(os.path.join(page_local_md_dir, f"{name_without_suff}_page_{page_idx}_layout.pdf"))
-            page_pipe_result.draw_span(os.path.join(page_local_md_dir, f"{name_without_suff}_page_{page_idx}_spans.pdf"))
-            page_pipe_result.dump_md(page_md_writer, f"{name_without_suff}_page_{page_idx}.md", page_image_dir)
-            page_pipe_result.dump_content_list(page_md_writer, f"{name_without_suff}_page_{page_idx}_content_list.json", page_image_dir)
-            page_pipe_result.dump_middle_json(page_md_writer, f'{name_without_suff}_page_{page_idx}_middle.json')
+            page_pipe_result.dump_profile(
+                page_md_writer, f"{name_without_suff}_page_{page_idx}", page_image_dir, profile, page_infer_result
+            )
         
         print(f"All {len(infer_result)} pages processed and saved in separate subdirectories")
     else:
@@ -587,21 +606,291 @@ def parse_file(input_file, output_dir, MonkeyOCR_model, split_pages=False):
         # Pipeline processing for single result
         pipe_result = infer_result.pipe_ocr_mode(image_writer, MonkeyOCR_model=MonkeyOCR_model)
         
-        # Save single result (original logic)
-        infer_result.draw_model(os.path.join(local_md_dir, f"{name_without_suff}_model.pdf"))
-        
-        pipe_result.draw_layout(os.path.join(local_md_dir, f"{name_without_suff}_layout.pdf"))
+        # Save single result
+        pipe_result.dump_profile(md_writer, name_without_suff, image_dir, profile, infer_result)
+    
+    print("Results saved to ", local_md_dir)
+    return local_md_dir
 
-        pipe_result.draw_span(os.path.join(local_md_dir, f"{name_without_suff}_spans.pdf"))
+def first_s3_bucket(jsonl_path):
+    """
+    Bucket of the first s3:// document listed in a local jsonl manifest, None when there is none
+    """
+    from magic_pdf.libs.commons import parse_bucket_key
 
-        pipe_result.dump_md(md_writer, f"{name_without_suff}.md", image_dir)
-        
-        pipe_result.dump_content_list(md_writer, f"{name_without_suff}_content_list.json", image_dir)
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            doc_path = record.get('file_location', '') or record.get('path', '')
+            if isinstance(doc_path, str) and doc_path.startswith('s3://'):
+                return parse_bucket_key(doc_path)[0]
+    return None
 
-        pipe_result.dump_middle_json(md_writer, f'{name_without_suff}_middle.json')
+def build_s3_reader(config_path, jsonl_path):
+    """
+    Build a multi-bucket S3 reader from the bucket_info section of the config
     
-    print("Results saved to ", local_md_dir)
-    return local_md_dir
+    Local manifests may list s3:// documents too, so the reader is built whenever bucket_info is configured.
+    Returns None when it is not and the manifest is local.
+    """
+    from magic_pdf.data.data_reader_writer import MultiBucketS3DataReader
+    from magic_pdf.data.schemas import S3Config
+    from magic_pdf.libs.commons import parse_bucket_key
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        bucket_info = (yaml.safe_load(f) or {}).get('bucket_info') or {}
+    if not bucket_info:
+        if jsonl_path.startswith('s3://'):
+            raise ValueError(f"bucket_info is required in {config_path} to read {jsonl_path}")
+        return None
+
+    if jsonl_path.startswith('s3://'):
+        default_bucket, _ = parse_bucket_key(jsonl_path)
+    else:
+        # the [default] credentials are used for the bucket of the first s3:// document
+        named_buckets = [name for name in bucket_info if name != '[default]']
+        default_bucket = first_s3_bucket(jsonl_path) if '[default]' in bucket_info else None
+        default_bucket = default_bucket or (named_buckets[0] if named_buckets else None)
+        if default_bucket is None:
+            return None
+    configs = {}
+    for bucket_name, (access_key, secret_key, endpoint_url) in bucket_info.items():
+        configs[bucket_name] = S3Config(
+            bucket_name=default_bucket if bucket_name == '[default]' else bucket_name,
+            access_key=access_key,
+            secret_key=secret_key,
+            endpoint_url=endpoint_url,
+        )
+    if default_bucket in configs:
+        configs.pop('[default]', None)
+    return MultiBucketS3DataReader(default_bucket, list(configs.values()))
+
+def parse_jsonl(jsonl_path, output_dir, config_path, split_pages=False, prefetch=4,
+                profile=OutputProfile.STANDARD):
+    """
+    Parse every document referenced by a jsonl manifest, streaming the manifest line by line
+    
+    The next `prefetch` documents are read concurrently while the current one is parsed,
+    and one result row per line is appended to <output_dir>/results.jsonl as soon as it is done.
+    
+    Args:
+        jsonl_path: Local or s3 path of the jsonl manifest, each line has a `path` or `file_location`
+        output_dir: Output directory
+        config_path: Configuration file path
+        split_pages: Whether to split result by pages
+        prefetch: Number of documents read ahead of the parser
+        profile: Output profile, the artifacts written per document (minimal/standard/debug)
+    """
+    print(f"Starting to parse jsonl manifest: {jsonl_path}")
+    os.makedirs(output_dir, exist_ok=True)
+    s3_client = build_s3_reader(config_path, jsonl_path)
+    
+    print("Loading model...")
+    MonkeyOCR_model = MonkeyOCR(config_path)
+    
+    results_path = os.path.join(output_dir, 'results.jsonl')
+    success_count = 0
+    failed_count = 0
+    total_start_time = time.time()
+    
+    with open(results_path, 'a', encoding='utf-8') as results:
+        for item in iter_jsonl(jsonl_path, s3_client, prefetch=prefetch):
+            start_time = time.time()
+            row = dict(item.record, line_no=item.line_no)
+            try:
+                if item.error is not None:
+                    raise item.error
+                doc_path = item.record.get('file_location', '') or item.record.get('path', '')
+                name = '.'.join(os.path.basename(doc_path).split(".")[:-1]) or 'document'
+                result_dir = parse_dataset(
+                    item.dataset, f"{item.line_no:06d}_{name}", output_dir, MonkeyOCR_model, split_pages, profile
+                )
+                row.update(status='done', output=result_dir, error=None)
+                success_count += 1
+            except Exception as e:
+                print(f"❌ Line {item.line_no} failed: {str(e)}")
+                row.update(status='failed', output=None, error=f"{type(e).__name__}: {e}")
+                failed_count += 1
+            row['duration'] = round(time.time() - start_time, 3)
+            results.write(json.dumps(row, ensure_ascii=False) + '\n')
+            results.flush()
+    
+    total_time = time.time() - total_start_time
+    print(f"\n{'='*60}")
+    print("JSONL PROCESSING COMPLETE")
+    print(f"{'='*60}")
+    print(f"✅ Successful: {success_count}")
+    print(f"❌ Failed: {failed_count}")
+    print(f"Total time: {total_time:.2f}s")
+    print(f"Results: {results_path}")
+    return output_dir
+
+def iter_stage_inputs(input_path, config_path, prefetch=4):
+    """
+    Documents of a file, folder or .jsonl manifest for the analyze stage
+    
+    Yields:
+        (dataset, bundle name, output name relative to the output dir, local source path or None)
+    """
+    if input_path.endswith('.jsonl'):
+        s3_client = build_s3_reader(config_path, input_path)
+        for item in iter_jsonl(input_path, s3_client, prefetch=prefetch):
+            try:
+                if item.error is not None:
+                    raise item.error
+                doc_path = item.record.get('file_location', '') or item.record.get('path', '')
+            except Exception as e:
+                print(f"❌ Line {item.line_no} failed: {str(e)}")
+                continue
+            name = f"{item.line_no:06d}_{'.'.join(os.path.basename(doc_path).split('.')[:-1]) or 'document'}"
+            yield item.dataset, name, name, None
+        return
+    
+    if os.path.isdir(input_path):
+        supported_extensions = {'.pdf', '.jpg', '.jpeg', '.png'}
+        file_paths = sorted(
+            os.path.join(root, file)
+            for root, dirs, files in os.walk(input_path)
+            for file in files
+            if os.path.splitext(file)[1].lower() in supported_extensions
+        )
+        base_folder_path = input_path
+    elif os.path.isfile(input_path):
+        file_paths = [input_path]
+        base_folder_path = None
+    else:
+        raise FileNotFoundError(f"Input path does not exist: {input_path}")
+    
+    reader = FileBasedDataReader()
+    for file_path in file_paths:
+        file_bytes = reader.read(file_path)
+        ds = PymuDocDataset(file_bytes) if file_path.lower().endswith('.pdf') else ImageDataset(file_bytes)
+        output_name = file_output_dir(file_path, '', base_folder_path)
+        yield ds, output_name.replace(os.sep, '__'), output_name, os.path.abspath(file_path)
+
+def analyze_to_queue(input_path, queue_dir, config_path, split_pages=False, reference_source=False, prefetch=4):
+    """
+    Analyze stage only: run the models on every document and save the inference results to a shared queue
+    
+    Pipe nodes pick the results up with pipe_from_queue, so the GPU nodes do no post-processing or output writing.
+    
+    Args:
+        input_path: Input PDF/image file path, folder path or .jsonl manifest
+        queue_dir: Shared queue directory
+        config_path: Configuration file path
+        split_pages: Whether to split result by pages
+        reference_source: Reference local source files by path instead of copying them into the queue,
+            the pipe nodes must see them under the same path
+        prefetch: Documents read ahead when parsing a .jsonl manifest
+    """
+    print(f"Analyze stage: {input_path} -> {queue_dir}")
+    queue = StageQueue(queue_dir)
+    print("Loading model...")
+    MonkeyOCR_model = MonkeyOCR(config_path)
+    
+    queued_count = 0
+    failed_count = 0
+    total_start_time = time.time()
+    for ds, bundle_name, output_name, source_path in iter_stage_inputs(input_path, config_path, prefetch):
+        try:
+            start_time = time.time()
+            infer_result = ds.apply(doc_analyze_llm, MonkeyOCR_model=MonkeyOCR_model, split_pages=split_pages)
+            name_without_suff = os.path.basename(output_name)
+            if isinstance(infer_result, list):
+                # a page of a split result has a dataset of its own, rendered from the page
+                bundles = [
+                    (page_infer_result, f"{bundle_name}_page_{page_idx}", None,
+                     {'name': f"{name_without_suff}_page_{page_idx}",
+                      'output_dir': os.path.join(output_name, f"page_{page_idx}")})
+                    for page_idx, page_infer_result in enumerate(infer_result)
+                ]
+            else:
+                bundles = [
+                    (infer_result, bundle_name, source_path if reference_source else None,
+                     {'name': name_without_suff, 'output_dir': output_name})
+                ]
+            for bundle_infer_result, name, bundle_source, meta in bundles:
+                with queue.publish(name) as bundle_dir:
+                    bundle_infer_result.save(FileBasedDataWriter(bundle_dir), '', bundle_source, meta)
+            queued_count += 1
+            print(f"✅ Queued {output_name} ({len(bundles)} bundle(s), {time.time() - start_time:.2f}s)")
+        except Exception as e:
+            failed_count += 1
+            print(f"❌ Failed to analyze {output_name}: {str(e)}")
+    
+    print(f"\nAnalyze stage complete: {queued_count} queued, {failed_count} failed, "
+          f"{time.time() - total_start_time:.2f}s")
+    return queue_dir
+
+def pipe_from_queue(queue_dir, output_dir, config_path, profile=OutputProfile.STANDARD, watch=False,
+                    poll_interval=5.0, keep_done=False, stale_after=None):
+    """
+    Pipe stage only: post-process the inference results saved by analyze_to_queue and write the outputs
+    
+    Only the layout reader is loaded, any number of pipe nodes can share one queue.
+    
+    Args:
+        queue_dir: Shared queue directory
+        output_dir: Output directory
+        config_path: Configuration file path, usually with device: cpu on pipe nodes
+        profile: Output profile, the artifacts written per document (minimal/standard/debug)
+        watch: Keep polling for new results instead of returning once the queue is empty
+        poll_interval: Seconds between polls when watching
+        keep_done: Keep piped results in the done folder of the queue instead of removing them
+        stale_after: Put results claimed longer ago than this many seconds back to ready (dead nodes),
+            has to exceed the longest pipe time of a document or it is piped twice
+    """
+    print(f"Pipe stage: {queue_dir} -> {output_dir}")
+    queue = StageQueue(queue_dir)
+    print("Loading model...")
+    MonkeyOCR_model = MonkeyOCR(config_path, components=[COMPONENT_READER])
+    reader = FileBasedDataReader()
+    
+    success_count = 0
+    failed_count = 0
+    while True:
+        if stale_after:
+            queue.requeue_stale(stale_after)
+        claimed = queue.claim()
+        if claimed is None:
+            if not watch:
+                break
+            time.sleep(poll_interval)
+            continue
+        
+        name = queue.bundle_name(claimed)
+        try:
+            start_time = time.time()
+            meta = load_bundle_meta(reader, claimed)['meta']
+            infer_result = InferenceResultLLM.load(reader, claimed)
+            
+            local_md_dir = os.path.join(output_dir, meta['output_dir'])
+            local_image_dir = os.path.join(local_md_dir, "images")
+            os.makedirs(local_image_dir, exist_ok=True)
+            
+            pipe_result = infer_result.pipe_ocr_mode(FileBasedDataWriter(local_image_dir), MonkeyOCR_model=MonkeyOCR_model)
+            pipe_result.dump_profile(
+                FileBasedDataWriter(local_md_dir), meta['name'], os.path.basename(local_image_dir), profile, infer_result
+            )
+            queue.complete(claimed, keep_done)
+            success_count += 1
+            print(f"✅ {name} -> {local_md_dir} ({time.time() - start_time:.2f}s)")
+        except Exception as e:
+            failed_count += 1
+            print(f"❌ Failed to pipe {name}: {str(e)}")
+            try:
+                queue.fail(claimed, f"{type(e).__name__}: {e}")
+            except Exception as fail_error:
+                # a watching node keeps running, the claim is picked up by requeue_stale
+                print(f"❌ Failed to move {name} to failed: {str(fail_error)}")
+    
+    print(f"\nPipe stage complete: {success_count} done, {failed_count} failed")
+    return output_dir
 
 def main():
     parser = argparse.ArgumentParser(
@@ -631,6 +920,20 @@ Usage examples:
   python parse.py /path/to/folder -g 10 -s            # Group files with page splitting
   python parse.py /path/to/folder -g 8 -t text        # Group files for single task recognition
   
+  # JSONL manifest (one {"path": ...} per line, local or s3://)
+  python parse.py docs.jsonl --prefetch 8             # Stream the manifest, read 8 documents ahead
+  
+  # Resumable runs
+  python parse.py /path/to/folder --resume            # Skip files finished by a previous run
+  
+  # Output profiles
+  python parse.py input.pdf --profile minimal         # Markdown only
+  python parse.py input.pdf --profile debug           # Also a layered debug PDF (model, layout, spans)
+  
+  # Split analyze (GPU nodes) and pipe/dump (CPU nodes) through a shared directory
+  python parse.py /path/to/folder --stage analyze --queue /shared/queue
+  python parse.py --stage pipe --queue /shared/queue -o ./output --watch
+  
   # Advanced configurations
   python parse.py input.pdf -c model_configs.yaml     # Custom model configuration
   python parse.py /path/to/folder -g 15 -s -o ./out   # Group files, split pages, custom output
@@ -639,7 +942,8 @@ Usage examples:
     
     parser.add_argument(
         "input_path",
-        help="Input PDF/image file path or folder path"
+        nargs='?',
+        help="Input PDF/image file path, folder path or .jsonl manifest (local or s3://), not used by --stage pipe"
     )
     
     parser.add_argument(
@@ -672,21 +976,135 @@ Usage examples:
         help="Maximum total page count per group when processing folders (applies to all file types)"
     )
     
+    parser.add_argument(
+        "--resume",
+        action='store_true',
+        help="Keep a run manifest in the output directory; reruns skip completed files and retry failed ones"
+    )
+    
+    parser.add_argument(
+        "--manifest",
+        help="Run manifest path (implies --resume, default: <output>/.monkeyocr_manifest.sqlite)"
+    )
+    
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=3,
+        help="Attempts per file before it is given up when resuming (default: 3)"
+    )
+    
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=4,
+        help="Documents read ahead when parsing a .jsonl manifest (default: 4)"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        choices=list(PROFILE_ARTIFACTS),
+        default=OutputProfile.STANDARD,
+        help="Artifacts written per document: minimal (markdown), standard (markdown, content list, middle json) "
+             "or debug (standard plus a layered debug PDF) (default: standard)"
+    )
+    
+    parser.add_argument(
+        "--stage",
+        choices=[STAGE_ALL, STAGE_ANALYZE, STAGE_PIPE],
+        default=STAGE_ALL,
+        help="all: analyze and write outputs; analyze: only run the models and save the results to --queue; "
+             "pipe: only post-process the results in --queue and write outputs (default: all)"
+    )
+    
+    parser.add_argument(
+        "--queue",
+        help="Shared queue directory between the analyze and pipe stages"
+    )
+    
+    parser.add_argument(
+        "--reference-source",
+        action='store_true',
+        help="Analyze stage: reference local source files by path instead of copying them into the queue"
+    )
+    
+    parser.add_argument(
+        "--watch",
+        action='store_true',
+        help="Pipe stage: keep polling the queue for new results instead of exiting when it is empty"
+    )
+    
+    parser.add_argument(
+        "--keep-done",
+        action='store_true',
+        help="Pipe stage: keep piped results in <queue>/done instead of removing them"
+    )
+    
+    parser.add_argument(
+        "--stale-after",
+        type=float,
+        help="Pipe stage: seconds after which results claimed by a dead node are requeued, "
+             "longer than the pipe time of the largest document"
+    )
+    
     args = parser.parse_args()
+    if args.stage != STAGE_ALL and not args.queue:
+        parser.error(f"--stage {args.stage} needs --queue")
+    if args.stage != STAGE_PIPE and not args.input_path:
+        parser.error("input_path is required")
+    if args.stage != STAGE_ALL and args.task:
+        parser.error("--task runs in one stage, it cannot be combined with --stage")
     
     MonkeyOCR_model = None
     
     try:
-        # Check if input path is a directory or file
-        if os.path.isdir(args.input_path):
+        # Check if only one stage runs, else if input path is a jsonl manifest, a directory or a file
+        if args.stage == STAGE_ANALYZE:
+            analyze_to_queue(
+                args.input_path,
+                args.queue,
+                args.config,
+                args.split_pages,
+                args.reference_source,
+                args.prefetch
+            )
+            print(f"\n✅ Analyze stage completed! Results queued in: {args.queue}")
+        elif args.stage == STAGE_PIPE:
+            result_dir = pipe_from_queue(
+                args.queue,
+                args.output,
+                args.config,
+                args.profile,
+                args.watch,
+                keep_done=args.keep_done,
+                stale_after=args.stale_after
+            )
+            print(f"\n✅ Pipe stage completed! Results saved in: {result_dir}")
+        elif args.input_path.endswith('.jsonl'):
+            result_dir = parse_jsonl(
+                args.input_path,
+                args.output,
+                args.config,
+                args.split_pages,
+                args.prefetch,
+                args.profile
+            )
+            print(f"\n✅ JSONL manifest processing completed! Results saved in: {result_dir}")
+        elif os.path.isdir(args.input_path):
             # Process folder
+            manifest_path = args.manifest
+            if args.resume and not manifest_path:
+                manifest_path = os.path.join(args.output, '.monkeyocr_manifest.sqlite')
             result_dir = parse_folder(
                 args.input_path,
                 args.output,
                 args.config,
                 args.task,
                 args.split_pages,
-                args.group_size
+                args.group_size,
+                manifest_path,
+                args.max_retries,
+                args.profile
             )
             
             if args.task:
@@ -702,7 +1120,7 @@ Usage examples:
         elif os.path.isfile(args.input_path):
             # Process single file - initialize model for single file processing
             print("Loading model...")
-            MonkeyOCR_model = MonkeyOCR(args.config)
+            MonkeyOCR_model = MonkeyOCR(args.config, components=['chat'] if args.task else None)
             
             if args.task:
                 result_dir = single_task_recognition(
@@ -717,7 +1135,8 @@ Usage examples:
                     args.input_path,
                     args.output,
                     MonkeyOCR_model,
-                    args.split_pages
+                    args.split_pages,
+                    args.profile
                 )
                 print(f"\n✅ Parsing completed! Results saved in: {result_dir}")
         else:
@@ -737,8 +1156,11 @@ Usage examples:
             # Give time for async tasks to complete before exiting
             time.sleep(1.0)
             
-            if dist.is_initialized():
-                dist.destroy_process_group()
+            # torch is only loaded when a local model ran, there is no process group otherwise
+            if 'torch' in sys.modules:
+                import torch.distributed as dist
+                if dist.is_initialized():
+                    dist.destroy_process_group()
                 
         except Exception as cleanup_error:
             print(f"Warning: Error during final cleanup: {cleanup_error}")
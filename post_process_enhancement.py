@@ -14,7 +14,14 @@ import re
 from pathlib import Path
 from PIL import Image
 import fitz  # PyMuPDF
-from typing import Dict, List, Optional
+from typing import List, Optional
+
+from enhanced_txt_generator import PARA_BLOCK_KEYS, EnhancedTxtEmitter
+from magic_pdf.data.data_reader_writer import FileBasedDataReader
+from magic_pdf.dict2md.emitters import emit_pages
+from magic_pdf.libs.json_stream import load_index
+from magic_pdf.operators.pipes_llm import PipeResultLLM
+from magic_pdf.post_proc.para_split_v3 import resolve_para_block_refs
 
 
 class PDFEnhancementProcessor:
@@ -106,24 +113,18 @@ class PDFEnhancementProcessor:
         """
         生成带页面信息的TXT文件
         
+        有中间结果JSON时逐页读取（有页面索引时每次只解析一页），一次遍历写出TXT；
+        没有时才退回到Markdown内容
+        
         Returns:
             bool: 是否成功生成
         """
-        if not self.md_file or not self.md_file.exists():
-            print(f"❌ 未找到Markdown文件: {self.md_file}")
+        has_middle_json = self.middle_json is not None and self.middle_json.exists()
+        if not has_middle_json and (not self.md_file or not self.md_file.exists()):
+            print(f"❌ 未找到中间结果JSON或Markdown文件: {self.result_dir}")
             return False
         
         try:
-            # 读取Markdown内容
-            with open(self.md_file, 'r', encoding='utf-8') as f:
-                md_content = f.read()
-            
-            # 读取中间结果JSON（用于获取页面信息）
-            page_info = self._get_page_info_from_json()
-            
-            # 处理Markdown内容
-            txt_content = self._process_markdown_to_txt(md_content, page_info)
-            
             # 保存TXT文件到txt目录
             txt_filename = f"{self.pdf_name}.txt"
             # 确保txt目录存在
@@ -132,7 +133,15 @@ class PDFEnhancementProcessor:
             txt_path = txt_dir / txt_filename
             
             with open(txt_path, 'w', encoding='utf-8') as f:
-                f.write(txt_content)
+                if has_middle_json:
+                    emit_pages(
+                        {'pdf_info': self._iter_middle_pages()},
+                        [EnhancedTxtEmitter(f, self.pdf_name, PARA_BLOCK_KEYS)],
+                    )
+                else:
+                    with open(self.md_file, 'r', encoding='utf-8') as md:
+                        md_content = md.read()
+                    f.write(self._add_page_headers_simple(self._remove_markdown_formatting(md_content)))
             
             print(f"📄 TXT文件生成完成: {txt_filename}")
             return True
@@ -141,54 +150,18 @@ class PDFEnhancementProcessor:
             print(f"❌ 生成TXT文件时出错: {e}")
             return False
     
-    def _get_page_info_from_json(self) -> Dict:
-        """从中间结果JSON中获取页面信息"""
-        if not self.middle_json or not self.middle_json.exists():
-            return {}
-        
-        try:
+    def _iter_middle_pages(self):
+        """逐页读取中间结果JSON，有页面索引时不解析整个文件"""
+        reader = FileBasedDataReader(str(self.middle_json.parent))
+        file_name = self.middle_json.name
+        index = load_index(reader, file_name)
+        if index is None:
+            # 没有索引（旧版本写出的结果），整体读取
             with open(self.middle_json, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 提取页面信息
-            pdf_info = data.get('pdf_info', [])
-            page_info = {}
-            
-            for page_data in pdf_info:
-                page_idx = page_data.get('page_idx', 0)
-                page_info[page_idx] = {
-                    'page_num': page_idx + 1,
-                    'blocks': page_data.get('para_blocks', [])
-                }
-            
-            return page_info
-            
-        except Exception as e:
-            print(f"⚠️  读取页面信息时出错: {e}")
-            return {}
-    
-    def _process_markdown_to_txt(self, md_content: str, page_info: Dict) -> str:
-        """
-        处理Markdown内容转换为TXT格式
-        
-        Args:
-            md_content: Markdown内容
-            page_info: 页面信息字典
-            
-        Returns:
-            str: 处理后的TXT内容
-        """
-        # 去除Markdown格式
-        txt_content = self._remove_markdown_formatting(md_content)
-        
-        # 如果有页面信息，按页面重新组织内容
-        if page_info:
-            txt_content = self._reorganize_by_pages(txt_content, page_info)
-        else:
-            # 如果没有页面信息，使用简单的页面分割
-            txt_content = self._add_page_headers_simple(txt_content)
-        
-        return txt_content
+                yield from resolve_para_block_refs(json.load(f)).get('pdf_info', [])
+            return
+        for page_no in range(len(index['items'])):
+            yield PipeResultLLM.load_middle_json_page(reader, file_name, page_no, index)
     
     def _remove_markdown_formatting(self, md_content: str) -> str:
         """去除Markdown格式"""
@@ -203,29 +176,6 @@ class PDFEnhancementProcessor:
         
         return content
     
-    def _reorganize_by_pages(self, content: str, page_info: Dict) -> str:
-        """基于页面信息重新组织内容"""
-        organized_content = []
-        
-        for page_idx in sorted(page_info.keys()):
-            page_data = page_info[page_idx]
-            page_num = page_data['page_num']
-            
-            # 添加页面头部（修改格式：添加#号和新的图片URL）
-            page_image_url = f"http://9bn8of823990.vicp.fun:42712/images/{self.pdf_name}/page_images/{self.pdf_name}_page_{page_num}.png"
-            page_header = f"#（{self.pdf_name}）第{page_num}页原图内容：{page_image_url}"
-            
-            organized_content.append(page_header)
-            organized_content.append("&&页面内容...")  # 添加&&标记
-            organized_content.append("")  # 空行
-            
-            # 这里可以根据实际的块信息来组织内容
-            # 暂时使用简单的方式
-            organized_content.append(f"第{page_num}页内容")
-            organized_content.append("")
-        
-        return "\n".join(organized_content)
-    
     def _add_page_headers_simple(self, content: str) -> str:
         """简单的页面头部添加（当没有详细页面信息时）"""
         lines = content.split('\n')
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""CPU throughput of the transformers backend on the demo PDFs.
+
+Forces ``device: cpu``, disables the page filter and applies the cpu_config overrides given on the
+command line to a temporary copy of the model config, then runs every PDF
+through layout analysis, VLM recognition and the pipe step and reports
+pages per second.
+
+    python tools/benchmark_cpu.py --dtype bfloat16
+    python tools/benchmark_cpu.py --quantization int8 --threads 8
+"""
+import glob
+import os
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from magic_pdf.data.data_reader_writer import FileBasedDataWriter  # noqa: E402
+from magic_pdf.data.dataset import PymuDocDataset  # noqa: E402
+from magic_pdf.model.custom_model import MonkeyOCR  # noqa: E402
+from magic_pdf.model.doc_analyze_by_custom_model_llm import doc_analyze_llm  # noqa: E402
+
+
+def cpu_config_file(config_path, args):
+    with open(config_path, 'r', encoding='utf-8') as f:
+        configs = yaml.safe_load(f)
+    configs['device'] = 'cpu'
+    configs['chat_config']['backend'] = 'transformers'
+    cpu_config = configs.setdefault('cpu_config', {}) or {}
+    if args.dtype:
+        cpu_config['dtype'] = args.dtype
+    if args.quantization:
+        cpu_config['quantization'] = args.quantization
+    if args.threads:
+        cpu_config['num_threads'] = args.threads
+    if args.static_cache:
+        cpu_config['static_cache'] = True
+    configs['cpu_config'] = cpu_config
+    # duplicate pages of later passes would reuse cached results and inflate the throughput
+    configs['page_filter'] = dict(configs.get('page_filter') or {}, enable=False)
+    # a relative models_dir is meant relative to the repository root
+    configs['models_dir'] = os.path.join(ROOT, configs.get('models_dir', 'model_weight'))
+
+    fd, path = tempfile.mkstemp(suffix='.yaml')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(configs, f, allow_unicode=True)
+    return path
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark CPU inference on the demo PDFs')
+    parser.add_argument('--config', default=os.path.join(ROOT, 'model_configs.yaml'))
+    parser.add_argument('--inputs', nargs='*', help='PDF files, defaults to demo/*.pdf')
+    parser.add_argument('--dtype', choices=['auto', 'bfloat16', 'float32'])
+    parser.add_argument('--quantization', choices=['none', 'int8'])
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--static-cache', action='store_true')
+    parser.add_argument('--repeat', type=int, default=1, help='Passes over the inputs, all of them are timed')
+    args = parser.parse_args()
+
+    inputs = args.inputs or sorted(glob.glob(os.path.join(ROOT, 'demo', '*.pdf')))
+    if not inputs:
+        parser.error('no input PDFs')
+
+    config_path = cpu_config_file(args.config, args)
+    try:
+        load_start = time.time()
+        model = MonkeyOCR(config_path)
+        print(f"Model load time: {time.time() - load_start:.2f}s")
+        print(f"CPU profile: {model.cpu_profile}")
+    finally:
+        os.remove(config_path)
+
+    total_pages = 0
+    analyze_time = pipe_time = 0.0
+    with tempfile.TemporaryDirectory() as image_dir:
+        image_writer = FileBasedDataWriter(image_dir)
+        for _ in range(args.repeat):
+            for path in inputs:
+                with open(path, 'rb') as f:
+                    ds = PymuDocDataset(f.read())
+
+                start = time.time()
+                infer_result = ds.apply(doc_analyze_llm, MonkeyOCR_model=model)
+                analyzed = time.time()
+                infer_result.pipe_ocr_mode(image_writer, MonkeyOCR_model=model)
+                done = time.time()
+
+                analyze_time += analyzed - start
+                pipe_time += done - analyzed
+                total_pages += len(ds)
+                print(f"{os.path.basename(path)}: {len(ds)} pages, "
+                      f"{done - start:.2f}s ({len(ds) / (done - start):.3f} pages/s)")
+
+    total_time = analyze_time + pipe_time
+    print(f"Pages: {total_pages}")
+    print(f"Analyze: {analyze_time:.2f}s, pipe: {pipe_time:.2f}s")
+    print(f"Throughput: {total_pages / total_time:.3f} pages/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Check that the CLI entry points start without loading torch.
+
+torch is only needed by the local models and is imported when one is built,
+so a pipe node, a remote-model client or ``parse.py --help`` starts fast.
+Every module is imported in a fresh interpreter; exits non-zero and names the
+module when torch ends up in ``sys.modules``.
+
+    python tools/check_imports.py
+    python tools/check_imports.py parse magic_pdf.data.stage_queue
+"""
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['parse']
+
+# an import error exits with 1
+TORCH_LOADED = 3
+CHECK = "import sys, {module}; sys.exit(%d if 'torch' in sys.modules else 0)" % TORCH_LOADED
+
+
+def loads_torch(module):
+    result = subprocess.run(
+        [sys.executable, '-c', CHECK.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode not in (0, TORCH_LOADED):
+        raise RuntimeError(f'importing {module} failed:\n{result.stderr}')
+    return result.returncode == TORCH_LOADED
+
+
+def main():
+    parser = ArgumentParser(description='Check that modules import without torch')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args()
+
+    failed = [module for module in args.modules if loads_torch(module)]
+    for module in args.modules:
+        print(f"{'❌' if module in failed else '✅'} {module}")
+    if failed:
+        print(f"torch is imported by: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
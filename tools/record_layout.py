@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Record layout results of PDFs for the ``recorded`` layout model.
+
+Runs the layout model of the given config on every page and writes the
+results keyed by page raster, so benchmarks can replay them later with
+``layout_config.model: recorded`` on a machine without layout weights.
+
+    python tools/record_layout.py demo/*.pdf -o benchmarks/layout/demo.json
+"""
+import os
+import sys
+from argparse import ArgumentParser
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from magic_pdf.data.dataset import PymuDocDataset  # noqa: E402
+from magic_pdf.model.custom_model import MonkeyOCR  # noqa: E402
+from magic_pdf.model.sub_modules.layout.recorded.RecordedLayoutModel import RecordedLayoutModel  # noqa: E402
+
+
+def main():
+    parser = ArgumentParser(description='Record layout results for the recorded layout model')
+    parser.add_argument('inputs', nargs='+', help='PDF files')
+    parser.add_argument('-o', '--output', required=True, help='Recorded layout JSON, extended when it exists')
+    parser.add_argument('-c', '--config', default=os.path.join(ROOT, 'model_configs.yaml'))
+    args = parser.parse_args()
+
+    model = MonkeyOCR(args.config, components=['layout'])
+    recorder = RecordedLayoutModel(args.output)
+    for path in args.inputs:
+        with open(path, 'rb') as f:
+            ds = PymuDocDataset(f.read())
+        # the same rasters doc_analyze_llm feeds the layout model
+        images = [ds.get_page(index).get_image()['img'] for index in range(len(ds))]
+        # layout models are fed PIL images, as in BatchAnalyzeLLM
+        layout_images = [Image.fromarray(img) for img in images]
+        for img, layout_res in zip(images, model.layout_model.batch_predict(layout_images, 1)):
+            recorder.record(img, layout_res)
+        print(f"{os.path.basename(path)}: {len(images)} pages recorded")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    recorder.save(args.output)
+    print(f"Saved {len(recorder.pages)} pages to {args.output}")
+
+
+if __name__ == '__main__':
+    main()